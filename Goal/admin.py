@@ -1,4 +1,5 @@
 from django.contrib import admin
-from Goal.models import Goal
+from Goal.models import Goal, GoalResult
 
 admin.site.register(Goal)
+admin.site.register(GoalResult)
@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from SurvivalPlan.goals import freeze_goal_results
+from SurvivalPlan.models import SurvivalPlan
+from SurvivalPlan.utils import month_range, parse_month
+
+
+class Command(BaseCommand):
+    help = (
+        "Store goal results of plans whose month has ended. Meant to run "
+        "from cron at the start of every month; by default it freezes the "
+        "previous month."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help="Month to freeze (YYYY-MM)")
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help="Freeze every month that has ended",
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        this_month = date.today().replace(day=1)
+        plans = SurvivalPlan.objects.filter(month__lt=this_month)
+
+        if not options['all']:
+            if options['month']:
+                try:
+                    month = parse_month(options['month'])
+                except ValueError:
+                    raise CommandError("--month must be YYYY-MM")
+                if month >= this_month:
+                    raise CommandError(f"{options['month']} has not ended yet")
+            else:
+                month = month_range(this_month - timedelta(days=1))[0]
+            start, end = month_range(month)
+            plans = plans.filter(month__gte=start, month__lt=end)
+
+        plan_ids = list(plans.order_by('id').values_list('id', flat=True))
+        frozen = 0
+        for i in range(0, len(plan_ids), options['batch_size']):
+            batch = SurvivalPlan.objects.filter(
+                pk__in=plan_ids[i:i + options['batch_size']]
+            )
+            frozen += freeze_goal_results(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Froze {frozen} goal results for {len(plan_ids)} plans"
+        ))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Goal', '0001_initial'),
+        ('SurvivalPlan', '0005_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GoalResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=255)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('goal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='Goal.goal')),
+                ('plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='goal_results', to='SurvivalPlan.survivalplan')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('plan', 'goal'), name='unique_goal_result_per_plan')],
+            },
+        ),
+    ]
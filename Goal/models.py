@@ -25,3 +25,30 @@ class Goal(models.Model):
 
     def __str__(self):
         return self.title
+
+
+class GoalResult(models.Model):
+    """Frozen result of a goal for a plan whose month has ended"""
+    plan = models.ForeignKey(
+        SurvivalPlan,
+        on_delete=models.CASCADE,
+        related_name='goal_results',
+    )
+    goal = models.ForeignKey(
+        Goal,
+        on_delete=models.CASCADE,
+        related_name='results',
+    )
+    status = models.CharField(max_length=255)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['plan', 'goal'],
+                name='unique_goal_result_per_plan',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.plan} - {self.goal}: {self.status}"
@@ -1,8 +1,9 @@
 from Goal.models import Goal
+from SurvivalApp.profiling import ProfiledSerializerMixin
 from rest_framework import serializers
 
 
-class GoalSerializer(serializers.ModelSerializer):
+class GoalSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     """Serialzer for Goal"""
     plans = serializers.PrimaryKeyRelatedField(
         many=True,
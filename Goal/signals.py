@@ -0,0 +1,61 @@
+from django.db.models.signals import post_save, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from SurvivalApp.cache import bump_data_version
+from SurvivalPlan.models import SurvivalPlan
+from Goal.models import Goal, GoalResult
+
+
+@receiver(post_save, sender=Goal)
+@receiver(pre_delete, sender=Goal)
+def invalidate_goal_cache(sender, instance, **kwargs):
+    """Goals can be linked to other users' plans, invalidate them too"""
+    bump_data_version(
+        instance.user_id,
+        *instance.plans.values_list('user_id', flat=True)
+    )
+
+
+@receiver(m2m_changed, sender=Goal.plans.through)
+def invalidate_goal_plans_cache(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    if reverse:
+        """instance is the SurvivalPlan whose goals changed"""
+        bump_data_version(instance.user_id)
+        return
+
+    if pk_set:
+        plans = SurvivalPlan.objects.filter(pk__in=pk_set)
+    else:
+        plans = instance.plans.all()
+    bump_data_version(
+        instance.user_id, *plans.values_list('user_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Goal)
+def invalidate_goal_results(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        GoalResult.objects.filter(goal=instance).delete()
+
+
+@receiver(m2m_changed, sender=Goal.plans.through)
+def drop_unlinked_goal_results(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if action not in ('post_remove', 'pre_clear'):
+        return
+
+    if reverse:
+        results = GoalResult.objects.filter(plan=instance)
+        if pk_set:
+            results = results.filter(goal_id__in=pk_set)
+    else:
+        results = GoalResult.objects.filter(goal=instance)
+        if pk_set:
+            results = results.filter(plan_id__in=pk_set)
+    results.delete()
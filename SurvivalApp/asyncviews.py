@@ -0,0 +1,58 @@
+"""
+Async DRF views.
+
+APIView.dispatch is sync, so it cannot await an `async def` handler.
+AsyncAPIView runs authentication, permissions, throttles and the other
+`initial` checks in a worker thread, then awaits the handler on the event
+loop. Django serves the view natively under ASGI; under WSGI it still
+works but every request pays for starting an event loop.
+
+The ORM is sync, so the async handlers run the same helpers as the sync
+views in one worker thread. That frees the event loop while the queries
+run but does not make them any faster, and benchmark_concurrency
+measured ASGI slower than WSGI with a thread pool. The URLconfs only
+route to the async variants when ASYNC_VIEWS is set.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """APIView whose handlers are coroutines"""
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(
+                    self, request.method.lower(), self.http_method_not_allowed
+                )
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs
+        )
+        return self.response
+
+
+def as_view(sync_view, async_view, **initkwargs):
+    """Route to the async variant of a view when ASYNC_VIEWS is set"""
+    view = async_view if settings.ASYNC_VIEWS else sync_view
+    return view.as_view(**initkwargs)
@@ -0,0 +1,164 @@
+"""
+Per-user versioned response cache.
+
+Every user has a data version stored in the cache. Cached responses are
+keyed by user, endpoint, request path and that version, so bumping the
+version invalidates all of a user's cached responses in O(1) without
+scanning keys. Old entries are simply never read again and expire.
+"""
+import hashlib
+import time
+from datetime import date
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+from SurvivalApp.metrics import record_cache_lookup
+
+
+HITS_KEY = 'response-cache:hits'
+MISSES_KEY = 'response-cache:misses'
+
+
+def _version_key(user_id):
+    return f'data-version:{user_id}'
+
+
+def _changed_key(user_id):
+    return f'data-changed:{user_id}'
+
+
+def data_version(user_id):
+    """Return the current data version of a user"""
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        """Start from a timestamp, an evicted counter never reuses a version"""
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def data_last_modified(user_id):
+    """Return the time in whole seconds of the user's last data change"""
+    key = _changed_key(user_id)
+    changed = cache.get(key)
+    if changed is None:
+        """Unknown, so assume it changed just now"""
+        cache.add(key, int(time.time()), timeout=None)
+        changed = cache.get(key)
+    """Never later than our own clock (RFC 9110 8.8.2.1)"""
+    return min(changed, int(time.time()))
+
+
+def _bump(user_ids):
+    now = int(time.time())
+    for user_id in user_ids:
+        try:
+            cache.incr(_version_key(user_id))
+        except ValueError:
+            cache.add(_version_key(user_id), time.time_ns(), timeout=None)
+
+        """Same second changes are told apart by the version (the ETag)"""
+        cache.set(_changed_key(user_id), now, timeout=None)
+
+
+def bump_data_version(*user_ids):
+    """Invalidate cached responses of the given users
+
+    The bump is repeated after commit so responses computed from data
+    that was not committed yet are not served afterwards.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return
+    _bump(user_ids)
+    transaction.on_commit(lambda: _bump(user_ids))
+
+
+def _count(key):
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def cache_stats():
+    """Return response cache hit and miss counters"""
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+    }
+
+
+def _lookup(request, endpoint):
+    """Return (key, cached data or None) of a request and count the lookup"""
+    user = request.user
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    key = (
+        f'response:{user.pk}:{data_version(user.pk)}:{endpoint}:'
+        f'{date.today().isoformat()}:{path}'
+    )
+
+    cached = cache.get(key)
+    _count(HITS_KEY if cached is not None else MISSES_KEY)
+    record_cache_lookup(hit=cached is not None)
+    return key, cached
+
+
+def _store(key, response):
+    if response.status_code == 200:
+        cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+
+
+def cached_response(endpoint):
+    """Cache successful responses of an APIView method per user and version
+
+    Async methods of an AsyncAPIView are wrapped too, the cache is then
+    read and written in a worker thread.
+    """
+
+    def decorator(method):
+        if iscoroutinefunction(method):
+            @wraps(method)
+            async def async_wrapper(self, request, *args, **kwargs):
+                user = request.user
+                if not user or not user.is_authenticated:
+                    return await method(self, request, *args, **kwargs)
+
+                key, cached = await sync_to_async(_lookup)(request, endpoint)
+                if cached is not None:
+                    return Response(cached)
+
+                response = await method(self, request, *args, **kwargs)
+                await sync_to_async(_store)(key, response)
+                return response
+
+            return async_wrapper
+
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            user = request.user
+            if not user or not user.is_authenticated:
+                return method(self, request, *args, **kwargs)
+
+            key, cached = _lookup(request, endpoint)
+            if cached is not None:
+                return Response(cached)
+
+            response = method(self, request, *args, **kwargs)
+            _store(key, response)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,106 @@
+"""
+Conditional request support (ETag / Last-Modified) for DRF views.
+
+Validators are derived from the per-user data version kept by
+SurvivalApp.cache, so a request can be answered with 304 Not Modified or
+412 Precondition Failed right after authentication, before the view
+queries or serializes anything.
+"""
+import calendar
+import hashlib
+from datetime import date
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from SurvivalApp.cache import data_version, data_last_modified
+
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+class ConditionalResponse(Exception):
+    """Raised to short circuit a view with a ready response"""
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+class ConditionalRequestMixin:
+    """
+    Adds ETag and Last-Modified to GET responses and honours
+    If-None-Match / If-Modified-Since. Methods listed in
+    `conditional_write_methods` also honour If-Match so stale writes
+    are rejected.
+    """
+    conditional_date_dependent = False
+    conditional_write_methods = ()
+
+    def get_conditional_validators(self, request):
+        """Return (etag, last_modified) for the current user and URL"""
+        user_id = request.user.pk
+        parts = [
+            str(user_id), str(data_version(user_id)), request.get_full_path()
+        ]
+        last_modified = data_last_modified(user_id)
+
+        if self.conditional_date_dependent:
+            today = date.today()
+            parts.append(today.isoformat())
+            last_modified = max(
+                last_modified, calendar.timegm(today.timetuple())
+            )
+
+        etag = '"%s"' % hashlib.sha1(':'.join(parts).encode()).hexdigest()
+        return etag, last_modified
+
+    def set_conditional_headers(self, response, etag, last_modified):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.conditional_validators = None
+
+        if not request.user.is_authenticated:
+            return
+        if (request.method not in SAFE_METHODS
+                and request.method not in self.conditional_write_methods):
+            return
+
+        etag, last_modified = self.get_conditional_validators(request)
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified,
+        )
+        if response is not None:
+            self.set_conditional_headers(response, etag, last_modified)
+            raise ConditionalResponse(response)
+
+        if request.method in SAFE_METHODS:
+            self.conditional_validators = (etag, last_modified)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, ConditionalResponse):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if not 200 <= response.status_code < 300:
+            return response
+
+        validators = getattr(self, 'conditional_validators', None)
+        if validators is not None:
+            self.set_conditional_headers(response, *validators)
+        elif (request.method in self.conditional_write_methods
+              and request.user.is_authenticated):
+            """Hand back the ETag of the updated resource for the next write"""
+            self.set_conditional_headers(
+                response, *self.get_conditional_validators(request)
+            )
+        return response
@@ -0,0 +1,43 @@
+"""
+Gunicorn configuration of the production profile, see entrypoint.sh.
+
+A pre-fork pool of GUNICORN_WORKERS processes, each serving requests
+with GUNICORN_THREADS threads. Threads help while requests wait on the
+database, extra workers while they use the CPU; the default is two
+workers per CPU plus one.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(
+    os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1)
+)
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = timeout
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+"""Recycle workers now and then so a leak cannot grow without bound"""
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+
+wsgi_app = 'SurvivalApp.wsgi:application'
+raw_env = ['DJANGO_SETTINGS_MODULE=' + os.getenv(
+    'DJANGO_SETTINGS_MODULE', 'SurvivalApp.settings_production'
+)]
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+
+
+def worker_exit(server, worker):
+    """Keep the counts of a recycled worker, see SurvivalApp/metrics.py"""
+    from django.conf import settings
+
+    if settings.configured and settings.METRICS_DIR:
+        from SurvivalApp.metrics import registry
+
+        registry.retire(settings.METRICS_DIR)
@@ -0,0 +1,452 @@
+"""
+Request metrics in Prometheus text format.
+
+MetricsMiddleware counts requests, statuses, latencies, database queries
+and response cache lookups per resolved URL name in a registry kept in
+memory by each process. Under a pre-fork server every worker has its own
+registry, so with METRICS_DIR set each worker periodically writes a
+snapshot to METRICS_DIR/metrics-<pid>-<worker>.json and the metrics
+endpoint sums the snapshots of all workers. Without METRICS_DIR only the
+serving process is reported.
+
+Workers come and go, gunicorn recycles them after max_requests. A worker
+adds its final counts to METRICS_DIR/archive.json on exit (see the
+worker_exit hook in gunicorn.conf.py) and the snapshots of workers that
+died without doing so are moved there on the next scrape, so the totals
+never go backwards. The random worker id keeps a reused pid from
+overwriting the snapshot of the dead worker that had it before.
+
+Settings:
+    METRICS_ENABLED         install the middleware at all
+    METRICS_DIR             directory shared by the workers, or None
+    METRICS_FLUSH_INTERVAL  seconds between snapshots of a worker
+"""
+import contextvars
+import fcntl
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+ARCHIVE = 'archive.json'
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+HELP = {
+    'http_requests_total': (
+        'counter', "Requests by route, method and status."
+    ),
+    'http_request_duration_seconds': (
+        'histogram', "Request latency by route."
+    ),
+    'db_queries_total': (
+        'counter', "Database queries run by requests of a route."
+    ),
+    'response_cache_lookups_total': (
+        'counter', "Response cache lookups by result."
+    ),
+    'response_cache_hit_ratio': (
+        'gauge', "Share of response cache lookups that hit."
+    ),
+    'throttled_requests_total': (
+        'counter', "Requests rejected by a throttle bucket."
+    ),
+}
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class MetricsRegistry:
+    """Counters and histograms of the current process
+
+    Samples are keyed by (name, labels) where labels is a sorted tuple of
+    (label, value) pairs.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+        self.last_flush = time.monotonic()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.worker = uuid.uuid4().hex
+        self.counters = defaultdict(float)
+        self.histograms = {}
+
+    def _check_fork(self):
+        """A forked worker starts from zero instead of copying its parent"""
+        if self.pid != os.getpid():
+            self.reset()
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self._check_fork()
+            self.counters[key] += amount
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self._check_fork()
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {
+                    'buckets': list(buckets),
+                    'counts': [0] * len(buckets),
+                    'sum': 0.0,
+                    'count': 0,
+                }
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram['counts'][i] += 1
+                    break
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def snapshot(self):
+        """Return the samples as JSON serializable data"""
+        with self.lock:
+            self._check_fork()
+            return {
+                'pid': self.pid,
+                'counters': [
+                    [name, dict(labels), value]
+                    for (name, labels), value in self.counters.items()
+                ],
+                'histograms': [
+                    [
+                        name,
+                        dict(labels),
+                        dict(histogram, counts=list(histogram['counts'])),
+                    ]
+                    for (name, labels), histogram in self.histograms.items()
+                ],
+            }
+
+    def path(self, directory):
+        """Snapshot file of this process in directory"""
+        self._check_fork()
+        return Path(directory) / f'metrics-{self.pid}-{self.worker}.json'
+
+    def flush(self, directory):
+        """Write this process' snapshot atomically into directory"""
+        self.last_flush = time.monotonic()
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        _write(self.path(directory), self.snapshot())
+
+    def retire(self, directory):
+        """Add this process' counts to the archive, it is about to exit"""
+        with _locked(directory):
+            archive = _read(Path(directory) / ARCHIVE)
+            snapshot = self.snapshot()
+            _write(Path(directory) / ARCHIVE, _add(archive, snapshot))
+            self.path(directory).unlink(missing_ok=True)
+
+
+registry = MetricsRegistry()
+
+
+def _read(path):
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return None
+
+
+def _write(path, snapshot):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(tmp, path)
+
+
+def _add(archive, snapshot):
+    """Return the archive with a snapshot's samples added to it"""
+    if archive is None:
+        archive = {'counters': [], 'histograms': []}
+    total = merge([archive, snapshot])
+    return {
+        'counters': [
+            [name, dict(labels), value]
+            for (name, labels), value in total.counters.items()
+        ],
+        'histograms': [
+            [name, dict(labels), histogram]
+            for (name, labels), histogram in total.histograms.items()
+        ],
+    }
+
+
+class _locked:
+    """Exclusive lock on a directory's archive, shared by all workers"""
+
+    def __init__(self, directory):
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        self.path = Path(directory) / 'archive.lock'
+
+    def __enter__(self):
+        self.file = open(self.path, 'a')
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc_info):
+        fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        """Exists but belongs to another user"""
+        return True
+    return True
+
+
+def collect():
+    """Return snapshots of every worker, or of this process only
+
+    Snapshots of workers that are gone are moved into the archive first.
+    Everything is read under the archive lock, so a snapshot is never
+    counted both in its file and in the archive.
+    """
+    directory = settings.METRICS_DIR
+    if not directory:
+        return [registry.snapshot()]
+
+    registry.flush(directory)
+    with _locked(directory):
+        archive = _read(Path(directory) / ARCHIVE)
+        snapshots = []
+        for path in Path(directory).glob('metrics-*.json'):
+            try:
+                snapshot = json.loads(path.read_text())
+            except (OSError, ValueError):
+                """Removed or being replaced by its worker"""
+                continue
+            if _alive(snapshot['pid']):
+                snapshots.append(snapshot)
+                continue
+            archive = _add(archive, snapshot)
+            _write(Path(directory) / ARCHIVE, archive)
+            path.unlink(missing_ok=True)
+
+    if archive is not None:
+        snapshots.append(archive)
+    return snapshots
+
+
+def merge(snapshots):
+    """Sum snapshots into one MetricsRegistry"""
+    merged = MetricsRegistry()
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            merged.counters[(name, tuple(sorted(labels.items())))] += value
+        for name, labels, histogram in snapshot['histograms']:
+            key = (name, tuple(sorted(labels.items())))
+            total = merged.histograms.get(key)
+            if total is None:
+                merged.histograms[key] = dict(
+                    histogram, counts=list(histogram['counts'])
+                )
+                continue
+            total['counts'] = [
+                a + b for a, b in zip(total['counts'], histogram['counts'])
+            ]
+            total['sum'] += histogram['sum']
+            total['count'] += histogram['count']
+    return merged
+
+
+def _format_labels(labels, **extra):
+    labels = list(labels) + list(extra.items())
+    if not labels:
+        return ''
+    escaped = (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('"', '\\"')
+        .replace('\n', '\\n')
+        for _, value in labels
+    )
+    return '{' + ','.join(
+        f'{label}="{value}"' for (label, _), value in zip(labels, escaped)
+    ) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render(merged):
+    """Render a registry in the Prometheus text exposition format"""
+    samples = defaultdict(list)
+    for (name, labels), value in sorted(merged.counters.items()):
+        samples[name].append(
+            f'{name}{_format_labels(labels)} {_format_value(value)}'
+        )
+
+    for (name, labels), histogram in sorted(merged.histograms.items()):
+        cumulative = 0
+        for bound, count in zip(histogram['buckets'], histogram['counts']):
+            cumulative += count
+            le = _format_value(bound)
+            samples[name].append(
+                f'{name}_bucket{_format_labels(labels, le=le)} {cumulative}'
+            )
+        samples[name].append(
+            f'{name}_bucket{_format_labels(labels, le="+Inf")} '
+            f'{histogram["count"]}'
+        )
+        samples[name].append(
+            f'{name}_sum{_format_labels(labels)} '
+            f'{_format_value(histogram["sum"])}'
+        )
+        samples[name].append(
+            f'{name}_count{_format_labels(labels)} {histogram["count"]}'
+        )
+
+    lookups = defaultdict(lambda: [0, 0])
+    for (name, labels), value in merged.counters.items():
+        if name == 'response_cache_lookups_total':
+            labels = dict(labels)
+            lookups[labels['route']][labels['result'] == 'hit'] += value
+    for route, (misses, hits) in sorted(lookups.items()):
+        samples['response_cache_hit_ratio'].append(
+            f'response_cache_hit_ratio{_format_labels([("route", route)])} '
+            f'{_format_value(hits / (hits + misses))}'
+        )
+
+    lines = []
+    for name, (kind, description) in HELP.items():
+        if name in samples:
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(samples[name])
+    return '\n'.join(lines) + '\n'
+
+
+def record_cache_lookup(hit):
+    """Count a response cache lookup against the current request's route"""
+    request_metrics = _current.get()
+    if request_metrics is not None:
+        request_metrics['cache_hits' if hit else 'cache_misses'] += 1
+
+
+def count_query(execute, sql, params, many, context):
+    """Database execute wrapper counting queries of the current request"""
+    request_metrics = _current.get()
+    if request_metrics is not None:
+        request_metrics['queries'] += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counter(connection, **kwargs):
+    """Count the queries of a connection for as long as it lives
+
+    Async views run their queries in worker threads on other connections
+    than the middleware's, the request's metrics reach them through the
+    context variable. Inserted first so it is never popped by the
+    execute_wrapper() blocks of other middlewares.
+    """
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, count_query)
+
+
+class MetricsMiddleware:
+    """Record metrics of every request into the process registry"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+        connection_created.connect(install_query_counter)
+        for connection in connections.all(initialized_only=True):
+            install_query_counter(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        request_metrics = {'queries': 0, 'cache_hits': 0, 'cache_misses': 0}
+        token = _current.set(request_metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        duration = time.perf_counter() - start
+        self.record(request, response, request_metrics, duration)
+        return response
+
+    async def __acall__(self, request):
+        request_metrics = {'queries': 0, 'cache_hits': 0, 'cache_misses': 0}
+        token = _current.set(request_metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        duration = time.perf_counter() - start
+        self.record(request, response, request_metrics, duration)
+        return response
+
+    def record(self, request, response, request_metrics, duration):
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match is not None else 'unmatched'
+
+        registry.inc('http_requests_total', {
+            'route': route,
+            'method': request.method,
+            'status': str(response.status_code),
+        })
+        registry.observe(
+            'http_request_duration_seconds', {'route': route}, duration
+        )
+        registry.inc(
+            'db_queries_total', {'route': route}, request_metrics['queries']
+        )
+        if request_metrics['cache_hits']:
+            registry.inc(
+                'response_cache_lookups_total',
+                {'route': route, 'result': 'hit'},
+                request_metrics['cache_hits'],
+            )
+        if request_metrics['cache_misses']:
+            registry.inc(
+                'response_cache_lookups_total',
+                {'route': route, 'result': 'miss'},
+                request_metrics['cache_misses'],
+            )
+
+        if (settings.METRICS_DIR and time.monotonic() - registry.last_flush
+                >= settings.METRICS_FLUSH_INTERVAL):
+            registry.flush(settings.METRICS_DIR)
@@ -0,0 +1,240 @@
+"""
+Per request profiling.
+
+ProfilingMiddleware times the SQL, view, serialization and render phases
+of a sampled fraction of requests and reports them in a Server-Timing
+header, which browser dev tools show next to the request. The view phase
+includes the serialization phase and the queries run inside it. Only
+serializers that opt in with ProfiledSerializerMixin count towards the
+serialization phase.
+
+Settings:
+    PROFILING_ENABLED       install the middleware at all
+    PROFILING_SAMPLE_RATE   fraction of requests profiled, 0.0 - 1.0
+    PROFILING_SLOW_QUERIES  log this many slowest queries of each
+                            profiled request with their call sites
+"""
+import contextvars
+import logging
+import os
+import random
+import sys
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('request_profile', default=None)
+
+"""Frames of the ORM and of the execute wrappers are never the call site"""
+_ORM_PATHS = (
+    os.path.join('django', 'db', ''),
+    os.path.join('django', 'utils', ''),
+    os.path.join('SurvivalApp', 'profiling.py'),
+    os.path.join('SurvivalApp', 'metrics.py'),
+    os.path.join('querylog', 'middleware.py'),
+)
+_LIBRARY_PATH = os.sep + 'site-packages' + os.sep
+
+
+def _describe(frame, base_dir):
+    filename = frame.f_code.co_filename
+    if _LIBRARY_PATH in filename:
+        filename = filename.split(_LIBRARY_PATH, 1)[1]
+    elif filename.startswith(base_dir):
+        filename = os.path.relpath(filename, base_dir)
+    return f"{filename}:{frame.f_lineno} in {frame.f_code.co_name}"
+
+
+def call_site():
+    """Describe the code that ran the current query
+
+    That is the innermost frame outside the ORM, followed by the innermost
+    frame of project code when the query was run by a library such as DRF.
+    """
+    base_dir = str(settings.BASE_DIR)
+    caller = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not any(path in filename for path in _ORM_PATHS):
+            if caller is None:
+                caller = frame
+            if filename.startswith(base_dir) and _LIBRARY_PATH not in filename:
+                break
+        frame = frame.f_back
+
+    if caller is None:
+        return 'unknown'
+    if frame is None or frame is caller:
+        return _describe(caller, base_dir)
+    return f"{_describe(caller, base_dir)} from {_describe(frame, base_dir)}"
+
+
+class RequestProfile:
+    """Timings collected for one request, durations in seconds"""
+
+    def __init__(self, keep_queries=False):
+        self.start = time.perf_counter()
+        self.keep_queries = keep_queries
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.queries = []
+        self.view_start = None
+        self.view_end = None
+        self.serialize_time = 0.0
+        self.serialize_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Database execute wrapper"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.sql_count += 1
+            self.sql_time += duration
+            if self.keep_queries:
+                self.queries.append((duration, sql, call_site()))
+
+    def server_timing(self, end):
+        """Build the Server-Timing header value"""
+        metrics = [
+            ('sql', self.sql_time, f'{self.sql_count} queries'),
+        ]
+        if self.view_start is not None:
+            view_end = self.view_end or end
+            metrics.append(('view', view_end - self.view_start, None))
+            metrics.append(('serialize', self.serialize_time, None))
+            if self.view_end is not None:
+                metrics.append(('render', end - self.view_end, None))
+        metrics.append(('total', end - self.start, None))
+
+        return ', '.join(
+            f'{name};dur={duration * 1000:.2f}'
+            + (f';desc="{desc}"' if desc else '')
+            for name, duration, desc in metrics
+        )
+
+    def log_slow_queries(self, request, count):
+        slowest = sorted(
+            self.queries, key=lambda query: query[0], reverse=True
+        )[:count]
+        for duration, sql, site in slowest:
+            logger.info(
+                "%s %s %.2fms at %s: %s",
+                request.method, request.path, duration * 1000, site, sql,
+            )
+
+
+class ProfiledSerializerMixin:
+    """Count a serializer's to_representation in the serialization phase
+
+    Nested and listed serializers are timed once, by the outermost call.
+    """
+
+    def to_representation(self, instance):
+        profile = _current.get()
+        if profile is None:
+            return super().to_representation(instance)
+
+        profile.serialize_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            profile.serialize_depth -= 1
+            if not profile.serialize_depth:
+                profile.serialize_time += time.perf_counter() - start
+
+
+def profile_query(execute, sql, params, many, context):
+    """Database execute wrapper timing queries of the profiled request"""
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile(execute, sql, params, many, context)
+
+
+def install_query_profiler(connection, **kwargs):
+    """Like metrics.install_query_counter, reaches async views' threads"""
+    if profile_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, profile_query)
+
+
+class ProfilingMiddleware:
+    """Add a Server-Timing header to a sample of requests"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.slow_queries = settings.PROFILING_SLOW_QUERIES
+
+        connection_created.connect(install_query_profiler)
+        for connection in connections.all(initialized_only=True):
+            install_query_profiler(connection)
+
+    def sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        profile = RequestProfile(keep_queries=self.slow_queries > 0)
+        request._profile = profile
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        profile = RequestProfile(keep_queries=self.slow_queries > 0)
+        request._profile = profile
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        return self.finish(request, response, profile)
+
+    def finish(self, request, response, profile):
+        response['Server-Timing'] = profile.server_timing(time.perf_counter())
+        if self.slow_queries:
+            profile.log_slow_queries(request, self.slow_queries)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = getattr(request, '_profile', None)
+        if profile is not None:
+            profile.view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        """Runs after the view, right before the response is rendered"""
+        profile = getattr(request, '_profile', None)
+        if profile is not None:
+            profile.view_end = time.perf_counter()
+        return response
@@ -47,12 +47,14 @@ INSTALLED_APPS = [
     'rest_framework_simplejwt.token_blacklist',
     'SurvivalPlan',
     'Goal',
-    #'debug_toolbar', # SQL DEBUG
+    'stats',
+    'querylog',
 ]
 
-#INTERNAL_IPS = ['127.0.0.1']  # SQL DEBUG
-
 MIDDLEWARE = [
+    'querylog.middleware.SlowQueryMiddleware',
+    'SurvivalApp.metrics.MetricsMiddleware',
+    'SurvivalApp.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -60,7 +62,6 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    #'debug_toolbar.middleware.DebugToolbarMiddleware', # SQL DEBUG
 ]
 
 ROOT_URLCONF = 'SurvivalApp.urls'
@@ -139,7 +140,7 @@ AUTH_USER_MODEL = 'user.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'user.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -160,4 +161,75 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=int(os.getenv('ACCESS_TOKEN_LIFETIME', 60))),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=int(os.getenv('REFRESH_TOKEN_LIFETIME', 7))),
     'ROTATE_REFRESH_TOKENS': True,
+    'TOKEN_OBTAIN_SERIALIZER': 'user.serializers.CachedBlacklistTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'user.serializers.CachedBlacklistTokenRefreshSerializer',
+    }
+
+# Token bucket limits of the password hashing views, see user/throttling.py
+TOKEN_BUCKET_RATES = {
+    'register': os.getenv('THROTTLE_REGISTER_RATE', '5/hour'),
+    'login': os.getenv('THROTTLE_LOGIN_RATE', '10/min'),
+    'change-password': os.getenv('THROTTLE_CHANGE_PASSWORD_RATE', '5/min'),
+    'password-reset-confirm': os.getenv('THROTTLE_PASSWORD_RESET_CONFIRM_RATE', '5/min'),
+}
+
+# Route the stats and plan goals endpoints to their async views, see
+# SurvivalApp/asyncviews.py. Off unless benchmark_concurrency shows the
+# async views winning on the deployment's server and database.
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+
+# Seconds an authenticated user is kept in the cache, see user/authentication.py
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv('AUTH_USER_CACHE_TIMEOUT', 60))
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+}
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            str(BASE_DIR / '.cache') if CACHE_BACKEND == 'file' else ''
+        ),
     }
+}
+
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 60 * 60))
+
+EXPENSE_IMPORT_BATCH_SIZE = int(os.getenv('EXPENSE_IMPORT_BATCH_SIZE', 1000))
+EXPENSE_IMPORT_MAX_BATCH_SIZE = 10000
+
+# Per request profiling, see SurvivalApp/profiling.py
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False') == 'True'
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 1.0))
+PROFILING_SLOW_QUERIES = int(os.getenv('PROFILING_SLOW_QUERIES', 0))
+
+# Request metrics, see SurvivalApp/metrics.py
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+
+# Slow query log, see querylog/middleware.py. 0 disables it
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 0))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'SurvivalApp': {
+            'handlers': ['console'],
+            'level': os.getenv('SURVIVALAPP_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
@@ -0,0 +1,82 @@
+"""
+Production settings, used by entrypoint.sh and SurvivalApp/gunicorn.conf.py.
+
+Everything configurable in settings.py still is, this module only turns
+off what is meant for development and makes the settings safe for
+several worker processes sharing one database and cache:
+
+- DEBUG is off, so connection.queries no longer keeps every query.
+- Database connections persist for DB_CONN_MAX_AGE seconds and are
+  checked before reuse instead of being opened for every request.
+- SQLite uses WAL so readers in other workers are not blocked by writes.
+- The cache defaults to Redis at REDIS_URL. Data versions, the user
+  cache and the throttle counters have to be shared by all workers,
+  which a per process locmem cache is not, and are changed with incr,
+  which Redis does atomically while the file backend reads and rewrites
+  the file, losing concurrent increments. With CACHE_BACKEND=file the
+  directory defaults to one outside the app tree, which docker-compose
+  bind mounts from the host.
+- Worker metrics are merged through METRICS_DIR.
+"""
+import os
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+
+from SurvivalApp.settings import *  # noqa: F401,F403
+from SurvivalApp.settings import (
+    BASE_DIR,
+    CACHE_BACKEND,
+    CACHE_BACKENDS,
+    DATABASES,
+    SECRET_KEY,
+)
+
+DEBUG = False
+
+if not SECRET_KEY:
+    raise ImproperlyConfigured("SECRET_KEY must be set in production")
+
+ALLOWED_HOSTS = [
+    host.strip()
+    for host in os.getenv('ALLOWED_HOSTS', 'localhost').split(',')
+    if host.strip()
+]
+
+DATABASES = {
+    'default': {
+        **DATABASES['default'],
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default']['OPTIONS'] = {
+        'init_command': (
+            'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;'
+        ),
+        'timeout': int(os.getenv('SQLITE_TIMEOUT', 20)),
+    }
+
+if 'CACHE_BACKEND' not in os.environ:
+    CACHES = {
+        'default': {
+            'BACKEND': CACHE_BACKENDS['redis'],
+            'LOCATION': os.getenv('REDIS_URL', 'redis://redis:6379/0'),
+        }
+    }
+elif CACHE_BACKEND == 'file' and 'CACHE_LOCATION' not in os.environ:
+    CACHES = {
+        'default': {
+            'BACKEND': CACHE_BACKENDS['file'],
+            'LOCATION': os.path.join(
+                tempfile.gettempdir(), 'survivalapp-cache'
+            ),
+        }
+    }
+
+METRICS_DIR = os.getenv(
+    'METRICS_DIR', os.path.join(tempfile.gettempdir(), 'survivalapp-metrics')
+)
+
+STATIC_ROOT = os.getenv('STATIC_ROOT', str(BASE_DIR / 'staticfiles'))
@@ -0,0 +1,236 @@
+import json
+import subprocess
+import sys
+import tempfile
+from datetime import date
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import (
+    APIClient,
+    APIRequestFactory,
+    force_authenticate,
+)
+
+from SurvivalApp import metrics
+from SurvivalApp.profiling import ProfilingMiddleware
+from SurvivalPlan.models import SurvivalPlan, PlanItem
+from SurvivalPlan.views import SurvivalPlanGoalsView
+
+User = get_user_model()
+
+
+@override_settings(
+    PROFILING_ENABLED=True,
+    PROFILING_SAMPLE_RATE=1.0,
+    PROFILING_SLOW_QUERIES=0,
+)
+class ProfilingMiddlewareTests(TestCase):
+    """Tests for the Server-Timing profiling middleware"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='user@example.com', password='pass12345'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.plan = SurvivalPlan.objects.create(
+            user=self.user, title='Plan', income=1000, month=date(2025, 1, 1)
+        )
+        PlanItem.objects.create(plan=self.plan, category='food', amount=100)
+        self.url = f'/api/survival-plans/{self.plan.pk}/goals/'
+
+    def timings(self, res):
+        return {
+            metric.split(';')[0]: metric
+            for metric in res['Server-Timing'].split(', ')
+        }
+
+    def test_server_timing_header(self):
+        res = self.client.get('/api/survival-plans/')
+
+        timings = self.timings(res)
+        self.assertEqual(
+            sorted(timings), ['render', 'serialize', 'sql', 'total', 'view']
+        )
+        self.assertIn('desc="4 queries"', timings['sql'])
+        self.assertNotEqual(timings['serialize'], 'serialize;dur=0.00')
+
+    def test_async_request(self):
+        request = APIRequestFactory().get(self.url)
+        force_authenticate(request, user=self.user)
+
+        async def get_response(request):
+            return await sync_to_async(SurvivalPlanGoalsView.as_view())(
+                request, pk=self.plan.pk
+            )
+
+        middleware = ProfilingMiddleware(get_response)
+        res = async_to_sync(middleware)(request)
+
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertIn('desc="3 queries"', self.timings(res)['sql'])
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_disabled(self):
+        res = self.client.get('/api/survival-plans/')
+
+        self.assertNotIn('Server-Timing', res)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0.0)
+    def test_unsampled_request_is_not_profiled(self):
+        res = self.client.get('/api/survival-plans/')
+
+        self.assertNotIn('Server-Timing', res)
+
+    @override_settings(PROFILING_SLOW_QUERIES=2)
+    def test_logs_slowest_queries_with_call_site(self):
+        with self.assertLogs('SurvivalApp.profiling', 'INFO') as logs:
+            self.client.get('/api/survival-plans/')
+
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn('GET /api/survival-plans/', logs.output[0])
+        self.assertIn('.py:', logs.output[0])
+
+
+class MetricsTests(TestCase):
+    """Tests for request metrics and the Prometheus endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.reset()
+        self.admin = User.objects.create_user(
+            email='admin@example.com', password='pass12345', is_staff=True
+        )
+        self.user = User.objects.create_user(
+            email='user@example.com', password='pass12345'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.plan = SurvivalPlan.objects.create(
+            user=self.user, title='Plan', income=1000, month=date(2025, 1, 1)
+        )
+
+    def scrape(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        res = client.get('/api/metrics/')
+        self.assertEqual(res.status_code, 200)
+        return res.content.decode()
+
+    def test_counts_requests_by_route(self):
+        self.client.get('/api/survival-plans/')
+        self.client.get('/api/survival-plans/')
+        self.client.get('/api/survival-plans/999/')
+
+        text = self.scrape()
+
+        self.assertIn(
+            'http_requests_total{method="GET",'
+            'route="plan:suvivalplan-list",status="200"} 2',
+            text
+        )
+        self.assertIn(
+            'http_requests_total{method="GET",'
+            'route="plan:suvivalplan-detail",status="404"} 1',
+            text
+        )
+        self.assertIn(
+            'http_request_duration_seconds_count'
+            '{route="plan:suvivalplan-list"} 2',
+            text
+        )
+        self.assertIn(
+            'db_queries_total{route="plan:suvivalplan-list"} 8', text
+        )
+
+    def test_cache_hit_ratio(self):
+        url = f'/api/survival-plans/{self.plan.pk}/goals/'
+        self.client.get(url)
+        self.client.get(url)
+
+        self.assertIn(
+            'response_cache_hit_ratio{route="plan:survivalplan-goals"} 0.5',
+            self.scrape()
+        )
+
+    def test_endpoint_is_admin_only(self):
+        res = self.client.get('/api/metrics/')
+
+        self.assertEqual(res.status_code, 403)
+
+    def test_sums_snapshots_of_all_workers(self):
+        worker = metrics.MetricsRegistry()
+        worker.inc(
+            'http_requests_total',
+            {'route': 'x', 'method': 'GET', 'status': '200'},
+            3,
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            worker.flush(directory)
+            with override_settings(METRICS_DIR=directory):
+                self.client.get('/api/survival-plans/')
+                text = self.scrape()
+
+        self.assertIn(
+            'http_requests_total{method="GET",route="x",status="200"} 3', text
+        )
+        self.assertIn(
+            'http_requests_total{method="GET",'
+            'route="plan:suvivalplan-list",status="200"} 1',
+            text
+        )
+
+    def test_archives_snapshots_of_dead_workers(self):
+        dead = subprocess.Popen([sys.executable, '-c', ''])
+        dead.wait()
+        worker = metrics.MetricsRegistry()
+        worker.inc(
+            'http_requests_total',
+            {'route': 'x', 'method': 'GET', 'status': '200'},
+            3,
+        )
+        sample = 'http_requests_total{method="GET",route="x",status="200"} 3'
+
+        with tempfile.TemporaryDirectory() as directory:
+            snapshot = worker.path(directory)
+            worker.flush(directory)
+            data = json.loads(snapshot.read_text())
+            snapshot.write_text(json.dumps(dict(data, pid=dead.pid)))
+
+            with override_settings(METRICS_DIR=directory):
+                first = self.scrape()
+                second = self.scrape()
+
+            self.assertFalse(snapshot.exists())
+
+        self.assertIn(sample, first)
+        self.assertIn(sample, second)
+
+    def test_retired_worker_keeps_its_counts(self):
+        worker = metrics.MetricsRegistry()
+        worker.inc(
+            'http_requests_total',
+            {'route': 'x', 'method': 'GET', 'status': '200'},
+            3,
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            worker.flush(directory)
+            worker.inc(
+                'http_requests_total',
+                {'route': 'x', 'method': 'GET', 'status': '200'},
+            )
+            worker.retire(directory)
+
+            self.assertFalse(worker.path(directory).exists())
+            with override_settings(METRICS_DIR=directory):
+                text = self.scrape()
+
+        self.assertIn(
+            'http_requests_total{method="GET",route="x",status="200"} 4', text
+        )
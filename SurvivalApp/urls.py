@@ -17,11 +17,13 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from SurvivalApp.views import MetricsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('user.urls')),
     path('api/', include('SurvivalPlan.urls')),
     path('api/', include('Goal.urls')),
     path('api/stats/', include('stats.urls')),
-    # path('__debug__/', include('debug_toolbar.urls'))  # SQL DEBUG
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
 ]
@@ -0,0 +1,16 @@
+from django.http import HttpResponse
+from rest_framework.views import APIView
+
+from SurvivalApp.metrics import collect, merge, render
+from user.permissions import IsAdminUser
+
+
+class MetricsView(APIView):
+    """Expose request metrics of all workers to Prometheus"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(
+            render(merge(collect())),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
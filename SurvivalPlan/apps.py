@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SurvivalplanConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'SurvivalPlan'
+
+    def ready(self):
+        import SurvivalPlan.signals  # noqa: F401
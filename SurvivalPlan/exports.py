@@ -0,0 +1,54 @@
+import csv
+import json
+
+
+EXPORT_FIELDS = ('id', 'title', 'category', 'notes', 'amount', 'date')
+
+
+class Echo:
+    """File-like object that returns what is written to it"""
+
+    def write(self, value):
+        return value
+
+
+def _chunked(rows, chunk_size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def csv_lines(expenses, chunk_size=2000):
+    """Yield CSV text for an expenses queryset, a chunk of rows at a time"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+
+    rows = expenses.values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    for chunk in _chunked(rows, chunk_size):
+        yield ''.join(
+            writer.writerow(row[:-1] + (row[-1].isoformat(),))
+            for row in chunk
+        )
+
+
+def ndjson_lines(expenses, chunk_size=2000):
+    """Yield newline delimited JSON for an expenses queryset"""
+    rows = expenses.values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    for chunk in _chunked(rows, chunk_size):
+        yield ''.join(
+            json.dumps(dict(zip(
+                EXPORT_FIELDS, row[:-1] + (row[-1].isoformat(),)
+            ))) + '\n'
+            for row in chunk
+        )
+
+
+EXPORTERS = {
+    'csv': (csv_lines, 'text/csv'),
+    'ndjson': (ndjson_lines, 'application/x-ndjson'),
+}
@@ -0,0 +1,216 @@
+from datetime import date
+
+from django.db.models import prefetch_related_objects
+
+from Goal.models import GoalResult
+from SurvivalApp.cache import data_version
+from SurvivalPlan.models import PlanItem
+from SurvivalPlan.utils import month_range
+from stats.models import MonthlySpending
+
+
+CATEGORY_GOAL_TYPES = ('save_amount_category', 'save_percent_category')
+
+
+def month_has_ended(month):
+    today = date.today()
+    return (month.year, month.month) < (today.year, today.month)
+
+
+def _planitem_amount(plan, category, items):
+    if items is not None:
+        return items.get(category)
+    try:
+        return PlanItem.objects.get(plan=plan, category=category).amount
+    except PlanItem.DoesNotExist:
+        return None
+
+
+def check_goal_status(goal, plan, user, expenses, items=None):
+    """Helper function to check if goal is achieved or not
+
+    `items` maps category to plan item amount, when it is not given the
+    plan item is looked up for category goals.
+    """
+
+    if not month_has_ended(plan.month):
+        """If month has not ended yet cannot determine goal result"""
+        return "Plan's month has not ended yet"
+
+    if goal.type == 'save_amount':
+        if (plan.income - expenses) >= goal.target_amount:
+            return "Goal Achieved"
+        else:
+            return "Goal Not Achieved"
+
+    elif goal.type == 'save_percent':
+        required_saved = (goal.target_amount / 100) * plan.income
+        actual_saved = plan.income - expenses
+
+        if actual_saved >= required_saved:
+            return "Goal Achieved"
+        else:
+            return "Goal Not Achieved"
+
+    elif goal.type == 'save_amount_category':
+        amount = _planitem_amount(plan, goal.category, items)
+        if amount is None:
+            return "No plan item with the given category, cannot achieve goal"
+
+        if (amount - expenses) >= goal.target_amount:
+            return "Goal Achieved"
+        else:
+            return "Goal Not Achieved"
+
+    elif goal.type == 'save_percent_category':
+        amount = _planitem_amount(plan, goal.category, items)
+        if amount is None:
+            return "No plan item with the given category, cannot achieve goal"
+
+        required_saved = (goal.target_amount / 100) * amount
+        actual_saved = amount - expenses
+
+        if actual_saved >= required_saved:
+            return "Goal Achieved"
+        else:
+            return "Goal Not Achieved"
+
+    return "Goal Type Not Valid"
+
+
+def spending_by_month_and_category(user_id, months):
+    """Return {month: {category: total}} for a set of months in one query"""
+    spending = {}
+    if not months:
+        return spending
+
+    rows = MonthlySpending.objects.filter(
+        user_id=user_id,
+        month__in=months
+    ).values_list('month', 'category', 'total')
+    for month, category, total in rows:
+        spending.setdefault(month, {})[category] = total
+    return spending
+
+
+def evaluate_plans(plans, user):
+    """
+    Evaluate the goals of many plans in one pass, returns
+    {plan pk: {goal pk: status}}. Plans should come with `items` and
+    `goals` prefetched, expense totals for all their months are read with
+    a single grouped query.
+    """
+    months = {
+        plan.month.replace(day=1)
+        for plan in plans if month_has_ended(plan.month)
+    }
+    spending = spending_by_month_and_category(user.pk, months)
+
+    results = {}
+    for plan in plans:
+        items = {item.category: item.amount for item in plan.items.all()}
+        month_spending = spending.get(plan.month.replace(day=1), {})
+        total = sum(month_spending.values())
+
+        results[plan.pk] = {}
+        for goal in plan.goals.all():
+            if goal.type in CATEGORY_GOAL_TYPES:
+                expenses = month_spending.get(goal.category, 0)
+            else:
+                expenses = total
+            results[plan.pk][goal.pk] = check_goal_status(
+                goal, plan, user, expenses, items
+            )
+    return results
+
+
+def goal_results(plans, user):
+    """
+    Return {plan pk: {goal pk: status}} for plans with prefetched goals.
+
+    Results of months that have ended are read from frozen GoalResult
+    rows; missing ones are evaluated in one pass and frozen for the next
+    read. Open months are always evaluated.
+
+    Every change that drops frozen results bumps the user's data version
+    first. If the version moved while the results were evaluated they
+    may come from data that has changed since, so the rows just frozen
+    are dropped again and the next read recomputes them.
+    """
+    plans = list(plans)
+    closed_ids = [plan.pk for plan in plans if month_has_ended(plan.month)]
+    version = data_version(user.pk)
+
+    results = {plan.pk: {} for plan in plans}
+    for plan_id, goal_id, result in GoalResult.objects.filter(
+        plan_id__in=closed_ids
+    ).values_list('plan_id', 'goal_id', 'status'):
+        results[plan_id][goal_id] = result
+
+    pending = [
+        plan for plan in plans
+        if any(goal.pk not in results[plan.pk] for goal in plan.goals.all())
+    ]
+    if not pending:
+        return results
+
+    prefetch_related_objects(pending, 'items')
+    evaluated = evaluate_plans(pending, user)
+
+    frozen = []
+    for plan in pending:
+        for goal_id, result in evaluated[plan.pk].items():
+            results[plan.pk][goal_id] = result
+            if plan.pk in closed_ids:
+                frozen.append(
+                    GoalResult(plan=plan, goal_id=goal_id, status=result)
+                )
+    if not frozen:
+        return results
+
+    GoalResult.objects.bulk_create(frozen, ignore_conflicts=True)
+    if data_version(user.pk) != version:
+        GoalResult.objects.filter(
+            plan_id__in={result.plan_id for result in frozen}
+        ).delete()
+
+    return results
+
+
+def freeze_goal_results(plans):
+    """Recompute and store the results of plans whose month has ended"""
+    plans = [plan for plan in plans if month_has_ended(plan.month)]
+    prefetch_related_objects(plans, 'items', 'goals', 'user')
+
+    by_user = {}
+    for plan in plans:
+        by_user.setdefault(plan.user_id, []).append(plan)
+
+    frozen = []
+    for user_plans in by_user.values():
+        evaluated = evaluate_plans(user_plans, user_plans[0].user)
+        for plan in user_plans:
+            frozen.extend(
+                GoalResult(plan=plan, goal_id=goal_id, status=result)
+                for goal_id, result in evaluated[plan.pk].items()
+            )
+
+    GoalResult.objects.bulk_create(
+        frozen,
+        update_conflicts=True,
+        unique_fields=['plan', 'goal'],
+        update_fields=['status', 'computed_at'],
+    )
+    return len(frozen)
+
+
+def invalidate_goal_results(user_id, months):
+    """Drop frozen results of a user's plans in the given months"""
+    months = {month.replace(day=1) for month in months}
+    for month in months:
+        start, end = month_range(month)
+        GoalResult.objects.filter(
+            plan__user_id=user_id,
+            plan__month__gte=start,
+            plan__month__lt=end
+        ).delete()
@@ -0,0 +1,115 @@
+import csv
+import io
+import json
+from collections import defaultdict
+
+from django.db import transaction
+from rest_framework import serializers
+
+from SurvivalApp.cache import bump_data_version
+from SurvivalPlan.goals import invalidate_goal_results, month_has_ended
+from SurvivalPlan.models import Expense
+from SurvivalPlan.serializers import ExpenseSerializer
+from stats.models import MonthlySpending
+
+
+MAX_REPORTED_ERRORS = 1000
+
+
+def read_csv_rows(upload):
+    """Yield (row number, row) from an uploaded CSV file with a header"""
+    text = io.TextIOWrapper(upload, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(text)
+    for number, row in enumerate(reader, start=1):
+        """Blank cells fall back to the field defaults"""
+        yield number, {
+            key: value for key, value in row.items()
+            if key is not None and value not in ('', None)
+        }
+
+
+def read_ndjson_rows(upload):
+    """Yield (row number, row) from an uploaded newline delimited JSON file"""
+    text = io.TextIOWrapper(upload, encoding='utf-8-sig')
+    number = 0
+    for line in text:
+        line = line.strip()
+        if not line:
+            continue
+        number += 1
+        try:
+            yield number, json.loads(line)
+        except json.JSONDecodeError:
+            yield number, None
+
+
+READERS = {
+    'csv': read_csv_rows,
+    'ndjson': read_ndjson_rows,
+    'jsonl': read_ndjson_rows,
+}
+
+
+def _insert(batch, spending):
+    Expense.objects.bulk_create(batch)
+    for expense in batch:
+        bucket = (expense.date.replace(day=1), expense.category)
+        spending[bucket][0] += expense.amount
+        spending[bucket][1] += 1
+    batch.clear()
+
+
+def import_expenses(user, rows, batch_size=1000, context=None):
+    """
+    Validate and bulk insert expenses for a user.
+
+    `rows` is an iterable of (row number, data) and is consumed lazily so
+    at most `batch_size` expenses are held in memory. Valid rows are
+    inserted in one transaction, invalid rows are reported back.
+    """
+    validator = ExpenseSerializer(context=context or {})
+    spending = defaultdict(lambda: [0, 0])
+    batch = []
+    imported = 0
+    failed = 0
+    errors = []
+
+    with transaction.atomic():
+        for number, row in rows:
+            try:
+                if not isinstance(row, dict):
+                    raise serializers.ValidationError(
+                        'Row is not a valid object.'
+                    )
+                data = validator.run_validation(row)
+            except serializers.ValidationError as exc:
+                failed += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({'row': number, 'errors': exc.detail})
+                continue
+
+            batch.append(Expense(user=user, **data))
+            imported += 1
+            if len(batch) >= batch_size:
+                _insert(batch, spending)
+
+        if batch:
+            _insert(batch, spending)
+
+        """bulk_create skips signals, keep the rollup and caches in sync"""
+        for (month, category), (amount, count) in spending.items():
+            MonthlySpending.objects.apply_delta(
+                user.pk, month, category, amount, count
+            )
+        if imported:
+            bump_data_version(user.pk)
+        invalidate_goal_results(
+            user.pk,
+            [month for month, _ in spending if month_has_ended(month)]
+        )
+
+    return {
+        'imported': imported,
+        'failed': failed,
+        'errors': errors,
+    }
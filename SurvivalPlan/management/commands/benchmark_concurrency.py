@@ -0,0 +1,282 @@
+import argparse
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from SurvivalPlan.models import SurvivalPlan, PlanItem
+from SurvivalPlan.management.commands.benchmark_endpoints import percentile
+from SurvivalPlan.management.commands.generate_synthetic_data import (
+    EMAIL_TEMPLATE,
+)
+
+User = get_user_model()
+
+"""(server, ASYNC_VIEWS) of every measured setup"""
+SETUPS = [('wsgi', False), ('asgi', False), ('asgi', True)]
+
+
+def sample_urls(user):
+    """Stats and plan goals URLs of the benchmark user's first plan"""
+    plan = (
+        SurvivalPlan.objects.filter(user=user, goals__isnull=False)
+        .order_by('month').first()
+        or SurvivalPlan.objects.filter(user=user).order_by('month').first()
+    )
+    if plan is None:
+        raise CommandError("The benchmark user has no plans")
+    item = PlanItem.objects.filter(plan=plan).order_by('id').first()
+    category = item.category if item else 'food'
+    month = plan.month.strftime('%Y-%m')
+
+    return [
+        f'/api/stats/monthly/{month}/',
+        f'/api/stats/yearly/{plan.month.year}/',
+        f'/api/stats/category/{category}/monthly/{month}/',
+        f'/api/stats/category/{category}/yearly/{plan.month.year}/',
+        f'/api/survival-plans/{plan.pk}/goals/',
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput of the stats and plan goals endpoints under "
+        "the WSGI handler with a thread pool and under the ASGI handler with "
+        "sync and async views, at high concurrency. Requests are fed to the "
+        "handlers in process, so HTTP parsing and the network are left out. "
+        "Every setup runs in its own process. The response cache is off. "
+        "Run generate_synthetic_data first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', default=EMAIL_TEMPLATE.format(0))
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=64,
+            help="Requests in flight at once",
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help="Request threads of the WSGI server",
+        )
+        parser.add_argument(
+            '--query-latency',
+            type=float,
+            default=0,
+            help=(
+                "Milliseconds added to every query, "
+                "like a database across the network"
+            ),
+        )
+        parser.add_argument(
+            '--serve', choices=['wsgi', 'asgi'], help=argparse.SUPPRESS
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options['email'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f"No user {options['email']}, "
+                "run generate_synthetic_data first"
+            )
+        urls = sample_urls(user)
+
+        if options['serve']:
+            with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, '127.0.0.1'],
+                RESPONSE_CACHE_TIMEOUT=0,
+            ):
+                result = self.serve(options['serve'], user, urls, options)
+            self.stdout.write(json.dumps(result))
+            return
+
+        self.stdout.write(
+            f"{options['requests']} requests, "
+            f"{options['concurrency']} in flight, "
+            f"{options['threads']} WSGI threads, "
+            f"{options['query_latency']}ms added per query"
+        )
+        self.stdout.write(
+            f"  {'server':>6} {'views':>6} {'req/s':>8} {'p50 ms':>8} "
+            f"{'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+        )
+        for server, async_views in SETUPS:
+            result = self.run_setup(server, async_views, options)
+            self.stdout.write(
+                f"  {server:>6} {'async' if async_views else 'sync':>6} "
+                f"{result['rps']:>8.0f} {result['p50_ms']:>8.1f} "
+                f"{result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+                f"{result['errors']:>7}"
+            )
+
+    def run_setup(self, server, async_views, options):
+        """Run a setup in its own process, ASYNC_VIEWS is read at import"""
+        completed = subprocess.run(
+            [
+                sys.executable, str(settings.BASE_DIR / 'manage.py'),
+                'benchmark_concurrency',
+                '--serve', server,
+                '--email', options['email'],
+                '--requests', str(options['requests']),
+                '--concurrency', str(options['concurrency']),
+                '--threads', str(options['threads']),
+                '--query-latency', str(options['query_latency']),
+            ],
+            env={**os.environ, 'ASYNC_VIEWS': str(async_views)},
+            capture_output=True,
+            text=True,
+        )
+        if completed.returncode:
+            raise CommandError(f"{server} run failed:\n{completed.stderr}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def serve(self, server, user, urls, options):
+        authorization = f'Bearer {AccessToken.for_user(user)}'
+        if options['query_latency']:
+            self.add_query_latency(options['query_latency'] / 1000)
+        paths = [urls[i % len(urls)] for i in range(options['requests'])]
+        if server == 'wsgi':
+            run = self.run_wsgi
+        else:
+            run = self.run_asgi
+
+        """Warm up, this also freezes the goal results of closed months"""
+        run(urls, authorization, 1, options['threads'])
+
+        started = time.perf_counter()
+        timings, errors = run(
+            paths, authorization, options['concurrency'], options['threads']
+        )
+        elapsed = time.perf_counter() - started
+
+        return {
+            'rps': len(paths) / elapsed,
+            'p50_ms': percentile(timings, 50),
+            'p95_ms': percentile(timings, 95),
+            'p99_ms': percentile(timings, 99),
+            'errors': errors,
+        }
+
+    def add_query_latency(self, delay):
+        def wait(execute, sql, params, many, context):
+            time.sleep(delay)
+            return execute(sql, params, many, context)
+
+        def install(connection, **kwargs):
+            if wait not in connection.execute_wrappers:
+                connection.execute_wrappers.insert(0, wait)
+
+        connection_created.connect(install, weak=False)
+
+    def run_wsgi(self, paths, authorization, concurrency, threads):
+        """Clients queue for one of the server's request threads"""
+        application = WSGIHandler()
+        timings = []
+        errors = 0
+
+        def handle(environ):
+            status = []
+            response = application(
+                environ, lambda s, headers: status.append(s)
+            )
+            b''.join(response)
+            response.close()
+            return status[0]
+
+        def request(path):
+            nonlocal errors
+            environ = {
+                'PATH_INFO': path,
+                'HTTP_AUTHORIZATION': authorization,
+                'wsgi.input': io.BytesIO(),
+            }
+            setup_testing_defaults(environ)
+
+            started = time.perf_counter()
+            status = server.submit(handle, environ).result()
+            timings.append((time.perf_counter() - started) * 1000)
+            if not status.startswith('200'):
+                errors += 1
+
+        with ThreadPoolExecutor(max_workers=threads) as server:
+            with ThreadPoolExecutor(max_workers=concurrency) as clients:
+                list(clients.map(request, paths))
+        return timings, errors
+
+    def run_asgi(self, paths, authorization, concurrency, threads):
+        application = ASGIHandler()
+        timings = []
+        errors = 0
+
+        async def request(path):
+            nonlocal errors
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': 'GET',
+                'scheme': 'http',
+                'path': path,
+                'raw_path': path.encode(),
+                'query_string': b'',
+                'root_path': '',
+                'headers': [
+                    (b'host', b'127.0.0.1'),
+                    (b'authorization', authorization.encode()),
+                ],
+                'client': ('127.0.0.1', 0),
+                'server': ('127.0.0.1', 80),
+            }
+            body_sent = False
+            disconnected = asyncio.Event()
+            status = []
+
+            async def receive():
+                nonlocal body_sent
+                if not body_sent:
+                    body_sent = True
+                    return {
+                        'type': 'http.request', 'body': b'', 'more_body': False
+                    }
+                await disconnected.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            started = time.perf_counter()
+            await application(scope, receive, send)
+            timings.append((time.perf_counter() - started) * 1000)
+            if status[0] != 200:
+                errors += 1
+
+        async def client(queue):
+            while queue:
+                await request(queue.pop())
+
+        async def main():
+            queue = list(reversed(paths))
+            await asyncio.gather(*(client(queue) for _ in range(concurrency)))
+
+        asyncio.run(main())
+        return timings, errors
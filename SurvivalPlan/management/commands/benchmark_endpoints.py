@@ -0,0 +1,232 @@
+import json
+import logging
+import re
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.urls.resolvers import RegexPattern
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from Goal.models import Goal
+from SurvivalPlan.models import SurvivalPlan, PlanItem, Expense
+from SurvivalPlan.management.commands.generate_synthetic_data import (
+    EMAIL_TEMPLATE,
+)
+
+User = get_user_model()
+
+SKIPPED_PREFIXES = ('admin/', '__debug__/')
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    rank = max(int(round(percent / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def route_template(pattern):
+    """Turn a route or regex pattern into 'path/<name>/' form"""
+    text = str(pattern.pattern)
+    if isinstance(pattern.pattern, RegexPattern):
+        text = text.lstrip('^').rstrip('$')
+        text = re.sub(r'\(\?P<(\w+)>[^)]*\)', r'<\1>', text)
+        text = text.replace('\\', '')
+    else:
+        text = re.sub(r'<(?:\w+:)?(\w+)>', r'<\1>', text)
+    return text
+
+
+def iter_routes(patterns=None, prefix=''):
+    """Yield (template, callback) for every leaf route of the URLconf"""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        template = prefix + route_template(pattern)
+        if isinstance(pattern, URLResolver):
+            yield from iter_routes(pattern.url_patterns, template)
+        elif isinstance(pattern, URLPattern):
+            yield template, pattern.callback
+
+
+def fetch(client, url):
+    """GET a URL and read the whole body, including streamed ones"""
+    response = client.get(url)
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+def supports_get(callback):
+    actions = getattr(callback, 'actions', None)
+    if actions is not None:
+        return 'get' in actions
+    view_class = (
+        getattr(callback, 'view_class', None)
+        or getattr(callback, 'cls', None)
+    )
+    if view_class is not None:
+        return hasattr(view_class, 'get')
+    return True
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every GET route of the API with the Django test client "
+        "and print p50/p95/p99 latency, query count and peak memory as JSON. "
+        "Run generate_synthetic_data first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', default=EMAIL_TEMPLATE.format(0))
+        parser.add_argument(
+            '--requests', type=int, default=50, help="Requests per endpoint"
+        )
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help="Clear the cache before every request",
+        )
+        parser.add_argument(
+            '--output', help="Write the JSON report to this file"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            self.user = User.objects.get(email=options['email'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f"No user {options['email']}, "
+                "run generate_synthetic_data first"
+            )
+        self.samples = self.sample_values()
+
+        token = RefreshToken.for_user(self.user).access_token
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+        report = {
+            'commit': self.git_commit(),
+            'generated_at': datetime.now(timezone.utc).isoformat(),
+            'requests_per_endpoint': options['requests'],
+            'cold_cache': options['cold'],
+            'endpoints': {},
+            'skipped': [],
+        }
+
+        """4xx responses are part of the report, keep them out of the log"""
+        request_logger = logging.getLogger('django.request')
+        log_level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        with override_settings(ALLOWED_HOSTS=hosts):
+            for template, callback in iter_routes():
+                if (template.startswith(SKIPPED_PREFIXES)
+                        or '<format>' in template):
+                    continue
+                if not supports_get(callback):
+                    report['skipped'].append(template)
+                    continue
+
+                url = '/' + self.fill(template)
+                report['endpoints'][template] = self.measure(
+                    client, url, options['requests'], options['cold']
+                )
+        request_logger.setLevel(log_level)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as report_file:
+                report_file.write(output)
+        self.stdout.write(output)
+
+    def sample_values(self):
+        plan = (
+            SurvivalPlan.objects.filter(user=self.user, goals__isnull=False)
+            .order_by('month').first()
+            or SurvivalPlan.objects.filter(user=self.user)
+            .order_by('month').first()
+        )
+        if plan is None:
+            raise CommandError("The benchmark user has no plans")
+        item = PlanItem.objects.filter(plan=plan).order_by('id').first()
+        goal = (
+            plan.goals.order_by('id').first()
+            or Goal.objects.filter(user=self.user).first()
+        )
+        expense = Expense.objects.filter(user=self.user).order_by('id').first()
+
+        return {
+            'survival-plans': plan.pk,
+            'plan-items': item.pk if item else 0,
+            'expenses': expense.pk if expense else 0,
+            'goals': goal.pk if goal else 0,
+            'users': self.user.pk,
+            'goal_pk': goal.pk if goal else 0,
+            'month': plan.month.strftime('%Y-%m'),
+            'year': plan.month.year,
+            'category': item.category if item else 'food',
+        }
+
+    def fill(self, template):
+        def value(match):
+            name = match.group(1)
+            if name == 'pk':
+                resource = template[:match.start()].rstrip('/')
+                resource = resource.rsplit('/', 1)[-1]
+                return str(self.samples.get(resource, 0))
+            return str(self.samples.get(name, ''))
+
+        return re.sub(r'<(\w+)>', value, template)
+
+    def measure(self, client, url, count, cold):
+        if cold:
+            cache.clear()
+        response = fetch(client, url)
+
+        timings = []
+        for _ in range(count):
+            if cold:
+                cache.clear()
+            started = time.perf_counter()
+            fetch(client, url)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        if cold:
+            cache.clear()
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as queries:
+            fetch(client, url)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return {
+            'url': url,
+            'status': response.status_code,
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'queries': len(queries),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', 'HEAD'],
+                cwd=settings.BASE_DIR,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,102 @@
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from SurvivalPlan.models import Expense
+from SurvivalPlan.pagination import CustomPagination, KeysetPagination
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare page-number and keyset pagination latency at increasing "
+        "depths. Runs on throwaway data that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(
+                    options['rows'], options['page_size'], options['repeat']
+                )
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, rows, page_size, repeat):
+        user = User.objects.create_user(
+            email='pagination-benchmark@example.com'
+        )
+        start = date(2000, 1, 1)
+        Expense.objects.bulk_create(
+            (
+                Expense(
+                    user=user,
+                    title=f'Expense {i}',
+                    category='benchmark',
+                    amount=i % 1000,
+                    date=start + timedelta(days=i // 20),
+                )
+                for i in range(rows)
+            ),
+            batch_size=5000,
+        )
+
+        queryset = Expense.objects.filter(user=user).order_by('id')
+        factory = APIRequestFactory(SERVER_NAME='localhost')
+        pages = rows // page_size
+        depths = sorted(
+            {1, pages // 100, pages // 10, pages // 2, pages} - {0}
+        )
+
+        self.stdout.write(
+            f"{'page':>8} {'page-number ms':>15} {'keyset ms':>10}"
+        )
+        for depth in depths:
+            number_ms = self.time_page(
+                CustomPagination(),
+                queryset,
+                factory.get('/', {'page': depth, 'page_size': page_size}),
+                repeat,
+            )
+
+            """Position the cursor just before the requested page"""
+            keyset = KeysetPagination(('date', 'id'))
+            params = {'page_size': page_size}
+            if depth > 1:
+                last = (
+                    queryset.order_by('date', 'id')
+                    .values_list('date', 'id')[(depth - 1) * page_size - 1]
+                )
+                params['cursor'] = keyset.make_cursor(last, False)
+            keyset_ms = self.time_page(
+                keyset, queryset, factory.get('/', params), repeat
+            )
+
+            self.stdout.write(
+                f"{depth:>8} {number_ms:>15.2f} {keyset_ms:>10.2f}"
+            )
+
+    def time_page(self, paginator, queryset, request, repeat):
+        request = Request(request)
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(paginator.paginate_queryset(queryset, request))
+            timings.append((time.perf_counter() - started) * 1000)
+        return sorted(timings)[len(timings) // 2]
@@ -0,0 +1,207 @@
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from SurvivalPlan.management.commands.benchmark_concurrency import sample_urls
+from SurvivalPlan.management.commands.benchmark_endpoints import percentile
+from SurvivalPlan.management.commands.generate_synthetic_data import (
+    EMAIL_TEMPLATE,
+)
+
+User = get_user_model()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def get(port, path, authorization):
+    """GET a URL on a fresh connection, returns the status"""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        connection.request(
+            'GET', path, headers={'Authorization': authorization}
+        )
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Start the development server and the production profile (gunicorn "
+        "with settings_production) on the current database, then compare "
+        "their startup time and requests/sec on the stats and plan goals "
+        "endpoints over HTTP. The response cache is off. Run "
+        "generate_synthetic_data and migrate first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', default=EMAIL_TEMPLATE.format(0))
+        parser.add_argument(
+            '--duration', type=float, default=10, help="Seconds per server"
+        )
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument(
+            '--workers', type=int, default=3, help="Gunicorn workers"
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=4,
+            help="Gunicorn threads per worker",
+        )
+        parser.add_argument('--startup-timeout', type=float, default=30)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options['email'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f"No user {options['email']}, "
+                "run generate_synthetic_data first"
+            )
+        urls = sample_urls(user)
+        authorization = f'Bearer {AccessToken.for_user(user)}'
+
+        setups = [
+            ('runserver', 'SurvivalApp.settings', lambda port: [
+                sys.executable, 'manage.py', 'runserver', '--noreload',
+                f'127.0.0.1:{port}',
+            ]),
+            ('gunicorn', 'SurvivalApp.settings_production', lambda port: [
+                sys.executable, '-m', 'gunicorn',
+                '--config', 'SurvivalApp/gunicorn.conf.py',
+                '--bind', f'127.0.0.1:{port}',
+                '--workers', str(options['workers']),
+                '--threads', str(options['threads']),
+            ]),
+        ]
+
+        self.stdout.write(
+            f"{options['concurrency']} clients "
+            f"for {options['duration']:g}s per server, "
+            f"gunicorn with {options['workers']} workers "
+            f"x {options['threads']} threads"
+        )
+        self.stdout.write(
+            f"  {'server':>9} {'startup s':>9} {'req/s':>8} {'p50 ms':>8} "
+            f"{'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+        )
+        for name, settings_module, command in setups:
+            port = free_port()
+            result = self.measure(
+                command(port), settings_module, port, urls, authorization,
+                options,
+            )
+            self.stdout.write(
+                f"  {name:>9} {result['startup']:>9.2f} {result['rps']:>8.0f} "
+                f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} "
+                f"{result['p99_ms']:>8.1f} {result['errors']:>7}"
+            )
+
+    def measure(
+        self, command, settings_module, port, urls, authorization, options
+    ):
+        """The file cache is shared by the workers without a Redis server"""
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': settings_module,
+            'ALLOWED_HOSTS': '127.0.0.1',
+            'RESPONSE_CACHE_TIMEOUT': '0',
+            'CACHE_BACKEND': os.environ.get('CACHE_BACKEND', 'file'),
+            'GUNICORN_ACCESS_LOG': '',
+        }
+        """A file rather than a pipe, a full pipe would block the server"""
+        with tempfile.TemporaryFile() as log:
+            started = time.perf_counter()
+            server = subprocess.Popen(
+                command,
+                cwd=settings.BASE_DIR,
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=log,
+            )
+            try:
+                startup = self.wait_until_up(
+                    server, log, port, urls[0], authorization, started, options
+                )
+                return {
+                    'startup': startup,
+                    **self.load(port, urls, authorization, options),
+                }
+            finally:
+                server.terminate()
+                try:
+                    server.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    server.kill()
+
+    def wait_until_up(
+        self, server, log, port, path, authorization, started, options
+    ):
+        """Seconds until the server answers its first request"""
+        while time.perf_counter() - started < options['startup_timeout']:
+            if server.poll() is not None:
+                log.seek(0)
+                raise CommandError(f"Server exited:\n{log.read().decode()}")
+            try:
+                status = get(port, path, authorization)
+            except OSError:
+                time.sleep(0.05)
+                continue
+            if status != 200:
+                raise CommandError(f"{path} answered {status}")
+            return time.perf_counter() - started
+        raise CommandError("Server did not start in time")
+
+    def load(self, port, urls, authorization, options):
+        deadline = time.perf_counter() + options['duration']
+        timings = []
+        errors = 0
+        lock = threading.Lock()
+
+        def client(offset):
+            nonlocal errors
+            i = offset
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    ok = get(port, urls[i % len(urls)], authorization) == 200
+                except OSError:
+                    ok = False
+                with lock:
+                    timings.append((time.perf_counter() - started) * 1000)
+                    errors += not ok
+                i += 1
+
+        clients = [
+            threading.Thread(target=client, args=(i,))
+            for i in range(options['concurrency'])
+        ]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+
+        return {
+            'rps': len(timings) / options['duration'],
+            'p50_ms': percentile(timings, 50),
+            'p95_ms': percentile(timings, 95),
+            'p99_ms': percentile(timings, 99),
+            'errors': errors,
+        }
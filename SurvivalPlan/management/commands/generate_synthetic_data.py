@@ -0,0 +1,192 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from Goal.models import Goal
+from SurvivalApp.cache import bump_data_version
+from SurvivalPlan.models import SurvivalPlan, PlanItem, Expense
+from SurvivalPlan.utils import add_months, parse_month
+from stats.models import MonthlySpending
+
+User = get_user_model()
+
+EMAIL_TEMPLATE = 'bench-user-{}@example.com'
+PASSWORD = 'bench-password'
+CATEGORIES = [
+    'rent', 'food', 'transport', 'utilities', 'health', 'education',
+    'entertainment', 'clothes', 'gifts', 'travel', 'savings', 'other',
+]
+GOAL_TYPES = [
+    'save_amount', 'save_percent',
+    'save_amount_category', 'save_percent_category',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a deterministic synthetic dataset for benchmarks. Users "
+        f"are named {EMAIL_TEMPLATE.format('N')} with password {PASSWORD}, "
+        "the first one is staff."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--plans-per-user', type=int, default=24)
+        parser.add_argument('--items-per-plan', type=int, default=8)
+        parser.add_argument('--expenses-per-month', type=int, default=100)
+        parser.add_argument(
+            '--goals', type=int, default=10, help="Goals per user"
+        )
+        parser.add_argument(
+            '--start', default='2023-01', help="First plan month (YYYY-MM)"
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help="Delete previously generated benchmark users first",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start = parse_month(options['start'])
+        except ValueError:
+            raise CommandError("--start must be YYYY-MM")
+        if options['items_per_plan'] > len(CATEGORIES):
+            raise CommandError(
+                f"--items-per-plan can be at most {len(CATEGORIES)}"
+            )
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        with transaction.atomic():
+            if options['clear']:
+                deleted, _ = User.objects.filter(
+                    email__startswith=EMAIL_TEMPLATE.split('{}')[0]
+                ).delete()
+                self.stdout.write(f"Deleted {deleted} previous rows")
+
+            users = self.create_users(options['users'])
+            plans = self.create_plans(users, start, options['plans_per_user'])
+            items = self.create_items(plans, options['items_per_plan'])
+            expenses = self.create_expenses(
+                plans, options['expenses_per_month']
+            )
+            goals = self.create_goals(users, plans, options['goals'])
+
+            """bulk_create skips signals, so refresh the derived data here"""
+            for user in users:
+                MonthlySpending.objects.rebuild(user)
+            SurvivalPlan.objects.repair_allocated_totals(
+                SurvivalPlan.objects.filter(user__in=users)
+            )
+            bump_data_version(*(user.pk for user in users))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(users)} users, {len(plans)} plans, "
+            f"{items} plan items, "
+            f"{expenses} expenses and {goals} goals"
+        ))
+
+    def create_users(self, count):
+        password = make_password(PASSWORD)
+        User.objects.bulk_create(
+            [
+                User(
+                    email=EMAIL_TEMPLATE.format(i),
+                    name=f'Bench User {i}',
+                    password=password,
+                    is_staff=(i == 0),
+                )
+                for i in range(count)
+            ],
+            batch_size=self.batch_size,
+        )
+        return list(User.objects.filter(
+            email__in=[EMAIL_TEMPLATE.format(i) for i in range(count)]
+        ).order_by('id'))
+
+    def create_plans(self, users, start, per_user):
+        SurvivalPlan.objects.bulk_create(
+            [
+                SurvivalPlan(
+                    user=user,
+                    title=f'Plan {add_months(start, i):%Y-%m}',
+                    income=self.rng.randrange(2000, 10000, 100),
+                    month=add_months(start, i),
+                )
+                for user in users
+                for i in range(per_user)
+            ],
+            batch_size=self.batch_size,
+        )
+        return list(
+            SurvivalPlan.objects.filter(user__in=users)
+            .order_by('user_id', 'month')
+        )
+
+    def create_items(self, plans, per_plan):
+        items = []
+        for plan in plans:
+            amount = plan.income // (per_plan + 1)
+            for category in self.rng.sample(CATEGORIES, per_plan):
+                items.append(
+                    PlanItem(plan=plan, category=category, amount=amount)
+                )
+        PlanItem.objects.bulk_create(items, batch_size=self.batch_size)
+        return len(items)
+
+    def create_expenses(self, plans, per_month):
+        total = 0
+        batch = []
+        for plan in plans:
+            for i in range(per_month):
+                batch.append(Expense(
+                    user_id=plan.user_id,
+                    title=f'Expense {i}',
+                    category=self.rng.choice(CATEGORIES),
+                    amount=self.rng.randint(1, plan.income // 50),
+                    date=plan.month.replace(day=self.rng.randint(1, 28)),
+                ))
+            if len(batch) >= self.batch_size:
+                Expense.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        Expense.objects.bulk_create(batch)
+        return total + len(batch)
+
+    def create_goals(self, users, plans, per_user):
+        goals = []
+        for user in users:
+            for i in range(per_user):
+                goal_type = GOAL_TYPES[i % len(GOAL_TYPES)]
+                percent = goal_type.startswith('save_percent')
+                goals.append(Goal(
+                    user=user,
+                    title=f'Goal {i}',
+                    type=goal_type,
+                    target_amount=self.rng.randint(5, 40) if percent
+                    else self.rng.randrange(100, 2000, 50),
+                    category=self.rng.choice(CATEGORIES)
+                    if goal_type.endswith('category') else '',
+                ))
+        Goal.objects.bulk_create(goals, batch_size=self.batch_size)
+
+        goals_by_user = {}
+        for goal in Goal.objects.filter(user__in=users).order_by('id'):
+            goals_by_user.setdefault(goal.user_id, []).append(goal.pk)
+
+        Goal.plans.through.objects.bulk_create(
+            [
+                Goal.plans.through(goal_id=goal_id, survivalplan_id=plan.pk)
+                for plan in plans
+                for goal_id in goals_by_user.get(plan.user_id, [])
+            ],
+            batch_size=self.batch_size,
+        )
+        return len(goals)
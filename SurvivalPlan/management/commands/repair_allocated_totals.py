@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from SurvivalPlan.models import SurvivalPlan
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Repair or verify each plan's allocated_total against its items"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help="Only report plans out of sync, do not write",
+        )
+        parser.add_argument(
+            '--user',
+            help="Email of a single user whose plans to check",
+        )
+
+    def handle(self, *args, **options):
+        plans = SurvivalPlan.objects.all()
+        if options['user']:
+            try:
+                user = User.objects.get(email=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"No user with email {options['user']}")
+            plans = plans.filter(user=user)
+
+        if options['verify']:
+            self.verify(plans)
+            return
+
+        repaired = SurvivalPlan.objects.repair_allocated_totals(plans)
+        for plan in repaired:
+            self.stdout.write(f"plan={plan.pk}: set to {plan.allocated_total}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Repaired {len(repaired)} plans")
+        )
+
+    def verify(self, plans):
+        mismatches = 0
+        plans = SurvivalPlan.objects.expected_totals(plans)
+        for plan in plans.only('id', 'allocated_total').order_by('id'):
+            if plan.allocated_total != plan.expected_total:
+                mismatches += 1
+                self.stdout.write(
+                    f"plan={plan.pk}: expected {plan.expected_total}, "
+                    f"stored {plan.allocated_total}"
+                )
+
+        if mismatches:
+            raise CommandError(f"{mismatches} plans out of sync")
+
+        self.stdout.write(
+            self.style.SUCCESS("Allocated totals match plan items")
+        )
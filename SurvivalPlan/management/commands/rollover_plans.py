@@ -0,0 +1,67 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from SurvivalPlan.models import SurvivalPlan
+from SurvivalPlan.rollover import MAX_ROLLOVER_MONTHS, rollover_plans
+from SurvivalPlan.utils import add_months, month_range, parse_month
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy every user's plan of a month forward to the following months. "
+        "Users who already have a plan in a target month are skipped, so it "
+        "is safe to run from cron at the start of every month."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month',
+            help=(
+                "Month to copy from (YYYY-MM), defaults to the previous month"
+            ),
+        )
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=1,
+            help="Number of following months to copy to",
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['month']:
+            try:
+                source = parse_month(options['month'])
+            except ValueError:
+                raise CommandError("--month must be YYYY-MM")
+        else:
+            source = add_months(date.today(), -1)
+
+        if not 1 <= options['months'] <= MAX_ROLLOVER_MONTHS:
+            raise CommandError(
+                f"--months must be between 1 and {MAX_ROLLOVER_MONTHS}"
+            )
+        months = [
+            add_months(source, i) for i in range(1, options['months'] + 1)
+        ]
+
+        start, end = month_range(source)
+        plan_ids = list(
+            SurvivalPlan.objects
+            .filter(month__gte=start, month__lt=end)
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+
+        created = 0
+        for i in range(0, len(plan_ids), options['batch_size']):
+            batch = SurvivalPlan.objects.filter(
+                pk__in=plan_ids[i:i + options['batch_size']]
+            )
+            created += len(rollover_plans(batch, months))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {created} plans "
+            f"from {len(plan_ids)} plans of {source:%Y-%m}"
+        ))
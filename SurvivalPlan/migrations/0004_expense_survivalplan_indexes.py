@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SurvivalPlan', '0003_remove_planitem_plan_planitem_plan'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['user', 'date'], name='expense_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['user', 'category', 'date'], name='expense_user_category_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='survivalplan',
+            index=models.Index(fields=['user', 'month'], name='plan_user_month_idx'),
+        ),
+    ]
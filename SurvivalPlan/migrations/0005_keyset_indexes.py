@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SurvivalPlan', '0004_expense_survivalplan_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='expense',
+            name='expense_user_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='survivalplan',
+            name='plan_user_month_idx',
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['user', 'date', 'id'], name='expense_user_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='survivalplan',
+            index=models.Index(fields=['user', 'month', 'id'], name='plan_user_month_id_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:29
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def populate(apps, schema_editor):
+    SurvivalPlan = apps.get_model('SurvivalPlan', 'SurvivalPlan')
+    PlanItem = apps.get_model('SurvivalPlan', 'PlanItem')
+
+    items = (
+        PlanItem.objects
+        .filter(plan=OuterRef('pk'))
+        .order_by()
+        .values('plan')
+        .annotate(total=Sum('amount'))
+        .values('total')
+    )
+    SurvivalPlan.objects.update(
+        allocated_total=Coalesce(Subquery(items), Value(0))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SurvivalPlan', '0005_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survivalplan',
+            name='allocated_total',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
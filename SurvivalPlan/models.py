@@ -1,9 +1,77 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Sum, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 from datetime import date
 User = get_user_model()
 
 
+class AllocationExceeded(Exception):
+    """Raised when plan items would be allocated more than the plan's income"""
+
+    def __init__(self, excess):
+        super().__init__(f"Allocation exceeds the income by ({excess})")
+        self.excess = excess
+
+
+class SurvivalPlanManager(models.Manager):
+    """Manager keeping allocated_total in sync with the plan items"""
+
+    def allocate(self, plan_id, amount):
+        """Add amount to the plan's allocated total without passing its income
+
+        The check and the increment are a single UPDATE, so concurrent item
+        writes serialize on the plan row instead of both passing the check.
+        """
+        plan = self.filter(pk=plan_id)
+        if amount > 0:
+            plan = plan.filter(allocated_total__lte=F('income') - amount)
+
+        updated = plan.update(allocated_total=F('allocated_total') + amount)
+        if updated or amount <= 0:
+            return
+
+        current = (
+            self.filter(pk=plan_id)
+            .values_list('allocated_total', 'income').first()
+        )
+        if current is not None:
+            allocated, income = current
+            raise AllocationExceeded(allocated + amount - income)
+
+    def expected_totals(self, plans=None):
+        """Annotate plans with the sum of their items"""
+        if plans is None:
+            plans = self.all()
+        items = (
+            PlanItem.objects
+            .filter(plan=OuterRef('pk'))
+            .order_by()
+            .values('plan')
+            .annotate(total=Sum('amount'))
+            .values('total')
+        )
+        return plans.annotate(
+            expected_total=Coalesce(Subquery(items), Value(0))
+        )
+
+    @transaction.atomic
+    def repair_allocated_totals(self, plans=None):
+        """Recompute allocated_total from the items, returns plans fixed"""
+        if plans is None:
+            plans = self.all()
+        stale = [
+            plan
+            for plan in self.expected_totals(plans.select_for_update())
+            .only('id', 'allocated_total')
+            if plan.allocated_total != plan.expected_total
+        ]
+        for plan in stale:
+            plan.allocated_total = plan.expected_total
+        self.bulk_update(stale, ['allocated_total'], batch_size=1000)
+        return stale
+
+
 class SurvivalPlan(models.Model):
     user = models.ForeignKey(
         User,
@@ -14,6 +82,34 @@ class SurvivalPlan(models.Model):
     notes = models.TextField(blank=True)
     income = models.PositiveIntegerField()
     month = models.DateField()
+    """Sum of the plan's item amounts, maintained on every item write"""
+    allocated_total = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = SurvivalPlanManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'month', 'id'], name='plan_user_month_id_idx'
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Save without writing back a possibly stale allocated_total
+
+        allocated_total is only changed by the manager's guarded UPDATEs;
+        an update from a loaded instance would otherwise overwrite the
+        item writes that happened since it was read.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.attname not in deferred
+                and field.name != 'allocated_total'
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         """Overriding the str opperator"""
@@ -30,6 +126,15 @@ class PlanItem(models.Model):
     notes = models.TextField(blank=True)
     amount = models.PositiveIntegerField()
 
+    def save(self, *args, **kwargs):
+        """Save inside a transaction so allocated_total stays consistent"""
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            return super().delete(*args, **kwargs)
+
     def __str__(self):
         """Overriding the str opperator"""
         return self.category
@@ -47,6 +152,22 @@ class Expense(models.Model):
     amount = models.PositiveIntegerField(default=0)
     date = models.DateField(default=date.today)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'date', 'id'], name='expense_user_date_id_idx'
+            ),
+            models.Index(
+                fields=['user', 'category', 'date'],
+                name='expense_user_category_date_idx',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Save inside a transaction so derived rollups stay consistent"""
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
     def __str__(self):
         """Overriding the str opperator"""
         return self.title
@@ -0,0 +1,167 @@
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class CustomPagination(PageNumberPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a unique composite ordering such as (date, id).
+
+    Pages are fetched with `WHERE (date, id) > (last date, last id)` style
+    filters instead of OFFSET and without a COUNT query, so every page
+    costs the same index range scan no matter how deep it is.
+    """
+    page_size = CustomPagination.page_size
+    page_size_query_param = CustomPagination.page_size_query_param
+    max_page_size = CustomPagination.max_page_size
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering=('id',)):
+        self.ordering = tuple(ordering)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def make_cursor(self, values, reverse):
+        """Return the opaque cursor pointing after (or before) values"""
+        payload = json.dumps([[str(value) for value in values], reverse])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def encode_cursor(self, values, reverse):
+        cursor = self.make_cursor(values, reverse)
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, cursor
+        )
+
+    def decode_cursor(self, request, model):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor is None:
+            return None, False
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if not isinstance(payload, list) or len(payload) != 2:
+                raise ValueError
+            values, reverse = payload
+            if (not isinstance(values, list)
+                    or len(values) != len(self.ordering)):
+                raise ValueError
+            values = [
+                model._meta.get_field(name).to_python(value)
+                for name, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, AttributeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return values, bool(reverse)
+
+    def keyset_filter(self, values, reverse):
+        """Build `(f1, f2, ...) > (v1, v2, ...)` out of Q objects"""
+        lookup, leading_lookup = ('lt', 'lte') if reverse else ('gt', 'gte')
+        conditions = []
+        for i, name in enumerate(self.ordering):
+            equal = {
+                field: values[j]
+                for j, field in enumerate(self.ordering[:i])
+            }
+            conditions.append(Q(**equal, **{f'{name}__{lookup}': values[i]}))
+
+        """Leading range condition lets the database seek into the index"""
+        leading = Q(**{f'{self.ordering[0]}__{leading_lookup}': values[0]})
+        return leading & reduce(or_, conditions)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request, queryset.model)
+
+        if reverse:
+            queryset = queryset.order_by(
+                *(f'-{name}' for name in self.ordering)
+            )
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(position, reverse))
+
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+
+        self.next_link = None
+        self.previous_link = None
+        if results:
+            first = [getattr(results[0], name) for name in self.ordering]
+            last = [getattr(results[-1], name) for name in self.ordering]
+            if has_more or reverse:
+                self.next_link = self.encode_cursor(last, False)
+            if ((has_more and reverse)
+                    or (position is not None and not reverse)):
+                self.previous_link = self.encode_cursor(first, True)
+
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.next_link,
+            'previous': self.previous_link,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {
+                    'type': 'string', 'nullable': True, 'format': 'uri'
+                },
+                'results': schema,
+            },
+        }
+
+
+class KeysetPaginationMixin:
+    """
+    Lets a viewset switch to keyset pagination per request with
+    `?pagination=cursor` (or by passing a cursor), keeping page-number
+    pagination as the default.
+    """
+    keyset_ordering = ('id',)
+
+    def uses_keyset_pagination(self):
+        params = self.request.query_params
+        return (params.get('pagination') == 'cursor'
+                or KeysetPagination.cursor_query_param in params)
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.pagination_class is None:
+                self._paginator = None
+            elif self.uses_keyset_pagination():
+                self._paginator = KeysetPagination(self.keyset_ordering)
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
@@ -0,0 +1,33 @@
+"""
+Stored values of an expense about to be updated.
+
+Receivers of several apps move derived data (the stats rollup, frozen
+goal results) from an expense's old month and category to its new ones,
+so they need the row as it was before the save. Every signals module
+that reads it imports this one, which registers the pre_save receiver
+whichever app is loaded first.
+"""
+from django.db.models.signals import pre_save
+from django.dispatch import receiver
+
+from SurvivalPlan.models import Expense
+
+
+@receiver(pre_save, sender=Expense)
+def remember_previous_expense(sender, instance, raw=False, **kwargs):
+    """Keep the stored values so derived data can be moved on update"""
+    instance._previous_values = None
+    if raw or instance.pk is None:
+        return
+
+    instance._previous_values = (
+        Expense.objects
+        .filter(pk=instance.pk)
+        .values_list('user_id', 'date', 'category', 'amount')
+        .first()
+    )
+
+
+def previous_expense(instance):
+    """Return (user_id, date, category, amount) as stored, or None"""
+    return getattr(instance, '_previous_values', None)
@@ -0,0 +1,86 @@
+"""
+Copy plans forward to later months.
+
+A copy carries the plan's fields, its items and its goal links. Everything
+is written with bulk inserts in one transaction, a few queries no matter
+how many plans, items or months are copied.
+"""
+from django.db import transaction
+from django.db.models import Prefetch
+
+from Goal.models import Goal
+from SurvivalApp.cache import bump_data_version
+from SurvivalPlan.models import SurvivalPlan, PlanItem
+from SurvivalPlan.utils import month_range
+
+MAX_ROLLOVER_MONTHS = 24
+
+
+@transaction.atomic
+def rollover_plans(plans, months, batch_size=1000):
+    """Copy each plan to each of the months, returns the new plans
+
+    Months where the plan's owner already has a plan are skipped so the
+    one plan per month rule holds.
+    """
+    plans = list(plans.prefetch_related(
+        'items',
+        Prefetch('goals', queryset=Goal.objects.only('id')),
+    ))
+    if not plans or not months:
+        return []
+
+    """Plans may be dated any day of their month, match whole months"""
+    taken = {
+        (user_id, month.replace(day=1))
+        for user_id, month in SurvivalPlan.objects.filter(
+            user_id__in={plan.user_id for plan in plans},
+            month__gte=min(months),
+            month__lt=month_range(max(months))[1],
+        ).values_list('user_id', 'month')
+    }
+
+    copies = []
+    for plan in plans:
+        items = plan.items.all()
+        for month in months:
+            if (plan.user_id, month) in taken:
+                continue
+            taken.add((plan.user_id, month))
+            copies.append((plan, SurvivalPlan(
+                user_id=plan.user_id,
+                title=plan.title,
+                notes=plan.notes,
+                income=plan.income,
+                month=month,
+                allocated_total=sum(item.amount for item in items),
+            )))
+    if not copies:
+        return []
+
+    SurvivalPlan.objects.bulk_create(
+        [copy for _, copy in copies], batch_size=batch_size
+    )
+    PlanItem.objects.bulk_create(
+        [
+            PlanItem(
+                plan=copy, category=item.category,
+                notes=item.notes, amount=item.amount,
+            )
+            for plan, copy in copies
+            for item in plan.items.all()
+        ],
+        batch_size=batch_size,
+    )
+    Goal.plans.through.objects.bulk_create(
+        [
+            Goal.plans.through(goal_id=goal.pk, survivalplan_id=copy.pk)
+            for plan, copy in copies
+            for goal in plan.goals.all()
+        ],
+        batch_size=batch_size,
+    )
+
+    """bulk_create skips signals"""
+    bump_data_version(*{copy.user_id for _, copy in copies})
+    return [copy for _, copy in copies]
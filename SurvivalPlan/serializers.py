@@ -1,15 +1,21 @@
 from SurvivalPlan.models import (
+    AllocationExceeded,
     PlanItem,
     SurvivalPlan,
     Expense
 )
 from Goal.models import Goal
+from Goal.models import GoalResult
+from SurvivalPlan.utils import month_range
+from SurvivalApp.cache import bump_data_version
+from SurvivalApp.profiling import ProfiledSerializerMixin
 
+from django.db import transaction
 from rest_framework import serializers
 from datetime import date
 
 
-class PlanItemSerializer(serializers.ModelSerializer):
+class PlanItemSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     """Serialzer for planitems"""
     class Meta:
         model = PlanItem
@@ -30,17 +36,16 @@ class PlanItemSerializer(serializers.ModelSerializer):
                 if user != plan.user:
                     raise serializers.ValidationError("You do not own the selected plan.")
 
-                related_items = PlanItem.objects.filter(plan=plan)
-                total_with_new = new_amount + sum(item.amount for item in related_items)
-
+                total_with_new = plan.allocated_total + new_amount
                 if total_with_new > plan.income:
                     raise serializers.ValidationError(
                         "Moving this item will exceed the new plan's income "
                         f"by ({total_with_new - plan.income})"
                     )
             else:
-                related_items = PlanItem.objects.filter(plan=plan).exclude(pk=self.instance.pk)
-                total_with_new = new_amount + sum(item.amount for item in related_items)
+                total_with_new = (
+                    plan.allocated_total - self.instance.amount + new_amount
+                )
                 if total_with_new > plan.income:
                     raise serializers.ValidationError(
                         "Editing this item will exceed the income "
@@ -55,8 +60,7 @@ class PlanItemSerializer(serializers.ModelSerializer):
             if user != plan.user:
                 raise serializers.ValidationError("You do not own the selected plan.")
 
-            related_items = PlanItem.objects.filter(plan=plan)
-            total_with_new = new_amount + sum(item.amount for item in related_items)
+            total_with_new = plan.allocated_total + new_amount
             if total_with_new > plan.income:
                 raise serializers.ValidationError(
                     f"Adding this item will exceed the income by ({total_with_new - plan.income})"
@@ -64,15 +68,128 @@ class PlanItemSerializer(serializers.ModelSerializer):
 
         return attrs
 
+    def create(self, validated_data):
+        try:
+            return super().create(validated_data)
+        except AllocationExceeded as e:
+            """Another request allocated the income since validation"""
+            raise serializers.ValidationError(
+                f"Adding this item will exceed the income by ({e.excess})"
+            )
+
+    def update(self, instance, validated_data):
+        try:
+            return super().update(instance, validated_data)
+        except AllocationExceeded as e:
+            raise serializers.ValidationError(
+                f"Editing this item will exceed the income by ({e.excess})"
+            )
+
+
+class PlanItemListSerializer(serializers.ListSerializer):
+    """Replace all items of the plan in context with the given list"""
+
+    def validate(self, attrs):
+        ids = [item['id'] for item in attrs if 'id' in item]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Duplicate item ids.")
+
+        plan = self.context['plan']
+        total = sum(item['amount'] for item in attrs)
+        if total > plan.income:
+            raise serializers.ValidationError(
+                "These items will exceed the income "
+                f"by ({total - plan.income})"
+            )
+        return attrs
+
+    def update(self, instance, validated_data):
+        plan = self.context['plan']
+        total = sum(item['amount'] for item in validated_data)
+
+        with transaction.atomic():
+            """Lock the plan so single item writes wait for the replace"""
+            income = (
+                SurvivalPlan.objects.select_for_update()
+                .values_list('income', flat=True).get(pk=plan.pk)
+            )
+            if total > income:
+                raise serializers.ValidationError(
+                    f"These items will exceed the income by ({total - income})"
+                )
+
+            existing = {item.pk: item for item in instance}
+            unknown = {
+                item['id'] for item in validated_data if 'id' in item
+            } - existing.keys()
+            if unknown:
+                raise serializers.ValidationError(
+                    f"Items not in this plan: {sorted(unknown)}"
+                )
+
+            items, created, updated = [], [], []
+            for data in validated_data:
+                if 'id' not in data:
+                    item = PlanItem(plan=plan, **data)
+                    created.append(item)
+                else:
+                    item = existing.pop(data['id'])
+                    changed = [
+                        field for field, value in data.items()
+                        if getattr(item, field) != value
+                    ]
+                    if changed:
+                        for field in changed:
+                            setattr(item, field, data[field])
+                        updated.append(item)
+                items.append(item)
+
+            """
+            The delete still sends signals, the bulk writes do not; derived
+            data is refreshed once below, overwriting what the signals did.
+            """
+            if existing:
+                PlanItem.objects.filter(pk__in=existing).delete()
+            if updated:
+                PlanItem.objects.bulk_update(
+                    updated, ['category', 'notes', 'amount']
+                )
+            if created:
+                PlanItem.objects.bulk_create(created)
+
+            SurvivalPlan.objects.filter(pk=plan.pk).update(
+                allocated_total=total
+            )
+            bump_data_version(plan.user_id)
+            GoalResult.objects.filter(plan_id=plan.pk).delete()
+
+        return items
 
-class SurvivalPlanSerializer(serializers.ModelSerializer):
-    """Serialzer for survivalplans"""
+
+class PlanItemReplaceSerializer(serializers.ModelSerializer):
+    """Serializer for one entry of a plan's full item list"""
+    id = serializers.IntegerField(required=False)
+
+    class Meta:
+        model = PlanItem
+        fields = ['id', 'category', 'notes', 'amount']
+        list_serializer_class = PlanItemListSerializer
+
+
+class SurvivalPlanSerializer(
+    ProfiledSerializerMixin, serializers.ModelSerializer
+):
+    """Serialzer for survivalplans
+
+    allocated_total, the sum of the plan's item amounts, is returned
+    read-only; it is maintained by the item writes.
+    """
     items = PlanItemSerializer(many=True, read_only=True)
 
     class Meta:
         model = SurvivalPlan
         fields = '__all__'
-        read_only_fields = ['user']
+        read_only_fields = ['user', 'allocated_total']
 
     goals = serializers.PrimaryKeyRelatedField(
         many=True,
@@ -97,12 +214,12 @@ class SurvivalPlanSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         user = request.user
 
-        normalized_month = date(value.year, value.month, 1)
+        normalized_month, end = month_range(value)
 
         if SurvivalPlan.objects.filter(
             user=user,
-            month__year=normalized_month.year,
-            month__month=normalized_month.month
+            month__gte=normalized_month,
+            month__lt=end
         ).exists():
             raise serializers.ValidationError("A plan already exists for this month.")
 
@@ -131,7 +248,7 @@ class SurvivalPlanSerializer(serializers.ModelSerializer):
         return data
 
 
-class ExpenseSerializer(serializers.ModelSerializer):
+class ExpenseSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     """Serialzer for expenses"""
     class Meta:
         model = Expense
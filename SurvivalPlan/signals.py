@@ -0,0 +1,100 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from Goal.models import GoalResult
+from SurvivalApp.cache import bump_data_version
+from SurvivalPlan.goals import invalidate_goal_results, month_has_ended
+from SurvivalPlan.models import SurvivalPlan, PlanItem, Expense
+from SurvivalPlan.previous import previous_expense
+
+
+@receiver(pre_save, sender=PlanItem)
+def remember_previous_item(sender, instance, raw=False, **kwargs):
+    instance._previous_item = None
+    if raw or instance.pk is None:
+        return
+
+    instance._previous_item = (
+        PlanItem.objects
+        .filter(pk=instance.pk)
+        .values_list('plan_id', 'amount')
+        .first()
+    )
+
+
+@receiver(post_save, sender=PlanItem)
+def allocate_item(sender, instance, raw=False, **kwargs):
+    """Raises AllocationExceeded, rolling the item save back"""
+    if raw:
+        return
+
+    previous = getattr(instance, '_previous_item', None)
+    if previous is None:
+        SurvivalPlan.objects.allocate(instance.plan_id, instance.amount)
+        return
+
+    previous_plan_id, previous_amount = previous
+    if previous_plan_id == instance.plan_id:
+        if instance.amount != previous_amount:
+            SurvivalPlan.objects.allocate(
+                instance.plan_id, instance.amount - previous_amount
+            )
+        return
+
+    SurvivalPlan.objects.allocate(previous_plan_id, -previous_amount)
+    SurvivalPlan.objects.allocate(instance.plan_id, instance.amount)
+
+
+@receiver(post_delete, sender=PlanItem)
+def release_item(sender, instance, **kwargs):
+    SurvivalPlan.objects.allocate(instance.plan_id, -instance.amount)
+
+
+@receiver([post_save, post_delete], sender=Expense)
+@receiver([post_save, post_delete], sender=SurvivalPlan)
+def invalidate_owner_cache(sender, instance, **kwargs):
+    bump_data_version(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=PlanItem)
+def invalidate_plan_owner_cache(sender, instance, **kwargs):
+    bump_data_version(
+        SurvivalPlan.objects
+        .filter(pk=instance.plan_id)
+        .values_list('user_id', flat=True)
+        .first()
+    )
+
+
+@receiver([post_save, post_delete], sender=Expense)
+def invalidate_expense_goal_results(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    expense_date = Expense._meta.get_field('date').to_python(instance.date)
+    months = [expense_date]
+    previous = previous_expense(instance)
+    if previous is not None:
+        months.append(previous[1])
+
+    closed = [month for month in months if month_has_ended(month)]
+    if closed:
+        invalidate_goal_results(instance.user_id, closed)
+
+
+@receiver(post_save, sender=SurvivalPlan)
+def invalidate_plan_goal_results(
+    sender, instance, created, raw=False, **kwargs
+):
+    if not created and not raw:
+        GoalResult.objects.filter(plan=instance).delete()
+
+
+@receiver([post_save, post_delete], sender=PlanItem)
+def invalidate_item_goal_results(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    previous = getattr(instance, '_previous_item', None)
+    plan_ids = {instance.plan_id, previous and previous[0]}
+    GoalResult.objects.filter(plan_id__in=plan_ids - {None}).delete()
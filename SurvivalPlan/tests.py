@@ -0,0 +1,995 @@
+import base64
+import json
+import time
+from datetime import date
+from io import StringIO
+from unittest import mock, skipUnless
+from urllib.parse import urlencode
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.test import TestCase
+from django.utils.http import parse_http_date
+from rest_framework.test import (
+    APIClient,
+    APIRequestFactory,
+    force_authenticate,
+)
+
+from Goal.models import Goal, GoalResult
+from stats.models import MonthlySpending
+
+from SurvivalPlan.goals import evaluate_plans
+from SurvivalPlan.models import (
+    AllocationExceeded,
+    SurvivalPlan,
+    PlanItem,
+    Expense,
+)
+from SurvivalPlan.pagination import KeysetPagination
+from SurvivalPlan.utils import month_range, parse_month
+from SurvivalPlan.views import AsyncSurvivalPlanGoalsView
+
+User = get_user_model()
+
+
+class MonthRangeTests(TestCase):
+    """Tests for the month range helpers"""
+
+    def test_parse_month(self):
+        self.assertEqual(parse_month('2025-03'), date(2025, 3, 1))
+
+    def test_parse_month_invalid(self):
+        with self.assertRaises(ValueError):
+            parse_month('2025-13')
+
+    def test_month_range_is_half_open(self):
+        self.assertEqual(
+            month_range(date(2025, 3, 17)),
+            (date(2025, 3, 1), date(2025, 4, 1))
+        )
+
+    def test_month_range_december(self):
+        self.assertEqual(
+            month_range(date(2025, 12, 31)),
+            (date(2025, 12, 1), date(2026, 1, 1))
+        )
+
+
+@skipUnless(
+    connection.vendor == 'sqlite', 'EXPLAIN output checked is SQLite specific'
+)
+class MonthFilterIndexTests(TestCase):
+    """Tests that month filters are served by the composite indexes"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='user@example.com', password='pass12345'
+        )
+        self.start, self.end = month_range(date(2025, 3, 1))
+
+    def test_expense_month_filter_uses_user_date_id_index(self):
+        plan = Expense.objects.filter(
+            user=self.user, date__gte=self.start, date__lt=self.end
+        ).explain()
+
+        self.assertIn('expense_user_date_id_idx', plan)
+
+    def test_expense_category_filter_uses_user_category_date_index(self):
+        plan = Expense.objects.filter(
+            user=self.user, category='food',
+            date__gte=self.start, date__lt=self.end
+        ).explain()
+
+        self.assertIn('expense_user_category_date_idx', plan)
+
+    def test_plan_month_filter_uses_user_month_id_index(self):
+        plan = SurvivalPlan.objects.filter(
+            user=self.user, month__gte=self.start, month__lt=self.end
+        ).explain()
+
+        self.assertIn('plan_user_month_id_idx', plan)
+
+
+class SurvivalPlanGoalsCacheTests(TestCase):
+    """Tests for caching of the plan goal status endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='user@example.com', password='pass12345'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.plan = SurvivalPlan.objects.create(
+            user=self.user, title='March', income=1000, month=date(2025, 3, 1)
+        )
+        self.url = f'/api/survival-plans/{self.plan.pk}/goals/'
+
+    def test_linking_goal_invalidates_cached_status(self):
+        self.assertEqual(self.client.get(self.url).data, [])
+
+        goal = Goal.objects.create(
+            user=self.user, title='Save', type='save_amount', target_amount=100
+        )
+        goal.plans.add(self.plan)
+        res = self.client.get(self.url)
+
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data[0]['achieved'], 'Goal Achieved')
+
+    def test_editing_goal_invalidates_cached_status(self):
+        goal = Goal.objects.create(
+            user=self.user, title='Save', type='save_amount', target_amount=100
+        )
+        self.plan.goals.add(goal)
+        self.client.get(self.url)
+
+        goal.target_amount = 5000
+        goal.save()
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.data[0]['achieved'], 'Goal Not Achieved')
+
+
+class ConditionalRequestTests(TestCase):
+    """Tests for ETag / Last-Modified handling on the plan API"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='user@example.com', password='pass12345'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.expense = Expense.objects.create(
+            user=self.user, title='Lunch', category='food', amount=10,
+            date=date(2025, 3, 1)
+        )
+        self.url = f'/api/expenses/{self.expense.pk}/'
+
+    def test_get_returns_validators(self):
+        res = self.client.get('/api/expenses/')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('ETag', res)
+        self.assertIn('Last-Modified', res)
+
+    def test_if_none_match_returns_not_modified_without_queries(self):
+        etag = self.client.get('/api/expenses/')['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get('/api/expenses/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_if_modified_since_returns_not_modified(self):
+        last_modified = self.client.get('/api/expenses/')['Last-Modified']
+
+        res = self.client.get(
+            '/api/expenses/', HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+
+        self.assertEqual(res.status_code, 304)
+
+    def test_last_modified_is_never_in_the_future(self):
+        for i in range(30):
+            self.client.post('/api/expenses/', {
+                'title': f'E{i}', 'category': 'food', 'amount': 1
+            })
+
+        res = self.client.get('/api/expenses/')
+
+        last_modified = parse_http_date(res['Last-Modified'])
+        self.assertLessEqual(last_modified, time.time())
+
+    def test_change_invalidates_etag(self):
+        etag = self.client.get('/api/expenses/')['ETag']
+        Expense.objects.create(
+            user=self.user, title='Dinner', category='food', amount=20
+        )
+
+        res = self.client.get('/api/expenses/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_if_match_accepts_current_write(self):
+        etag = self.client.get(self.url)['ETag']
+
+        res = self.client.patch(self.url, {'amount': 15}, HTTP_IF_MATCH=etag)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['ETag'], self.client.get(self.url)['ETag'])
+
+    def test_if_match_rejects_stale_write(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.patch(self.url, {'amount': 15})
+
+        res = self.client.patch(self.url, {'amount': 99}, HTTP_IF_MATCH=etag)
+
+        self.assertEqual(res.status_code, 412)
+        self.expense.refresh_from_db()
+        self.assertEqual(self.expense.amount, 15)
+
+
+class ExpenseImportTests(TestCase):
+    """Tests for the bulk expense import endpoint"""
+
+    url = '/api/expenses/import/'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='user@example.com', password='pass12345'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, name, content, **params):
+        upload = SimpleUploadedFile(name, content.encode())
+        return self.client.post(
+            self.url + '?' + urlencode(params), {'file': upload}
+        )
+
+    def test_import_csv(self):
+        content = (
+            'title,category,amount,date,notes\n'
+            'Lunch,food,10,2025-03-01,\n'
+            'Rent,rent,500,2025-03-02,March\n'
+            'Snack,food,5,2025-03-03,\n'
+        )
+
+        res = self.upload('bank.csv', content, batch_size=2)
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.data['imported'], 3)
+        self.assertEqual(Expense.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(
+            MonthlySpending.objects.get(
+                user=self.user, category='food'
+            ).total,
+            15
+        )
+
+    def test_import_ndjson_reports_invalid_rows(self):
+        content = (
+            '{"title": "Lunch", "category": "food", "amount": 10, '
+            '"date": "2025-03-01"}\n'
+            '{"title": "Bad", "category": "food", "amount": -4}\n'
+            'not json\n'
+            '{"title": "Bus", "category": "transport", "amount": 2}\n'
+        )
+
+        res = self.upload('bank.ndjson', content)
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.data['imported'], 2)
+        self.assertEqual(res.data['failed'], 2)
+        self.assertEqual(
+            [error['row'] for error in res.data['errors']], [2, 3]
+        )
+        self.assertIn('amount', res.data['errors'][0]['errors'])
+
+    def test_import_rejects_unknown_file_type(self):
+        res = self.upload('bank.xlsx', 'data')
+
+        self.assertEqual(res.status_code, 400)
+
+
+class ExpenseExportTests(TestCase):
+    """Tests for the streaming expense export endpoint"""
+
+    url = '/api/expenses/export/'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='user@example.com', password='pass12345'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for day, category in [(3, 'food'), (1, 'rent'), (20, 'food')]:
+            Expense.objects.create(
+                user=self.user, title=f'Day {day}', category=category,
+                amount=day, date=date(2025, 3, day)
+            )
+
+    def content(self, res):
+        return b''.join(res.streaming_content).decode()
+
+    def test_export_csv_ordered_by_date(self):
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        lines = self.content(res).splitlines()
+        self.assertEqual(lines[0], 'id,title,category,notes,amount,date')
+        self.assertEqual(
+            [line.split(',')[1] for line in lines[1:]],
+            ['Day 1', 'Day 3', 'Day 20']
+        )
+
+    def test_export_ndjson_with_filters(self):
+        res = self.client.get(self.url, {
+            'file_type': 'ndjson',
+            'category': 'food',
+            'start': '2025-03-02',
+            'end': '2025-03-20',
+        })
+
+        rows = [json.loads(line) for line in self.content(res).splitlines()]
+        self.assertEqual(rows, [{
+            'id': rows[0]['id'], 'title': 'Day 3', 'category': 'food',
+            'notes': '', 'amount': 3, 'date': '2025-03-03',
+        }])
+
+    def test_export_rejects_invalid_date(self):
+        res = self.client.get(self.url, {'start': 'March'})
+
+        self.assertEqual(res.status_code, 400)
+
+
+class KeysetPaginationTests(TestCase):
+    """Tests for cursor pagination of expenses"""
+
+    url = '/api/expenses/'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='user@example.com', password='pass12345'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Expense.objects.bulk_create([
+            Expense(
+                user=self.user, title=f'E{i}', category='food',
+                amount=i, date=date(2025, 3, 1 + i // 3)
+            )
+            for i in range(12)
+        ])
+        self.ordered = list(
+            Expense.objects.order_by('date', 'id')
+            .values_list('title', flat=True)
+        )
+
+    def titles(self, res):
+        return [row['title'] for row in res.data['results']]
+
+    def test_walks_forward_and_backward(self):
+        res = self.client.get(
+            self.url, {'pagination': 'cursor', 'page_size': 5}
+        )
+        pages = [self.titles(res)]
+        self.assertIsNone(res.data['previous'])
+
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            pages.append(self.titles(res))
+
+        self.assertEqual(sum(pages, []), self.ordered)
+        self.assertEqual([len(page) for page in pages], [5, 5, 2])
+
+        res = self.client.get(res.data['previous'])
+        self.assertEqual(self.titles(res), pages[1])
+
+    def test_page_number_mode_is_default(self):
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.data['count'], 12)
+        self.assertEqual(len(res.data['results']), 10)
+
+    def test_invalid_cursor(self):
+        res = self.client.get(self.url, {'cursor': 'garbage'})
+
+        self.assertEqual(res.status_code, 404)
+
+    def cursor(self, payload):
+        encoded = json.dumps(payload).encode()
+        return base64.urlsafe_b64encode(encoded).decode()
+
+    def test_cursor_with_wrong_value_types(self):
+        cursor = self.cursor([['notadate', '1'], False])
+        res = self.client.get(self.url, {'cursor': cursor})
+
+        self.assertEqual(res.status_code, 404)
+        self.assertEqual(str(res.data['detail']), 'Invalid cursor')
+
+    def test_cursor_that_is_not_a_list(self):
+        cursor = self.cursor({'a': 1, 'b': 2})
+        res = self.client.get('/api/plan-items/', {'cursor': cursor})
+
+        self.assertEqual(res.status_code, 404)
+        self.assertEqual(str(res.data['detail']), 'Invalid cursor')
+
+    @skipUnless(
+        connection.vendor == 'sqlite',
+        'EXPLAIN output checked is SQLite specific'
+    )
+    def test_keyset_page_uses_index_without_sorting(self):
+        keyset = KeysetPagination(('date', 'id')).keyset_filter(
+            [date(2025, 3, 2), 4], reverse=False
+        )
+        plan = Expense.objects.filter(user=self.user).filter(
+            keyset
+        ).order_by('date', 'id')[:11].explain()
+
+        self.assertIn('expense_user_date_id_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class SurvivalPlanQueryCountTests(TestCase):
+    """Tests that listing plans does not run queries per plan"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='user@example.com', password='pass12345'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        goal = Goal.objects.create(
+            user=self.user, title='Save', type='save_amount'
+        )
+        for i in range(20):
+            plan = SurvivalPlan.objects.create(
+                user=self.user, title=f'Plan {i}', income=1000,
+                month=date(2020 + i // 12, i % 12 + 1, 1)
+            )
+            PlanItem.objects.create(plan=plan, category='food', amount=100)
+            PlanItem.objects.create(plan=plan, category='rent', amount=500)
+            plan.goals.add(goal)
+
+    def test_query_count_independent_of_page_size(self):
+        for page_size in (2, 20):
+            with self.assertNumQueries(4):
+                res = self.client.get(
+                    '/api/survival-plans/', {'page_size': page_size}
+                )
+            self.assertEqual(len(res.data['results']), page_size)
+            self.assertEqual(len(res.data['results'][0]['items']), 2)
+            self.assertEqual(len(res.data['results'][0]['goals']), 1)
+
+    def test_cursor_page_query_count(self):
+        with self.assertNumQueries(3):
+            res = self.client.get(
+                '/api/survival-plans/',
+                {'pagination': 'cursor', 'page_size': 20}
+            )
+        self.assertEqual(len(res.data['results']), 20)
+
+
+class SyntheticDataTests(TestCase):
+    """Tests for the synthetic benchmark data generator"""
+
+    def generate(self):
+        call_command(
+            'generate_synthetic_data', '--clear',
+            '--users', '2', '--plans-per-user', '3',
+            '--items-per-plan', '4', '--expenses-per-month', '5',
+            '--goals', '2',
+            stdout=StringIO(),
+        )
+        return list(
+            Expense.objects.order_by('id')
+            .values_list('category', 'amount', 'date')
+        )
+
+    def test_generation_is_deterministic(self):
+        first = self.generate()
+        second = self.generate()
+
+        self.assertEqual(len(first), 2 * 3 * 5)
+        self.assertEqual(first, second)
+        self.assertEqual(PlanItem.objects.count(), 2 * 3 * 4)
+        self.assertEqual(Goal.plans.through.objects.count(), 2 * 3 * 2)
+        call_command('rebuild_spending_rollup', '--verify', stdout=StringIO())
+        call_command('repair_allocated_totals', '--verify', stdout=StringIO())
+
+
+class GoalEvaluationTests(TestCase):
+    """Tests for batch goal evaluation of a plan"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='user@example.com', password='pass12345'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.plan = SurvivalPlan.objects.create(
+            user=self.user, title='March', income=1000, month=date(2025, 3, 1)
+        )
+        PlanItem.objects.create(plan=self.plan, category='food', amount=300)
+        Expense.objects.create(
+            user=self.user, title='Lunch', category='food', amount=200,
+            date=date(2025, 3, 5)
+        )
+        Expense.objects.create(
+            user=self.user, title='Rent', category='rent', amount=500,
+            date=date(2025, 3, 1)
+        )
+        self.url = f'/api/survival-plans/{self.plan.pk}/goals/'
+
+    def add_goal(self, goal_type, target, category=''):
+        goal = Goal.objects.create(
+            user=self.user, title=goal_type, type=goal_type,
+            target_amount=target, category=category
+        )
+        goal.plans.add(self.plan)
+        return goal
+
+    def test_statuses(self):
+        goals = [
+            self.add_goal('save_amount', 300),
+            self.add_goal('save_percent', 40),
+            self.add_goal('save_amount_category', 100, 'food'),
+            self.add_goal('save_percent_category', 50, 'food'),
+            self.add_goal('save_amount_category', 10, 'travel'),
+        ]
+
+        res = self.client.get(self.url)
+
+        statuses = {row['id']: row['achieved'] for row in res.data}
+        self.assertEqual([statuses[goal.pk] for goal in goals], [
+            'Goal Achieved',
+            'Goal Not Achieved',
+            'Goal Achieved',
+            'Goal Not Achieved',
+            'No plan item with the given category, cannot achieve goal',
+        ])
+
+    def test_query_count_independent_of_goal_count(self):
+        for count in (2, 20):
+            for i in range(count):
+                self.add_goal('save_amount_category', 10, f'category {i}')
+            cache.clear()
+
+            with self.assertNumQueries(7):
+                res = self.client.get(self.url)
+            self.assertEqual(res.status_code, 200)
+
+    def test_closed_month_results_are_frozen(self):
+        goal = self.add_goal('save_amount_category', 100, 'food')
+        self.client.get(self.url)
+        self.assertEqual(
+            GoalResult.objects.get(goal=goal).status, 'Goal Achieved'
+        )
+        cache.clear()
+
+        with self.assertNumQueries(4):
+            res = self.client.get(self.url)
+        self.assertEqual(res.data[0]['achieved'], 'Goal Achieved')
+
+    def test_frozen_result_rederived_on_change(self):
+        goal = self.add_goal('save_amount_category', 100, 'food')
+        self.client.get(self.url)
+
+        Expense.objects.create(
+            user=self.user, title='Dinner', category='food', amount=50,
+            date=date(2025, 3, 20)
+        )
+        self.assertFalse(GoalResult.objects.filter(goal=goal).exists())
+
+        res = self.client.get(self.url)
+        self.assertEqual(res.data[0]['achieved'], 'Goal Not Achieved')
+
+    def test_result_not_frozen_when_data_changes_during_evaluation(self):
+        goal = self.add_goal('save_amount_category', 100, 'food')
+
+        def evaluate_then_change(plans, user):
+            results = evaluate_plans(plans, user)
+            Expense.objects.create(
+                user=self.user, title='Dinner', category='food', amount=50,
+                date=date(2025, 3, 20)
+            )
+            return results
+
+        with mock.patch(
+            'SurvivalPlan.goals.evaluate_plans', evaluate_then_change
+        ):
+            res = self.client.get(self.url)
+        self.assertEqual(res.data[0]['achieved'], 'Goal Achieved')
+        self.assertFalse(GoalResult.objects.filter(goal=goal).exists())
+
+        res = self.client.get(self.url)
+        self.assertEqual(res.data[0]['achieved'], 'Goal Not Achieved')
+
+    def test_freeze_command(self):
+        goal = self.add_goal('save_percent', 40)
+
+        call_command('freeze_goal_results', '--all', stdout=StringIO())
+        self.assertEqual(
+            GoalResult.objects.get(goal=goal).status, 'Goal Not Achieved'
+        )
+
+        self.plan.income = 5000
+        self.plan.save()
+        self.assertFalse(GoalResult.objects.exists())
+        call_command(
+            'freeze_goal_results', '--month', '2025-03', stdout=StringIO()
+        )
+        self.assertEqual(
+            GoalResult.objects.get(goal=goal).status, 'Goal Achieved'
+        )
+
+    def test_goal_detail(self):
+        goal = self.add_goal('save_amount_category', 100, 'food')
+
+        res = self.client.get(f'{self.url}{goal.pk}/')
+
+        self.assertEqual(res.data['achieved'], 'Goal Achieved')
+
+    def test_async_goals_view(self):
+        self.add_goal('save_amount', 300)
+        self.add_goal('save_amount_category', 10, 'travel')
+        expected = self.client.get(self.url).data
+        GoalResult.objects.all().delete()
+        cache.clear()
+
+        request = APIRequestFactory().get(self.url)
+        force_authenticate(request, user=self.user)
+        view = async_to_sync(AsyncSurvivalPlanGoalsView.as_view())
+
+        with self.assertNumQueries(7):
+            res = view(request, pk=self.plan.pk)
+        self.assertEqual(res.data, expected)
+        self.assertEqual(GoalResult.objects.count(), 2)
+
+        request = APIRequestFactory().get('/api/survival-plans/0/goals/')
+        force_authenticate(request, user=self.user)
+        res = view(request, pk=0)
+        self.assertEqual(res.status_code, 404)
+
+
+class GoalHistoryTests(TestCase):
+    """Tests for the goal history endpoint"""
+
+    url = '/api/survival-plans/goals/history/'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='user@example.com', password='pass12345'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.goal = Goal.objects.create(
+            user=self.user, title='Food', type='save_amount_category',
+            target_amount=100, category='food'
+        )
+        for month, spent in [(1, 150), (2, 250), (3, 50)]:
+            plan = SurvivalPlan.objects.create(
+                user=self.user, title=f'Plan {month}', income=1000,
+                month=date(2025, month, 1)
+            )
+            PlanItem.objects.create(plan=plan, category='food', amount=300)
+            plan.goals.add(self.goal)
+            Expense.objects.create(
+                user=self.user, title='Food', category='food',
+                amount=spent, date=date(2025, month, 10)
+            )
+
+    def test_history_over_range(self):
+        res = self.client.get(self.url, {'start': '2025-02', 'end': '2025-03'})
+
+        self.assertEqual(res.data['count'], 2)
+        self.assertEqual(
+            [
+                (row['month'], row['goals'][0]['achieved'])
+                for row in res.data['results']
+            ],
+            [('2025-02', 'Goal Not Achieved'), ('2025-03', 'Goal Achieved')]
+        )
+
+    def test_history_matches_per_plan_endpoint(self):
+        res = self.client.get(self.url)
+
+        for row in res.data['results']:
+            single = self.client.get(
+                f"/api/survival-plans/{row['plan']}/goals/"
+            )
+            self.assertEqual(row['goals'], single.data)
+
+    def test_history_query_count_is_fixed(self):
+        with self.assertNumQueries(8):
+            self.client.get(self.url, {'page_size': 3})
+
+    def test_invalid_month(self):
+        res = self.client.get(self.url, {'start': '2025'})
+
+        self.assertEqual(res.status_code, 400)
+
+
+class AllocatedTotalTests(TestCase):
+    """Tests for the plan's maintained allocated_total"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='user@example.com', password='pass12345'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.plan = SurvivalPlan.objects.create(
+            user=self.user, title='Plan', income=1000, month=date(2025, 1, 1)
+        )
+        self.other = SurvivalPlan.objects.create(
+            user=self.user, title='Other', income=1000, month=date(2025, 2, 1)
+        )
+
+    def allocated(self, plan):
+        plan.refresh_from_db()
+        return plan.allocated_total
+
+    def test_item_writes_maintain_total(self):
+        food = PlanItem.objects.create(
+            plan=self.plan, category='food', amount=300
+        )
+        PlanItem.objects.create(plan=self.plan, category='rent', amount=500)
+        self.assertEqual(self.allocated(self.plan), 800)
+
+        food.amount = 200
+        food.save()
+        self.assertEqual(self.allocated(self.plan), 700)
+
+        food.plan = self.other
+        food.save()
+        self.assertEqual(self.allocated(self.plan), 500)
+        self.assertEqual(self.allocated(self.other), 200)
+
+        food.delete()
+        self.assertEqual(self.allocated(self.other), 0)
+
+    def test_over_allocation_is_rolled_back(self):
+        PlanItem.objects.create(plan=self.plan, category='rent', amount=900)
+
+        """Stale validation is caught by the guarded update"""
+        with self.assertRaises(AllocationExceeded):
+            PlanItem.objects.create(
+                plan=self.plan, category='food', amount=200
+            )
+
+        self.assertEqual(PlanItem.objects.filter(plan=self.plan).count(), 1)
+        self.assertEqual(self.allocated(self.plan), 900)
+
+    def test_api_rejects_over_allocation(self):
+        PlanItem.objects.create(plan=self.plan, category='rent', amount=900)
+        url = '/api/plan-items/'
+
+        res = self.client.post(url, {
+            'plan': self.plan.pk, 'category': 'food', 'amount': 200
+        })
+        self.assertEqual(res.status_code, 400)
+        self.assertIn('exceed the income by (100)', str(res.data))
+
+        res = self.client.post(url, {
+            'plan': self.plan.pk, 'category': 'food', 'amount': 100
+        })
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(self.allocated(self.plan), 1000)
+
+    def test_plan_update_keeps_total(self):
+        PlanItem.objects.create(plan=self.plan, category='rent', amount=900)
+        url = f'/api/survival-plans/{self.plan.pk}/'
+
+        res = self.client.patch(url, {'title': 'Renamed'})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['allocated_total'], 900)
+        self.assertEqual(self.allocated(self.plan), 900)
+
+        res = self.client.patch(url, {'allocated_total': 0})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.allocated(self.plan), 900)
+
+        res = self.client.post('/api/plan-items/', {
+            'plan': self.plan.pk, 'category': 'food', 'amount': 900
+        })
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(self.allocated(self.plan), 900)
+
+    def test_stale_instance_save_keeps_total(self):
+        stale = SurvivalPlan.objects.get(pk=self.plan.pk)
+        PlanItem.objects.create(plan=self.plan, category='rent', amount=900)
+
+        stale.title = 'Renamed'
+        stale.save()
+        self.assertEqual(self.allocated(self.plan), 900)
+        self.assertEqual(self.plan.title, 'Renamed')
+
+    def test_repair_command(self):
+        PlanItem.objects.create(plan=self.plan, category='rent', amount=400)
+        SurvivalPlan.objects.filter(pk=self.plan.pk).update(allocated_total=0)
+
+        with self.assertRaises(CommandError):
+            call_command(
+                'repair_allocated_totals', '--verify', stdout=StringIO()
+            )
+
+        call_command('repair_allocated_totals', stdout=StringIO())
+        self.assertEqual(self.allocated(self.plan), 400)
+        call_command('repair_allocated_totals', '--verify', stdout=StringIO())
+
+
+class ReplacePlanItemsTests(TestCase):
+    """Tests for replacing a plan's items in one request"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='user@example.com', password='pass12345'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.plan = SurvivalPlan.objects.create(
+            user=self.user, title='Plan', income=1000, month=date(2025, 1, 1)
+        )
+        self.food = PlanItem.objects.create(
+            plan=self.plan, category='food', amount=300
+        )
+        self.rent = PlanItem.objects.create(
+            plan=self.plan, category='rent', amount=500
+        )
+        self.url = f'/api/survival-plans/{self.plan.pk}/items/'
+
+    def test_replace_diffs_items(self):
+        res = self.client.put(self.url, [
+            {'id': self.food.pk, 'category': 'food', 'amount': 250},
+            {'category': 'fun', 'amount': 100},
+        ], format='json')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            sorted(self.plan.items.values_list('category', 'amount')),
+            [('food', 250), ('fun', 100)]
+        )
+        self.assertEqual(res.data[0]['id'], self.food.pk)
+        self.assertFalse(PlanItem.objects.filter(pk=self.rent.pk).exists())
+        self.plan.refresh_from_db()
+        self.assertEqual(self.plan.allocated_total, 350)
+
+    def test_query_count_independent_of_item_count(self):
+        items = [
+            {'category': f'category {i}', 'amount': 10} for i in range(30)
+        ]
+
+        """Each of the two replaced items is deleted with its signals"""
+        with self.assertNumQueries(16):
+            res = self.client.put(self.url, items, format='json')
+
+        self.assertEqual(len(res.data), 30)
+
+    def test_rejects_items_over_income(self):
+        res = self.client.put(self.url, [
+            {'category': 'rent', 'amount': 900},
+            {'category': 'food', 'amount': 200},
+        ], format='json')
+
+        self.assertEqual(res.status_code, 400)
+        self.assertIn('exceed the income by (100)', str(res.data))
+        self.assertEqual(self.plan.items.count(), 2)
+
+    def test_rejects_item_of_another_plan(self):
+        other = SurvivalPlan.objects.create(
+            user=self.user, title='Other', income=1000, month=date(2025, 2, 1)
+        )
+        item = PlanItem.objects.create(plan=other, category='food', amount=10)
+
+        res = self.client.put(self.url, [
+            {'id': item.pk, 'category': 'food', 'amount': 10},
+        ], format='json')
+
+        self.assertEqual(res.status_code, 400)
+        self.assertTrue(
+            PlanItem.objects.filter(pk=item.pk, plan=other).exists()
+        )
+
+
+class RolloverTests(TestCase):
+    """Tests for copying plans to later months"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='user@example.com', password='pass12345'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.plan = SurvivalPlan.objects.create(
+            user=self.user, title='Budget', income=1000, month=date(2025, 1, 1)
+        )
+        PlanItem.objects.create(plan=self.plan, category='food', amount=300)
+        PlanItem.objects.create(plan=self.plan, category='rent', amount=500)
+        self.goal = Goal.objects.create(
+            user=self.user, title='Save', type='save_amount'
+        )
+        self.plan.goals.add(self.goal)
+        self.url = f'/api/survival-plans/{self.plan.pk}/rollover/'
+
+    def test_rollover_copies_items_and_goals(self):
+        res = self.client.post(self.url, {'month': '2025-02'}, format='json')
+
+        self.assertEqual(res.status_code, 201)
+        copy = SurvivalPlan.objects.get(user=self.user, month=date(2025, 2, 1))
+        self.assertEqual(res.data['created'][0]['id'], copy.pk)
+        self.assertEqual(
+            sorted(copy.items.values_list('category', 'amount')),
+            [('food', 300), ('rent', 500)]
+        )
+        self.assertEqual(list(copy.goals.all()), [self.goal])
+        self.assertEqual(copy.allocated_total, 800)
+
+    def test_range_skips_months_with_a_plan(self):
+        SurvivalPlan.objects.create(
+            user=self.user, title='Taken', income=500, month=date(2025, 3, 1)
+        )
+
+        res = self.client.post(
+            self.url, {'start': '2025-02', 'end': '2025-06'}, format='json'
+        )
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(
+            [plan['month'] for plan in res.data['created']],
+            ['2025-02', '2025-04', '2025-05', '2025-06']
+        )
+        self.assertEqual(res.data['skipped'], ['2025-03'])
+
+    def test_rejects_taken_month_and_bad_range(self):
+        res = self.client.post(self.url, {'month': '2025-01'}, format='json')
+        self.assertEqual(res.status_code, 400)
+
+        res = self.client.post(
+            self.url, {'start': '2025-05', 'end': '2025-02'}, format='json'
+        )
+        self.assertEqual(res.status_code, 400)
+
+    def test_detects_plan_dated_mid_month(self):
+        SurvivalPlan.objects.create(
+            user=self.user, title='Taken', income=500, month=date(2025, 2, 15)
+        )
+
+        res = self.client.post(self.url, {'month': '2025-02'}, format='json')
+
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(SurvivalPlan.objects.filter(
+            user=self.user, month__range=(date(2025, 2, 1), date(2025, 2, 28))
+        ).count(), 1)
+
+    def test_unknown_plan(self):
+        res = self.client.post(
+            '/api/survival-plans/abc/rollover/', {'month': '2025-02'},
+            format='json'
+        )
+        self.assertEqual(res.status_code, 404)
+
+    def test_query_count_independent_of_month_count(self):
+        for months, end in ((1, '2025-02'), (12, '2026-01')):
+            SurvivalPlan.objects.exclude(pk=self.plan.pk).delete()
+            with self.assertNumQueries(13):
+                res = self.client.post(
+                    self.url, {'start': '2025-02', 'end': end}, format='json'
+                )
+            self.assertEqual(len(res.data['created']), months)
+
+    def test_command_rolls_every_user_forward(self):
+        other = User.objects.create_user(
+            email='other@example.com', password='pass12345'
+        )
+        SurvivalPlan.objects.create(
+            user=other, title='Other', income=100, month=date(2025, 1, 1)
+        )
+
+        call_command(
+            'rollover_plans', '--month', '2025-01', '--months', '2',
+            stdout=StringIO()
+        )
+        call_command('rollover_plans', '--month', '2025-01', stdout=StringIO())
+
+        self.assertEqual(
+            SurvivalPlan.objects.filter(month__gt=date(2025, 1, 1)).count(), 4
+        )
+        self.assertEqual(PlanItem.objects.count(), 2 * 3)
@@ -4,9 +4,12 @@ from SurvivalPlan.views import (
     PlanItemViewSet,
     ExpenseViewSet,
     SurvivalPlanGoalsView,
+    AsyncSurvivalPlanGoalsView,
     SurvivalPlanGoalDetailView,
+    GoalHistoryView,
 )
 from django.urls import path, include
+from SurvivalApp.asyncviews import as_view
 
 router = DefaultRouter()
 router.register('survival-plans', SurvivalPlanViewSet, basename='suvivalplan')
@@ -18,12 +21,16 @@ app_name = 'plan'
 urlpatterns = [
     path('', include(router.urls)),
     path('survival-plans/<int:pk>/goals/',
-         SurvivalPlanGoalsView.as_view(),
+         as_view(SurvivalPlanGoalsView, AsyncSurvivalPlanGoalsView),
          name='survivalplan-goals'
          ),
     path('survival-plans/<int:pk>/goals/<int:goal_pk>/',
          SurvivalPlanGoalDetailView.as_view(),
          name='survivalplan-goal-detail'
          ),
+    path('survival-plans/goals/history/',
+         GoalHistoryView.as_view(),
+         name='survivalplan-goal-history'
+         ),
 
 ]
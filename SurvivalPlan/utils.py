@@ -0,0 +1,27 @@
+from datetime import date
+
+
+def parse_month(value):
+    """Parse a YYYY-MM string into the first day of that month"""
+    year, month = map(int, value.split('-'))
+    return date(year, month, 1)
+
+
+def month_range(month):
+    """Return the half-open [start, end) date range covering a month
+
+    Filtering with `__gte=start, __lt=end` instead of `__year`/`__month`
+    lets the database use the (user, date) style indexes.
+    """
+    start = date(month.year, month.month, 1)
+    if start.month == 12:
+        end = date(start.year + 1, 1, 1)
+    else:
+        end = date(start.year, start.month + 1, 1)
+    return start, end
+
+
+def add_months(month, count):
+    """Return the first day of the month count months after month"""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
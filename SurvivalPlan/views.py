@@ -1,5 +1,6 @@
 from SurvivalPlan.serializers import (
     PlanItemSerializer,
+    PlanItemReplaceSerializer,
     SurvivalPlanSerializer,
     ExpenseSerializer,
 )
@@ -10,190 +11,319 @@ from SurvivalPlan.models import (
 )
 from Goal.serializers import GoalSerializer
 from Goal.models import Goal
+from SurvivalPlan.goals import goal_results
+from SurvivalPlan.utils import add_months, parse_month, month_range
+from SurvivalPlan.rollover import MAX_ROLLOVER_MONTHS, rollover_plans
+from SurvivalPlan.pagination import CustomPagination, KeysetPaginationMixin
+from SurvivalPlan.imports import READERS, import_expenses
+from SurvivalPlan.exports import EXPORTERS
+from SurvivalApp.asyncviews import AsyncAPIView
+from SurvivalApp.cache import cached_response
+from SurvivalApp.conditional import ConditionalRequestMixin
 
 from datetime import date
+import csv
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.views import APIView
 from rest_framework import status
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
 
-#from django.db import connection, reset_queries  # SQL DEBUG
 
+def goals_prefetch(goals=None):
+    """Prefetch a plan's goals along with the plan ids GoalSerializer shows"""
+    if goals is None:
+        goals = Goal.objects.all()
+    return Prefetch('goals', queryset=goals.prefetch_related(
+        Prefetch('plans', queryset=SurvivalPlan.objects.only('id'))
+    ))
 
-class CustomPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 50
 
+class SurvivalPlanViewSet(
+    ConditionalRequestMixin, KeysetPaginationMixin, viewsets.ModelViewSet
+):
+    """View for Survival Plan CRUD operations"""
 
-def check_goal_status(goal, plan, user, expenses):
-    """Helper function to check if goal is achieved or not"""
-
-    today = date.today()
-    if plan.month.year > today.year or (plan.month.year == today.year and plan.month.month >= today.month):
-        """If month has not ended yet cannot determine goal result"""
-        return "Plan's month has not ended yet"
-
-    if goal.type == 'save_amount':
-        if (plan.income - expenses) >= goal.target_amount:
-            return "Goal Achieved"
-        else:
-            return "Goal Not Achieved"
-
-    elif goal.type == 'save_percent':
-        required_saved = (goal.target_amount / 100) * plan.income
-        actual_saved = plan.income - expenses
-
-        if actual_saved >= required_saved:
-            return "Goal Achieved"
-        else:
-            return "Goal Not Achieved"
+    serializer_class = SurvivalPlanSerializer
+    pagination_class = CustomPagination
+    keyset_ordering = ('month', 'id')
 
-    elif goal.type == 'save_amount_category':
-        try:
-            planitem = PlanItem.objects.get(plan=plan, category=goal.category)
-        except PlanItem.DoesNotExist:
-            return "No plan item with the given category, cannot achieve goal"
+    def get_queryset(self):
+        return (
+            SurvivalPlan.objects
+            .filter(user=self.request.user)
+            .prefetch_related(
+                'items',
+                Prefetch('goals', queryset=Goal.objects.only('id')),
+            )
+            .order_by('id')
+        )
 
-        if (planitem.amount - expenses) >= goal.target_amount:
-            return "Goal Achieved"
-        else:
-            return "Goal Not Achieved"
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
 
-    elif goal.type == 'save_percent_category':
+    @action(detail=True, methods=['put'], url_path='items')
+    def replace_items(self, request, pk=None):
+        """Replace all of a plan's items, entries without an id are created"""
         try:
-            planitem = PlanItem.objects.get(plan=plan, category=goal.category)
-        except PlanItem.DoesNotExist:
-            return "No plan item with the given category, cannot achieve goal"
-
-        required_saved = (goal.target_amount / 100) * planitem.amount
-        actual_saved = planitem.amount - expenses
+            plan = SurvivalPlan.objects.get(pk=pk, user=request.user)
+        except (SurvivalPlan.DoesNotExist, ValueError):
+            return Response(
+                'Plan not found.', status=status.HTTP_404_NOT_FOUND
+            )
 
-        if actual_saved >= required_saved:
-            return "Goal Achieved"
-        else:
-            return "Goal Not Achieved"
+        serializer = PlanItemReplaceSerializer(
+            plan.items.all(),
+            data=request.data,
+            many=True,
+            context={**self.get_serializer_context(), 'plan': plan},
+        )
+        serializer.is_valid(raise_exception=True)
+        items = serializer.save()
 
-    return "Goal Type Not Valid"
+        return Response(PlanItemSerializer(items, many=True).data)
 
+    @action(detail=True, methods=['post'])
+    def rollover(self, request, pk=None):
+        """Copy a plan with its items and goals to one or more months"""
+        try:
+            plan = SurvivalPlan.objects.only('id').get(
+                pk=pk, user=request.user
+            )
+        except (SurvivalPlan.DoesNotExist, ValueError):
+            return Response(
+                'Plan not found.', status=status.HTTP_404_NOT_FOUND
+            )
+        plans = SurvivalPlan.objects.filter(pk=plan.pk)
 
-class SurvivalPlanViewSet(viewsets.ModelViewSet):
-    """View for Survival Plan CRUD operations"""
+        try:
+            if 'month' in request.data:
+                start = end = parse_month(request.data['month'])
+            else:
+                start = parse_month(request.data['start'])
+                end = parse_month(request.data['end'])
+        except (KeyError, ValueError, TypeError, AttributeError):
+            return Response(
+                "Send month, or start and end, as YYYY-MM.",
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-    serializer_class = SurvivalPlanSerializer
-    pagination_class = CustomPagination
+        count = (end.year - start.year) * 12 + end.month - start.month + 1
+        if not 1 <= count <= MAX_ROLLOVER_MONTHS:
+            return Response(
+                f"The range must cover 1 to {MAX_ROLLOVER_MONTHS} months.",
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-    def get_queryset(self):
-        return SurvivalPlan.objects.filter(user=self.request.user)
+        months = [add_months(start, i) for i in range(count)]
+        copies = rollover_plans(plans, months)
+        if not copies:
+            return Response(
+                "A plan already exists for every requested month.",
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        created = {copy.month for copy in copies}
+        serializer = self.get_serializer(
+            self.get_queryset()
+            .filter(pk__in=[copy.pk for copy in copies])
+            .order_by('month'),
+            many=True,
+        )
+        return Response({
+            'created': serializer.data,
+            'skipped': [
+                month.strftime('%Y-%m')
+                for month in months if month not in created
+            ],
+        }, status=status.HTTP_201_CREATED)
 
 
-class PlanItemViewSet(viewsets.ModelViewSet):
+class PlanItemViewSet(
+    ConditionalRequestMixin, KeysetPaginationMixin, viewsets.ModelViewSet
+):
     """View for PlanItem CRUD operations"""
+    conditional_write_methods = ('PUT', 'PATCH')
     serializer_class = PlanItemSerializer
     pagination_class = CustomPagination
 
     def get_queryset(self):
-        return PlanItem.objects.filter(plan__user=self.request.user)
+        return (
+            PlanItem.objects.filter(plan__user=self.request.user)
+            .order_by('id')
+        )
 
 
-class ExpenseViewSet(viewsets.ModelViewSet):
+class ExpenseViewSet(
+    ConditionalRequestMixin, KeysetPaginationMixin, viewsets.ModelViewSet
+):
     """View for ViewSet CRUD operations"""
+    conditional_write_methods = ('PUT', 'PATCH')
     serializer_class = ExpenseSerializer
     pagination_class = CustomPagination
+    keyset_ordering = ('date', 'id')
 
     def get_queryset(self):
-        return Expense.objects.filter(user=self.request.user)
+        return Expense.objects.filter(user=self.request.user).order_by('id')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='import',
+        parser_classes=[MultiPartParser],
+    )
+    def import_file(self, request):
+        """Bulk import expenses from an uploaded .csv or .ndjson file"""
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                "No file uploaded.", status=status.HTTP_400_BAD_REQUEST
+            )
 
-class SurvivalPlanGoalsView(APIView):
-    """View to list goals for a survival plan and if they are completed or not"""
+        reader = READERS.get(upload.name.rsplit('.', 1)[-1].lower())
+        if reader is None:
+            return Response(
+                "Unsupported file type. Use .csv or .ndjson.",
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-    def get(self, request, pk):
-        #reset_queries()  # SQL DEBUG
+        try:
+            batch_size = int(request.query_params.get(
+                'batch_size', settings.EXPENSE_IMPORT_BATCH_SIZE
+            ))
+        except ValueError:
+            return Response(
+                "Invalid batch size.", status=status.HTTP_400_BAD_REQUEST
+            )
+        batch_size = min(
+            max(batch_size, 1), settings.EXPENSE_IMPORT_MAX_BATCH_SIZE
+        )
 
         try:
-            plan = SurvivalPlan.objects.get(pk=pk, user=request.user)
-        except SurvivalPlan.DoesNotExist:
-            return Response('Plan not found.', status=status.HTTP_404_NOT_FOUND)
-        goals = plan.goals.all()
-        data = []
-        month_expenses = Expense.objects.filter(
-            user=request.user,
-            date__year=plan.month.year,
-            date__month=plan.month.month
+            report = import_expenses(
+                request.user,
+                reader(upload),
+                batch_size=batch_size,
+                context=self.get_serializer_context(),
+            )
+        except (UnicodeDecodeError, csv.Error):
+            return Response(
+                "File could not be parsed.",
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(report, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export_file(self, request):
+        """Stream expenses as CSV or NDJSON, ?end= is exclusive"""
+        file_type = request.query_params.get('file_type', 'csv')
+        if file_type not in EXPORTERS:
+            return Response(
+                "Unsupported file type. Use csv or ndjson.",
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        expenses = self.get_queryset()
+        try:
+            if 'start' in request.query_params:
+                expenses = expenses.filter(
+                    date__gte=date.fromisoformat(request.query_params['start'])
+                )
+            if 'end' in request.query_params:
+                expenses = expenses.filter(
+                    date__lt=date.fromisoformat(request.query_params['end'])
+                )
+        except ValueError:
+            return Response(
+                "Invalid date format. Use YYYY-MM-DD.",
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if 'category' in request.query_params:
+            expenses = expenses.filter(
+                category=request.query_params['category']
+            )
+
+        lines, content_type = EXPORTERS[file_type]
+        response = StreamingHttpResponse(
+            lines(expenses.order_by('date', 'id')),
+            content_type=content_type,
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="expenses.{file_type}"'
         )
-        total_expenses = sum(exp.amount for exp in month_expenses)
+        return response
 
-        category_expense_cache = {}
 
-        for goal in goals:
-            serializer = GoalSerializer(goal)
+def plan_goals(user, pk):
+    """Response listing a plan's goals and if they are completed or not"""
+    try:
+        plan = SurvivalPlan.objects.prefetch_related(goals_prefetch()).get(
+            pk=pk, user=user
+        )
+    except SurvivalPlan.DoesNotExist:
+        return Response('Plan not found.', status=status.HTTP_404_NOT_FOUND)
 
-            if goal.type == 'save_amount' or goal.type == 'save_percent':
-                expenses = total_expenses
+    goals = plan.goals.all()
+    results = goal_results([plan], user)[plan.pk]
 
-            else:
-                if goal.category in category_expense_cache:
-                    expenses = category_expense_cache[goal.category]
-                else:
-                    category_expenses = month_expenses.filter(category=goal.category)
-                    expenses = sum(exp.amount for exp in category_expenses)
-                    category_expense_cache[goal.category] = expenses
+    data = [
+        {
+            **GoalSerializer(goal).data,
+            'achieved': results[goal.pk]
+        }
+        for goal in goals
+    ]
 
-            achieved = check_goal_status(goal, plan, request.user, expenses)
+    return Response(data)
 
-            data.append({
-                **serializer.data,
-                'achieved': achieved
-            })
 
-        #for q in connection.queries:  # SQL DEBUG
-        #    print(q['sql'], "\n", q['time'], "\n")  # SQL DEBUG
+class SurvivalPlanGoalsView(ConditionalRequestMixin, APIView):
+    """View to list goals for a survival plan and if they are completed or not"""
+    conditional_date_dependent = True
+
+    @cached_response('plan-goals')
+    def get(self, request, pk):
+        return plan_goals(request.user, pk)
+
+
+class AsyncSurvivalPlanGoalsView(SurvivalPlanGoalsView, AsyncAPIView):
 
-        return Response(data)
+    @cached_response('plan-goals')
+    async def get(self, request, pk):
+        return await sync_to_async(plan_goals)(request.user, pk)
 
 
-class SurvivalPlanGoalDetailView(APIView):
+class SurvivalPlanGoalDetailView(ConditionalRequestMixin, APIView):
     """View to see if a specific goal for a survival plan is completed or not"""
+    conditional_date_dependent = True
 
+    @cached_response('plan-goal-detail')
     def get(self, request, pk, goal_pk):
         try:
-            plan = SurvivalPlan.objects.get(pk=pk, user=request.user)
+            plan = SurvivalPlan.objects.prefetch_related(
+                goals_prefetch(Goal.objects.filter(pk=goal_pk))
+            ).get(pk=pk, user=request.user)
         except SurvivalPlan.DoesNotExist:
             return Response("Plan not found.",
                             status=status.HTTP_404_NOT_FOUND)
 
-        try:
-            goal = plan.goals.get(pk=goal_pk)
-        except Goal.DoesNotExist:
+        goals = plan.goals.all()
+        if not goals:
             return Response("Goal not found in this plan.",
                             status=status.HTTP_404_NOT_FOUND)
+        goal = goals[0]
 
-        if goal.type == 'save_amount' or goal.type == 'save_percent':
-            month_expenses = Expense.objects.filter(
-                user=request.user,
-                date__year=plan.month.year,
-                date__month=plan.month.month
-            )
-            total_expenses = sum(exp.amount for exp in month_expenses)
-        else:
-            month_expenses = Expense.objects.filter(
-                user=request.user,
-                date__year=plan.month.year,
-                date__month=plan.month.month,
-                category=goal.category
-            )
-            total_expenses = sum(exp.amount for exp in month_expenses)
-
-        achieved = check_goal_status(goal, plan, request.user, total_expenses)
+        achieved = goal_results([plan], request.user)[plan.pk][goal.pk]
 
         serializer = GoalSerializer(goal)
 
@@ -201,3 +331,51 @@ class SurvivalPlanGoalDetailView(APIView):
             **serializer.data,
             'achieved': achieved
         })
+
+
+class GoalHistoryView(ConditionalRequestMixin, APIView):
+    """View goal results of all the user's plans, paginated by month"""
+    conditional_date_dependent = True
+
+    @cached_response('goal-history')
+    def get(self, request):
+        plans = SurvivalPlan.objects.filter(user=request.user)
+        try:
+            if 'start' in request.query_params:
+                start, _ = month_range(
+                    parse_month(request.query_params['start'])
+                )
+                plans = plans.filter(month__gte=start)
+            if 'end' in request.query_params:
+                _, end = month_range(parse_month(request.query_params['end']))
+                plans = plans.filter(month__lt=end)
+        except (ValueError, TypeError):
+            return Response(
+                "Invalid month format. Use YYYY-MM.",
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        plans = (
+            plans.prefetch_related(goals_prefetch()).order_by('month', 'id')
+        )
+
+        paginator = CustomPagination()
+        page = paginator.paginate_queryset(plans, request, view=self)
+        results = goal_results(page, request.user)
+
+        data = [
+            {
+                'plan': plan.pk,
+                'title': plan.title,
+                'month': plan.month.strftime('%Y-%m'),
+                'goals': [
+                    {
+                        **GoalSerializer(goal).data,
+                        'achieved': results[plan.pk][goal.pk]
+                    }
+                    for goal in plan.goals.all()
+                ],
+            }
+            for plan in page
+        ]
+        return paginator.get_paginated_response(data)
@@ -0,0 +1,12 @@
+#!/bin/sh
+# Production entrypoint: apply migrations, collect static files and start
+# the pre-fork server. Tune it with the GUNICORN_* variables read by
+# SurvivalApp/gunicorn.conf.py.
+set -e
+
+export DJANGO_SETTINGS_MODULE="${DJANGO_SETTINGS_MODULE:-SurvivalApp.settings_production}"
+
+python manage.py migrate --noinput
+python manage.py collectstatic --noinput
+
+exec gunicorn --config SurvivalApp/gunicorn.conf.py "$@"
@@ -0,0 +1,4 @@
+from django.contrib import admin
+from querylog.models import SlowQuery
+
+admin.site.register(SlowQuery)
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from querylog.models import SlowQuery
+
+ORDERINGS = {
+    'total': F('total_time').desc(),
+    'max': F('max_time').desc(),
+    'count': F('count').desc(),
+    'avg': (F('total_time') / F('count')).desc(),
+}
+
+
+class Command(BaseCommand):
+    help = "Print the slow query log, worst statements first"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument(
+            '--order',
+            choices=sorted(ORDERINGS),
+            default='total',
+            help="Rank by total, max or average time, or by count",
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help="Delete the log after printing it",
+        )
+
+    def handle(self, *args, **options):
+        queries = SlowQuery.objects.order_by(ORDERINGS[options['order']], 'id')
+        entries = list(queries[:options['limit']])
+
+        for rank, entry in enumerate(entries, 1):
+            self.stdout.write(self.style.WARNING(
+                f"#{rank} {entry.fingerprint[:12]}  count={entry.count}  "
+                f"total={entry.total_time:.1f}ms  "
+                f"avg={entry.total_time / entry.count:.1f}ms  "
+                f"max={entry.max_time:.1f}ms"
+            ))
+            self.stdout.write(f"  view: {entry.view or '-'}")
+            self.stdout.write(f"  at:   {entry.call_site or '-'}")
+            self.stdout.write(f"  sql:  {entry.sql}")
+            for line in entry.plan.splitlines():
+                self.stdout.write(f"  plan: {line}")
+
+        if not entries:
+            self.stdout.write("No slow queries recorded")
+
+        if options['clear']:
+            deleted, _ = SlowQuery.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS(f"Cleared {deleted} entries"))
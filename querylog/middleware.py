@@ -0,0 +1,185 @@
+"""
+Slow query log.
+
+SlowQueryMiddleware wraps database execution during requests, including
+the worker threads of async views, and keeps every query slower than
+SLOW_QUERY_THRESHOLD_MS together with the view and the line of code that
+ran it. After the response the queries are added to SlowQuery rows
+aggregated by fingerprint, so the same statement with other parameters
+or IN list lengths is one row. Statements whose row has no query plan
+yet, new ones or ones cleared by `slow_queries --clear`, get their plan
+captured then.
+
+A threshold of 0 disables the log. `manage.py slow_queries` prints the
+worst offenders.
+"""
+import contextvars
+import hashlib
+import re
+import time
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections, DatabaseError
+from django.db.backends.signals import connection_created
+
+from querylog.models import SlowQuery
+from SurvivalApp.profiling import call_site
+
+
+EXPLAIN_PREFIXES = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+    'mysql': 'EXPLAIN ',
+}
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*%s\s*,?)+\)', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+
+_current = contextvars.ContextVar('slow_query_collector', default=None)
+
+
+def normalize(sql):
+    """Replace literals and IN lists with placeholders"""
+    sql = _STRING.sub('%s', sql)
+    sql = _NUMBER.sub('%s', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize(sql).encode()).hexdigest()
+
+
+def view_path(request):
+    """Dotted path of the view that handled the request"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return ''
+    func = getattr(match.func, 'view_class', match.func)
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+def explain(db, sql, params):
+    """Return the query plan of a SELECT, or '' when there is none"""
+    prefix = EXPLAIN_PREFIXES.get(db.vendor)
+    if prefix is None or not sql.lstrip().upper().startswith('SELECT'):
+        return ''
+
+    try:
+        with db.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+    except DatabaseError:
+        return ''
+
+    if db.vendor == 'sqlite':
+        """Rows are (id, parent, notused, detail)"""
+        return '\n'.join(str(row[-1]) for row in rows)
+    return '\n'.join(' '.join(str(column) for column in row) for row in rows)
+
+
+class SlowQueryCollector:
+    """Keeps the slow queries of one request"""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            if duration >= self.threshold:
+                self.queries.append((
+                    fingerprint(sql), sql, params, many, duration,
+                    call_site(), context['connection'].alias,
+                ))
+
+
+def collect_slow_query(execute, sql, params, many, context):
+    """Database execute wrapper feeding the current request's collector"""
+    collector = _current.get()
+    if collector is None:
+        return execute(sql, params, many, context)
+    return collector(execute, sql, params, many, context)
+
+
+def install_slow_query_collector(connection, **kwargs):
+    """Like metrics.install_query_counter, reaches async views' threads"""
+    if collect_slow_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, collect_slow_query)
+
+
+class SlowQueryMiddleware:
+    """Record the slow queries of every request"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.SLOW_QUERY_THRESHOLD_MS:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.threshold = settings.SLOW_QUERY_THRESHOLD_MS
+
+        connection_created.connect(install_slow_query_collector)
+        for connection in connections.all(initialized_only=True):
+            install_slow_query_collector(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        collector = SlowQueryCollector(self.threshold)
+        token = _current.set(collector)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        if collector.queries:
+            self.record(request, collector.queries)
+        return response
+
+    async def __acall__(self, request):
+        collector = SlowQueryCollector(self.threshold)
+        token = _current.set(collector)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        if collector.queries:
+            await sync_to_async(self.record)(request, collector.queries)
+        return response
+
+    def record(self, request, queries):
+        view = view_path(request)
+        planned = set(
+            SlowQuery.objects
+            .filter(fingerprint__in={query[0] for query in queries})
+            .exclude(plan='')
+            .values_list('fingerprint', flat=True)
+        )
+        for key, sql, params, many, duration, site, alias in queries:
+            plan = ''
+            if not many and key not in planned:
+                plan = explain(connections[alias], sql, params)
+                planned.add(key)
+            SlowQuery.objects.record(
+                key, normalize(sql), duration,
+                view=view, call_site=site, plan=plan,
+            )
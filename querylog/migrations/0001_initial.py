@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=40, unique=True)),
+                ('sql', models.TextField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total_time', models.FloatField(default=0)),
+                ('max_time', models.FloatField(default=0)),
+                ('view', models.CharField(blank=True, max_length=255)),
+                ('call_site', models.CharField(blank=True, max_length=500)),
+                ('plan', models.TextField(blank=True)),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+                ('last_seen', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'slow queries',
+            },
+        ),
+    ]
@@ -0,0 +1,67 @@
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+
+class SlowQueryManager(models.Manager):
+    """Manager aggregating slow queries by fingerprint"""
+
+    def record(
+        self, fingerprint, sql, duration, view='', call_site='', plan=''
+    ):
+        """Add one slow execution, duration in milliseconds"""
+        now = timezone.now()
+        changes = {
+            'count': F('count') + 1,
+            'total_time': F('total_time') + duration,
+            'max_time': Greatest(F('max_time'), duration),
+            'view': view[:255],
+            'call_site': call_site[:500],
+            'last_seen': now,
+        }
+        if plan:
+            changes['plan'] = plan
+
+        entry = self.filter(fingerprint=fingerprint)
+        if entry.update(**changes):
+            return
+
+        try:
+            with transaction.atomic():
+                self.create(
+                    fingerprint=fingerprint,
+                    sql=sql,
+                    count=1,
+                    total_time=duration,
+                    max_time=duration,
+                    view=view[:255],
+                    call_site=call_site[:500],
+                    plan=plan,
+                    last_seen=now,
+                )
+        except IntegrityError:
+            """Recorded concurrently, add to it instead"""
+            entry.update(**changes)
+
+
+class SlowQuery(models.Model):
+    """Executions over SLOW_QUERY_THRESHOLD_MS of one normalized statement"""
+    fingerprint = models.CharField(max_length=40, unique=True)
+    sql = models.TextField()
+    count = models.PositiveIntegerField(default=0)
+    total_time = models.FloatField(default=0)
+    max_time = models.FloatField(default=0)
+    view = models.CharField(max_length=255, blank=True)
+    call_site = models.CharField(max_length=500, blank=True)
+    plan = models.TextField(blank=True)
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField()
+
+    objects = SlowQueryManager()
+
+    class Meta:
+        verbose_name_plural = 'slow queries'
+
+    def __str__(self):
+        return f"{self.count}x {self.max_time:.1f}ms {self.sql[:60]}"
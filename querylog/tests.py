@@ -0,0 +1,107 @@
+from datetime import date
+from io import StringIO
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import (
+    APIClient,
+    APIRequestFactory,
+    force_authenticate,
+)
+
+from querylog.middleware import SlowQueryMiddleware, fingerprint, normalize
+from querylog.models import SlowQuery
+from SurvivalPlan.models import SurvivalPlan
+from SurvivalPlan.views import SurvivalPlanGoalsView
+
+User = get_user_model()
+
+
+class FingerprintTests(TestCase):
+    """Tests for SQL normalization"""
+
+    def test_literals_and_in_lists_are_replaced(self):
+        self.assertEqual(
+            normalize(
+                "SELECT * FROM t WHERE a = 'x''y' "
+                "AND b IN (%s, %s, %s)  AND c = 12"
+            ),
+            "SELECT * FROM t WHERE a = %s AND b IN (...) AND c = %s"
+        )
+
+    def test_same_statement_same_fingerprint(self):
+        self.assertEqual(
+            fingerprint('SELECT 1 FROM t WHERE id IN (%s)'),
+            fingerprint('SELECT 1 FROM t WHERE id IN (%s, %s)'),
+        )
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0.000001)
+class SlowQueryLogTests(TestCase):
+    """Tests for the slow query middleware and command"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='user@example.com', password='pass12345'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.plan = SurvivalPlan.objects.create(
+            user=self.user, title='Plan', income=1000, month=date(2025, 1, 1)
+        )
+
+    def test_records_queries_with_view_and_plan(self):
+        self.client.get('/api/survival-plans/')
+        self.client.get('/api/survival-plans/')
+
+        entry = SlowQuery.objects.get(sql__startswith='SELECT COUNT(*)')
+        self.assertEqual(entry.count, 2)
+        self.assertEqual(entry.view, 'SurvivalPlan.views.SurvivalPlanViewSet')
+        self.assertIn('.py:', entry.call_site)
+        self.assertIn('SEARCH SurvivalPlan_survivalplan', entry.plan)
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_disabled(self):
+        self.client.get('/api/survival-plans/')
+
+        self.assertFalse(SlowQuery.objects.exists())
+
+    def test_command_prints_top_offenders(self):
+        self.client.get('/api/survival-plans/')
+        out = StringIO()
+
+        call_command('slow_queries', '--limit', '1', '--clear', stdout=out)
+
+        self.assertIn('#1 ', out.getvalue())
+        self.assertNotIn('#2 ', out.getvalue())
+        self.assertFalse(SlowQuery.objects.exists())
+
+    def test_plan_captured_again_after_clear(self):
+        self.client.get('/api/survival-plans/')
+        call_command('slow_queries', '--clear', stdout=StringIO())
+
+        self.client.get('/api/survival-plans/')
+
+        entry = SlowQuery.objects.get(sql__startswith='SELECT COUNT(*)')
+        self.assertIn('SEARCH SurvivalPlan_survivalplan', entry.plan)
+
+    def test_async_request_records_worker_thread_queries(self):
+        url = f'/api/survival-plans/{self.plan.pk}/goals/'
+        request = APIRequestFactory().get(url)
+        force_authenticate(request, user=self.user)
+
+        async def get_response(request):
+            return await sync_to_async(SurvivalPlanGoalsView.as_view())(
+                request, pk=self.plan.pk
+            )
+
+        middleware = SlowQueryMiddleware(get_response)
+        async_to_sync(middleware)(request)
+
+        self.assertTrue(iscoroutinefunction(middleware))
+        entry = SlowQuery.objects.get(
+            sql__contains='FROM "SurvivalPlan_survivalplan"'
+        )
+        self.assertIn('in plan_goals', entry.call_site)
@@ -1,3 +1,4 @@
 from django.contrib import admin
+from stats.models import MonthlySpending
 
-# Register your models here.
+admin.site.register(MonthlySpending)
@@ -0,0 +1,73 @@
+from datetime import date
+
+from django.db.models import Sum
+
+from SurvivalPlan.models import SurvivalPlan, PlanItem
+from stats.models import MonthlySpending
+
+
+def month_window(start, count=12):
+    """Return the first day of `count` consecutive months from start"""
+    months = []
+    for i in range(count):
+        month = (start.month + i - 1) % 12 + 1
+        year = start.year + (start.month + i - 1) // 12
+        months.append(date(year, month, 1))
+    return months
+
+
+def plan_incomes(user, start, end):
+    """Return {month: income} for the user's plans in [start, end)"""
+    plans = SurvivalPlan.objects.filter(
+        user=user,
+        month__gte=start,
+        month__lt=end
+    ).values_list('month', 'income')
+
+    return {month.replace(day=1): income for month, income in plans}
+
+
+def plan_item_amounts(user, start, end, category):
+    """Return {month: planned amount} of a category in [start, end)"""
+    items = PlanItem.objects.filter(
+        plan__user=user,
+        plan__month__gte=start,
+        plan__month__lt=end,
+        category=category
+    ).values_list('plan__month', 'amount')
+
+    return {month.replace(day=1): amount for month, amount in items}
+
+
+def spending_by_month(user, start, end, category=None):
+    """Return {month: total expense} for months in [start, end)"""
+    spending = MonthlySpending.objects.filter(
+        user=user,
+        month__gte=start,
+        month__lt=end
+    )
+    if category is not None:
+        spending = spending.filter(category=category)
+
+    return {
+        row['month']: row['total']
+        for row in spending.values('month')
+        .annotate(total=Sum('total')).order_by()
+    }
+
+
+def monthly_breakdown(months, budgets, spending, budget_key):
+    """Combine planned budgets with spending for every month with a plan"""
+    monthly_data = {}
+    for month in months:
+        if month not in budgets:
+            continue
+
+        budget = budgets[month]
+        total_expense = spending.get(month, 0)
+        monthly_data[month.strftime('%Y-%m')] = {
+            budget_key: budget,
+            "total_expense": total_expense,
+            "net_savings": budget - total_expense
+        }
+    return monthly_data
@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from stats.models import MonthlySpending
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Rebuild or verify the monthly spending rollup from expenses"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help="Only compare the rollup against expenses, do not write",
+        )
+        parser.add_argument(
+            '--user',
+            help="Email of a single user to rebuild or verify",
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(email=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"No user with email {options['user']}")
+
+        if options['verify']:
+            self.verify(user)
+            return
+
+        written = MonthlySpending.objects.rebuild(user)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} rollup rows"))
+
+    def verify(self, user):
+        expected = {
+            (row['user_id'], row['bucket'], row['category']):
+                (row['total'], row['count'])
+            for row in MonthlySpending.objects.expected_rows(user)
+        }
+
+        stored_rows = MonthlySpending.objects.all()
+        if user is not None:
+            stored_rows = stored_rows.filter(user=user)
+        stored = {
+            (row['user_id'], row['month'], row['category']):
+                (row['total'], row['count'])
+            for row in stored_rows.values(
+                'user_id', 'month', 'category', 'total', 'count'
+            )
+        }
+
+        mismatches = 0
+        for key in sorted(expected.keys() | stored.keys(), key=str):
+            if expected.get(key) != stored.get(key):
+                mismatches += 1
+                user_id, month, category = key
+                self.stdout.write(
+                    f"user={user_id} month={month:%Y-%m} category={category}: "
+                    f"expected {expected.get(key)}, stored {stored.get(key)}"
+                )
+
+        if mismatches:
+            raise CommandError(f"{mismatches} rollup rows out of sync")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rollup matches expenses ({len(expected)} rows)"
+        ))
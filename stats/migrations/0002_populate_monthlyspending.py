@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:08
+
+from django.db import migrations
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def populate(apps, schema_editor):
+    Expense = apps.get_model('SurvivalPlan', 'Expense')
+    MonthlySpending = apps.get_model('stats', 'MonthlySpending')
+
+    rows = (
+        Expense.objects
+        .annotate(bucket=TruncMonth('date'))
+        .values('user_id', 'bucket', 'category')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    MonthlySpending.objects.bulk_create(
+        (
+            MonthlySpending(
+                user_id=row['user_id'],
+                month=row['bucket'],
+                category=row['category'],
+                total=row['total'],
+                count=row['count'],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stats', '0001_initial'),
+        ('SurvivalPlan', '0003_remove_planitem_plan_planitem_plan'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,98 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Sum, Count
+from django.db.models.functions import TruncMonth
+from django.contrib.auth import get_user_model
 
-# Create your models here.
+User = get_user_model()
+
+
+class MonthlySpendingManager(models.Manager):
+    """Manager keeping the spending rollup in sync with expenses"""
+
+    def apply_delta(self, user_id, month, category, amount, count):
+        """Add amount/count to the (user, month, category) bucket"""
+        month = month.replace(day=1)
+        bucket = self.filter(user_id=user_id, month=month, category=category)
+
+        if bucket.update(total=F('total') + amount, count=F('count') + count):
+            bucket.filter(count__lte=0).delete()
+            return
+
+        if count <= 0:
+            return
+
+        try:
+            with transaction.atomic():
+                self.create(
+                    user_id=user_id,
+                    month=month,
+                    category=category,
+                    total=amount,
+                    count=count,
+                )
+        except IntegrityError:
+            """Bucket created concurrently, add to it instead"""
+            bucket.update(total=F('total') + amount, count=F('count') + count)
+
+    def expected_rows(self, user=None):
+        """Compute rollup rows from scratch out of the expenses table"""
+        from SurvivalPlan.models import Expense
+
+        expenses = Expense.objects.all()
+        if user is not None:
+            expenses = expenses.filter(user=user)
+
+        return (
+            expenses
+            .annotate(bucket=TruncMonth('date'))
+            .values('user_id', 'bucket', 'category')
+            .annotate(total=Sum('amount'), count=Count('id'))
+            .order_by()
+        )
+
+    @transaction.atomic
+    def rebuild(self, user=None):
+        """Drop and recreate rollup rows, returns number of rows written"""
+        current = self.all()
+        if user is not None:
+            current = current.filter(user=user)
+        current.delete()
+
+        rows = [
+            self.model(
+                user_id=row['user_id'],
+                month=row['bucket'],
+                category=row['category'],
+                total=row['total'],
+                count=row['count'],
+            )
+            for row in self.expected_rows(user).iterator()
+        ]
+        self.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+
+class MonthlySpending(models.Model):
+    """Per user, month and category expense totals"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='monthly_spending',
+    )
+    month = models.DateField()
+    category = models.CharField(max_length=255)
+    total = models.BigIntegerField(default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    objects = MonthlySpendingManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'month', 'category'],
+                name='unique_monthly_spending_bucket',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.category}: {self.total}"
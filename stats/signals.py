@@ -0,0 +1,46 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from SurvivalPlan.models import Expense
+from SurvivalPlan.previous import previous_expense
+from stats.models import MonthlySpending
+
+
+def _bucket(user_id, expense_date, category):
+    expense_date = Expense._meta.get_field('date').to_python(expense_date)
+    return (user_id, expense_date.replace(day=1), category)
+
+
+@receiver(post_save, sender=Expense)
+def add_expense_to_rollup(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    new_bucket = _bucket(instance.user_id, instance.date, instance.category)
+    previous = previous_expense(instance)
+
+    if previous is None:
+        MonthlySpending.objects.apply_delta(*new_bucket, instance.amount, 1)
+        return
+
+    old_bucket = _bucket(*previous[:3])
+    old_amount = previous[3]
+
+    if old_bucket == new_bucket:
+        if instance.amount != old_amount:
+            MonthlySpending.objects.apply_delta(
+                *new_bucket, instance.amount - old_amount, 0
+            )
+        return
+
+    MonthlySpending.objects.apply_delta(*old_bucket, -old_amount, -1)
+    MonthlySpending.objects.apply_delta(*new_bucket, instance.amount, 1)
+
+
+@receiver(post_delete, sender=Expense)
+def remove_expense_from_rollup(sender, instance, **kwargs):
+    MonthlySpending.objects.apply_delta(
+        *_bucket(instance.user_id, instance.date, instance.category),
+        -instance.amount,
+        -1,
+    )
@@ -1,3 +1,286 @@
+from datetime import date
+from io import StringIO
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command, CommandError
 from django.test import TestCase
+from rest_framework.test import (
+    APIClient,
+    APIRequestFactory,
+    force_authenticate,
+)
+
+from SurvivalPlan.models import SurvivalPlan, PlanItem, Expense
+from stats.models import MonthlySpending
+from stats.views import (
+    MonthlyStatsView,
+    AsyncMonthlyStatsView,
+    YearlyStatsView,
+    AsyncYearlyStatsView,
+    MonthlyCategoryStatsView,
+    AsyncMonthlyCategoryStatsView,
+    YearlyCategoryStatsView,
+    AsyncYearlyCategoryStatsView,
+)
+from SurvivalApp.cache import cache_stats
+
+User = get_user_model()
+
+
+class MonthlySpendingRollupTests(TestCase):
+    """Tests for keeping the spending rollup in sync with expenses"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='user@example.com', password='pass12345'
+        )
+
+    def bucket(self, month, category):
+        return MonthlySpending.objects.filter(
+            user=self.user, month=month, category=category
+        ).values_list('total', 'count').first()
+
+    def expense(self, **kwargs):
+        defaults = {
+            'user': self.user,
+            'title': 'Expense',
+            'category': 'food',
+            'amount': 100,
+            'date': date(2025, 3, 10),
+        }
+        defaults.update(kwargs)
+        return Expense.objects.create(**defaults)
+
+    def test_create_adds_to_bucket(self):
+        self.expense()
+        self.expense(amount=50, date=date(2025, 3, 31))
+
+        self.assertEqual(self.bucket(date(2025, 3, 1), 'food'), (150, 2))
+
+    def test_update_amount_changes_bucket(self):
+        expense = self.expense()
+        expense.amount = 40
+        expense.save()
+
+        self.assertEqual(self.bucket(date(2025, 3, 1), 'food'), (40, 1))
+
+    def test_update_moves_between_months_and_categories(self):
+        expense = self.expense()
+        self.expense(amount=10)
+        expense.date = date(2025, 4, 2)
+        expense.category = 'rent'
+        expense.save()
+
+        self.assertEqual(self.bucket(date(2025, 3, 1), 'food'), (10, 1))
+        self.assertEqual(self.bucket(date(2025, 4, 1), 'rent'), (100, 1))
+
+    def test_delete_removes_empty_bucket(self):
+        expense = self.expense()
+        expense.delete()
+
+        self.assertIsNone(self.bucket(date(2025, 3, 1), 'food'))
+
+    def test_rebuild_command_repairs_rollup(self):
+        self.expense()
+        self.expense(category='rent', amount=700)
+        MonthlySpending.objects.all().delete()
+
+        with self.assertRaises(CommandError):
+            call_command(
+                'rebuild_spending_rollup', '--verify', stdout=StringIO()
+            )
+
+        call_command('rebuild_spending_rollup', stdout=StringIO())
+        call_command('rebuild_spending_rollup', '--verify', stdout=StringIO())
+        self.assertEqual(self.bucket(date(2025, 3, 1), 'rent'), (700, 1))
+
+
+class StatsViewTests(TestCase):
+    """Tests for the stats endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='user@example.com', password='pass12345'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        plan = SurvivalPlan.objects.create(
+            user=self.user, title='March', income=1000, month=date(2025, 3, 1)
+        )
+        PlanItem.objects.create(plan=plan, category='food', amount=300)
+        expenses = [(1, 'food', 100), (15, 'food', 50), (31, 'rent', 400)]
+        for day, category, amount in expenses:
+            Expense.objects.create(
+                user=self.user,
+                title='Expense',
+                category=category,
+                amount=amount,
+                date=date(2025, 3, day),
+            )
+        Expense.objects.create(
+            user=self.user, title='Gift', category='food', amount=25,
+            date=date(2025, 12, 20)
+        )
+
+    def test_monthly_stats(self):
+        res = self.client.get('/api/stats/monthly/2025-03/')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['total_expense'], 550)
+        self.assertEqual(res.data['net_savings'], 450)
+
+    def test_monthly_category_stats(self):
+        res = self.client.get('/api/stats/category/food/monthly/2025-03/')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['amount'], 300)
+        self.assertEqual(res.data['total_expense'], 150)
+
+    def test_monthly_category_stats_missing_item(self):
+        res = self.client.get('/api/stats/category/travel/monthly/2025-03/')
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_yearly_stats(self):
+        res = self.client.get('/api/stats/yearly/2025/')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['total_income'], 1000)
+        self.assertEqual(res.data['total_expense'], 575)
+        self.assertEqual(res.data['epenses_not_convered_by_any_plan'], 25)
+        self.assertEqual(
+            res.data['monthly_breakdown']['2025-03']['total_expense'], 550
+        )
+
+    def test_yearly_category_stats(self):
+        res = self.client.get('/api/stats/category/food/yearly/2025/')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['total_amount'], 300)
+        self.assertEqual(res.data['total_expense'], 175)
+        self.assertEqual(res.data['number_of_plans'], 1)
+
+    def test_yearly_stats_query_count_is_fixed(self):
+        for month in range(4, 13):
+            SurvivalPlan.objects.create(
+                user=self.user, title='Plan', income=1000,
+                month=date(2025, month, 1)
+            )
+
+        with self.assertNumQueries(2):
+            res = self.client.get('/api/stats/yearly/2025/')
+
+        self.assertEqual(res.data['number_of_plans'], 10)
+
+    def test_yearly_category_stats_query_count_is_fixed(self):
+        for month in range(4, 13):
+            plan = SurvivalPlan.objects.create(
+                user=self.user, title='Plan', income=1000,
+                month=date(2025, month, 1)
+            )
+            PlanItem.objects.create(plan=plan, category='food', amount=200)
+
+        with self.assertNumQueries(2):
+            res = self.client.get('/api/stats/category/food/yearly/2025/')
+
+        self.assertEqual(res.data['number_of_plans'], 10)
+        self.assertEqual(res.data['total_amount'], 300 + 9 * 200)
+
+    def test_stats_response_is_cached(self):
+        self.client.get('/api/stats/monthly/2025-03/')
+
+        with self.assertNumQueries(0):
+            res = self.client.get('/api/stats/monthly/2025-03/')
+
+        self.assertEqual(res.data['total_expense'], 550)
+        self.assertEqual(cache_stats()['hits'], 1)
+        self.assertEqual(cache_stats()['misses'], 1)
+
+    def test_cache_invalidated_on_expense_change(self):
+        self.client.get('/api/stats/monthly/2025-03/')
+        Expense.objects.create(
+            user=self.user, title='Late', category='food', amount=50,
+            date=date(2025, 3, 2)
+        )
+
+        res = self.client.get('/api/stats/monthly/2025-03/')
+
+        self.assertEqual(res.data['total_expense'], 600)
+
+    def test_cache_is_per_user(self):
+        self.client.get('/api/stats/monthly/2025-03/')
+        other = User.objects.create_user(
+            email='other@example.com', password='pass12345'
+        )
+        self.client.force_authenticate(other)
+
+        res = self.client.get('/api/stats/monthly/2025-03/')
+
+        self.assertEqual(res.status_code, 404)
+
+
+class AsyncStatsViewTests(TestCase):
+    """The async stats views answer like the sync ones"""
+
+    setUp = StatsViewTests.setUp
+
+    def fetch(self, view, url, **kwargs):
+        cache.clear()
+        request = APIRequestFactory().get(url)
+        force_authenticate(request, user=self.user)
+        if view.view_is_async:
+            return async_to_sync(view.as_view())(request, **kwargs)
+        return view.as_view()(request, **kwargs)
+
+    def assertSameResponse(self, sync_view, async_view, url, **kwargs):
+        expected = self.fetch(sync_view, url, **kwargs)
+        res = self.fetch(async_view, url, **kwargs)
+
+        self.assertEqual(res.status_code, expected.status_code)
+        self.assertEqual(res.data, expected.data)
+        return res
+
+    def test_async_monthly_stats(self):
+        res = self.assertSameResponse(
+            MonthlyStatsView, AsyncMonthlyStatsView, '/', month='2025-03'
+        )
+        self.assertEqual(res.data['total_expense'], 550)
+
+        for month in ('2025-04', 'March'):
+            self.assertSameResponse(
+                MonthlyStatsView, AsyncMonthlyStatsView, '/', month=month
+            )
+
+    def test_async_yearly_stats(self):
+        res = self.assertSameResponse(
+            YearlyStatsView, AsyncYearlyStatsView, '/', year=2025
+        )
+        self.assertEqual(res.data['total_income'], 1000)
+
+    def test_async_category_stats(self):
+        for category in ('food', 'travel'):
+            self.assertSameResponse(
+                MonthlyCategoryStatsView, AsyncMonthlyCategoryStatsView, '/',
+                category=category, month='2025-03',
+            )
+            self.assertSameResponse(
+                YearlyCategoryStatsView, AsyncYearlyCategoryStatsView, '/',
+                category=category, year=2025,
+            )
+
+    def test_async_view_uses_response_cache(self):
+        self.fetch(AsyncMonthlyStatsView, '/', month='2025-03')
+        request = APIRequestFactory().get('/')
+        force_authenticate(request, user=self.user)
+
+        with self.assertNumQueries(0):
+            res = async_to_sync(AsyncMonthlyStatsView.as_view())(
+                request, month='2025-03'
+            )
 
-# Create your tests here.
+        self.assertEqual(res.data['total_expense'], 550)
+        self.assertEqual(cache_stats()['hits'], 1)
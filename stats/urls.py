@@ -1,10 +1,15 @@
-from django.urls import path, include
+from django.urls import path
 from rest_framework.routers import DefaultRouter
+from SurvivalApp.asyncviews import as_view
 from stats.views import (
     MonthlyStatsView,
+    AsyncMonthlyStatsView,
     YearlyStatsView,
+    AsyncYearlyStatsView,
     MonthlyCategoryStatsView,
+    AsyncMonthlyCategoryStatsView,
     YearlyCategoryStatsView,
+    AsyncYearlyCategoryStatsView,
 )
 
 
@@ -14,13 +19,22 @@ router = DefaultRouter()
 app_name = 'stats'
 
 
+monthly = as_view(MonthlyStatsView, AsyncMonthlyStatsView)
+yearly = as_view(YearlyStatsView, AsyncYearlyStatsView)
+category_monthly = as_view(
+    MonthlyCategoryStatsView, AsyncMonthlyCategoryStatsView
+)
+category_yearly = as_view(
+    YearlyCategoryStatsView, AsyncYearlyCategoryStatsView
+)
+
 urlpatterns = [
-    path('monthly/', MonthlyStatsView.as_view()),
-    path('monthly/<str:month>/', MonthlyStatsView.as_view()),
-    path('yearly/', YearlyStatsView.as_view()),
-    path('yearly/<int:year>/', YearlyStatsView.as_view()),
-    path('category/<str:category>/monthly/', MonthlyCategoryStatsView.as_view()),
-    path('category/<str:category>/monthly/<str:month>/', MonthlyCategoryStatsView.as_view()),
-    path('category/<str:category>/yearly/', YearlyCategoryStatsView.as_view()),
-    path('category/<str:category>/yearly/<int:year>/', YearlyCategoryStatsView.as_view()),
+    path('monthly/', monthly),
+    path('monthly/<str:month>/', monthly),
+    path('yearly/', yearly),
+    path('yearly/<int:year>/', yearly),
+    path('category/<str:category>/monthly/', category_monthly),
+    path('category/<str:category>/monthly/<str:month>/', category_monthly),
+    path('category/<str:category>/yearly/', category_yearly),
+    path('category/<str:category>/yearly/<int:year>/', category_yearly),
 ]
@@ -1,3 +1,4 @@
+from asgiref.sync import sync_to_async
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -5,209 +6,223 @@ from datetime import date, timedelta
 
 from SurvivalPlan.models import (
     SurvivalPlan,
-    Expense,
     PlanItem,
 )
+from SurvivalApp.asyncviews import AsyncAPIView
+from SurvivalApp.cache import cached_response
+from SurvivalApp.conditional import ConditionalRequestMixin
+from SurvivalPlan.utils import parse_month, month_range
+from stats.aggregates import (
+    month_window,
+    plan_incomes,
+    plan_item_amounts,
+    spending_by_month,
+    monthly_breakdown,
+)
 
-class MonthlyStatsView(APIView):
 
-    def get(self, request, month=None):
-        user = request.user
+def requested_month(month):
+    """Return [start, end) of a YYYY-MM month, by default the current one"""
+    if month is not None:
+        month_start = parse_month(month)
+    else:
         today = date.today()
+        month_start = date(today.year, today.month, 1)
+    return month_range(month_start)
 
-        if month is not None:
-            try:
-                year, month_num = map(int, month.split('-'))
-            except (ValueError, TypeError):
-                return Response("Invalid month format. Use YYYY-MM.", status=status.HTTP_400_BAD_REQUEST)
-        else:
-            year, month_num = today.year, today.month
 
-        try:
-            plan = SurvivalPlan.objects.get(user=user, month__year=year, month__month=month_num)
-            income = plan.income
-        except SurvivalPlan.DoesNotExist:
-            return Response("No plan at the given month", status=status.HTTP_404_NOT_FOUND)
+def requested_year(year):
+    """Return the 12 months of a year, by default starting a year ago"""
+    if year is not None:
+        return month_window(date(year, 1, 1))
+    return month_window(date.today() - timedelta(days=365))
 
 
-        expenses = Expense.objects.filter(user=user, date__year=year, date__month=month_num)
-        total_expenses = sum(exp.amount for exp in expenses)
+def yearly_summary(monthly_data, monthly_expenses, budget_key):
+    total_budget = sum(m[budget_key] for m in monthly_data.values())
+    total_expense = sum(monthly_expenses.values())
+    plan_expense = sum(m["total_expense"] for m in monthly_data.values())
 
-        return Response({
-            "month": f"{year}-{month_num:02}",
-            "income": income,
-            "total_expense": total_expenses,
-            "net_savings": income - total_expenses,
-        })
+    return {
+        f"total_{budget_key}": total_budget,
+        "total_expense": total_expense,
+        "net_savings": total_budget - total_expense,
+        "epenses_not_convered_by_any_plan": total_expense - plan_expense,
+        "number_of_plans": len(monthly_data),
+        "monthly_breakdown": monthly_data
+    }
 
 
-class YearlyStatsView(APIView):
+def year_range(months):
+    first, last = months[0], months[-1]
+    return f"{first.strftime('%Y-%m')} to {last.strftime('%Y-%m')}"
 
-    def get(self, request, year=None):
-        user = request.user
-        today = date.today()
 
-        if year is not None:
-            start = date(year, 1, 1)
-            end = date(year, 12, 1)
-        else:
-            start = today - timedelta(days=365)
-            end = today
-
-        plans = SurvivalPlan.objects.filter(user=user, month__range=(start, end))
-        expenses = Expense.objects.filter(user=user, date__range=(start, end))
-
-        monthly_data = {}
-        months = []
-        start_year = start.year
-        start_month = start.month
-
-        for i in range(12):
-            month = (start_month + i - 1) % 12 + 1
-            year = start_year + (start_month + i - 1) // 12
-            months.append(date(year, month, 1))
-        
-        for month in months:
-            try:
-                plan = plans.get(month__year=month.year, month__month=month.month)
-                income = plan.income
-            except SurvivalPlan.DoesNotExist:
-                continue
-            monthly_expenses = expenses.filter(date__year=month.year, date__month=month.month)
-            total_expense = sum(exp.amount for exp in monthly_expenses)
-
-            monthly_data[month.strftime('%Y-%m')] = {
-                "income": income,
-                "total_expense": total_expense,
-                "net_savings": income - total_expense
-            }
-
-        total_income = sum(m["income"] for m in monthly_data.values())
-        total_expense = sum(exp.amount for exp in expenses)
-        plan_expense = sum(m["total_expense"] for m in monthly_data.values())
-
-        return Response({
-            "range": f"{months[0].strftime('%Y-%m')} to {months[11].strftime('%Y-%m')}",
-            "total_income": total_income,
-            "total_expense": total_expense,
-            "net_savings": total_income - total_expense,
-            "epenses_not_convered_by_any_plan": total_expense - plan_expense,
-            "number_of_plans": len(monthly_data),
-            "monthly_breakdown": monthly_data
-        })
-
-
-class MonthlyCategoryStatsView(APIView):
+INVALID_MONTH = "Invalid month format. Use YYYY-MM."
 
-    def get(self, request, category=None,  month=None):
-        user = request.user
-        today = date.today()
 
-        if category is None:
-            return Response("Category is not entered.", status=status.HTTP_400_BAD_REQUEST)
-
-        if month is not None:
-            try:
-                year, month_num = map(int, month.split('-'))
-            except (ValueError, TypeError):
-                return Response(
-                    "Invalid month format. Use YYYY-MM.",
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-        else:
-            year, month_num = today.year, today.month
-
-        try:
-            plan = SurvivalPlan.objects.get(
-                user=user,
-                month__year=year,
-                month__month=month_num
-            )
-            planitem = PlanItem.objects.get(plan=plan, category=category)
-            amount = planitem.amount
-        except SurvivalPlan.DoesNotExist or PlanItem.DoesNotExist:
-            return Response(
-                "No plan at the given month has this cateogry",
-                status=status.HTTP_404_NOT_FOUND
-            )
-
-
-        expenses = Expense.objects.filter(
-            user=user,
-            date__year=year,
-            date__month=month_num,
-            category=category
+def monthly_stats(user, month=None):
+    """Response of the monthly stats endpoint"""
+    try:
+        start, end = requested_month(month)
+    except (ValueError, TypeError):
+        return Response(INVALID_MONTH, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        plan = SurvivalPlan.objects.get(
+            user=user, month__gte=start, month__lt=end
+        )
+        income = plan.income
+    except SurvivalPlan.DoesNotExist:
+        return Response(
+            "No plan at the given month",
+            status=status.HTTP_404_NOT_FOUND
         )
 
-        total_expenses = sum(exp.amount for exp in expenses)
+    total_expenses = spending_by_month(user, start, end).get(start, 0)
 
-        return Response({
-            "month": f"{year}-{month_num:02}",
-            "category": category,
-            "amount": amount,
-            "total_expense": total_expenses,
-            "net_savings": amount - total_expenses,
-        })
+    return Response({
+        "month": f"{start.year}-{start.month:02}",
+        "income": income,
+        "total_expense": total_expenses,
+        "net_savings": income - total_expenses,
+    })
 
 
-class YearlyCategoryStatsView(APIView):
+def yearly_stats(user, year=None):
+    """Response of the yearly stats endpoint"""
+    months = requested_year(year)
+    start, end = months[0], month_range(months[11])[1]
+    incomes = plan_incomes(user, start, end)
+    monthly_expenses = spending_by_month(user, start, end)
+
+    monthly_data = monthly_breakdown(
+        months, incomes, monthly_expenses, "income"
+    )
+
+    return Response({
+        "range": year_range(months),
+        **yearly_summary(monthly_data, monthly_expenses, "income"),
+    })
 
-    def get(self, request, category=None, year=None):
-        user = request.user
-        today = date.today()
 
-        if year is not None:
-            start = date(year, 1, 1)
-            end = date(year, 12, 1)
-        else:
-            start = today - timedelta(days=365)
-            end = today
+def monthly_category_stats(user, category=None, month=None):
+    """Response of the monthly category stats endpoint"""
+    if category is None:
+        return Response(
+            "Category is not entered.",
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        start, end = requested_month(month)
+    except (ValueError, TypeError):
+        return Response(INVALID_MONTH, status=status.HTTP_400_BAD_REQUEST)
 
-        plans = SurvivalPlan.objects.filter(user=user, month__range=(start, end))
-        expenses = Expense.objects.filter(
+    try:
+        plan = SurvivalPlan.objects.get(
             user=user,
-            category=category,
-            date__range=(start, end)
+            month__gte=start,
+            month__lt=end
         )
+        planitem = PlanItem.objects.get(plan=plan, category=category)
+        amount = planitem.amount
+    except (SurvivalPlan.DoesNotExist, PlanItem.DoesNotExist):
+        return Response(
+            "No plan at the given month has this cateogry",
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    total_expenses = spending_by_month(
+        user, start, end, category
+    ).get(start, 0)
+
+    return Response({
+        "month": f"{start.year}-{start.month:02}",
+        "category": category,
+        "amount": amount,
+        "total_expense": total_expenses,
+        "net_savings": amount - total_expenses,
+    })
+
+
+def yearly_category_stats(user, category=None, year=None):
+    """Response of the yearly category stats endpoint"""
+    months = requested_year(year)
+    start, end = months[0], month_range(months[11])[1]
+    amounts = plan_item_amounts(user, start, end, category)
+    monthly_expenses = spending_by_month(user, start, end, category)
+
+    monthly_data = monthly_breakdown(
+        months, amounts, monthly_expenses, "amount"
+    )
+
+    return Response({
+        "range": year_range(months),
+        "category": category,
+        **yearly_summary(monthly_data, monthly_expenses, "amount"),
+    })
+
+
+class MonthlyStatsView(ConditionalRequestMixin, APIView):
+    conditional_date_dependent = True
+
+    @cached_response('stats-monthly')
+    def get(self, request, month=None):
+        return monthly_stats(request.user, month)
 
-        monthly_data = {}
-        months = []
-        start_year = start.year
-        start_month = start.month
-
-        for i in range(12):
-            month = (start_month + i - 1) % 12 + 1
-            year = start_year + (start_month + i - 1) // 12
-            months.append(date(year, month, 1))
-        
-        for month in months:
-            try:
-                plan = plans.get(month__year=month.year, month__month=month.month)
-                planitem = PlanItem.objects.get(plan=plan, category=category)
-                amount = planitem.amount
-            except SurvivalPlan.DoesNotExist or PlanItem.DoesNotExist:
-                continue
-
-            monthly_expenses = expenses.filter(date__year=month.year, date__month=month.month)
-            total_expense = sum(exp.amount for exp in monthly_expenses)
-
-            monthly_data[month.strftime('%Y-%m')] = {
-                "amount": amount,
-                "total_expense": total_expense,
-                "net_savings": amount - total_expense
-            }
-
-        total_amount = sum(m["amount"] for m in monthly_data.values())
-        total_expense = sum(exp.amount for exp in expenses)
-        plan_expense = sum(m["total_expense"] for m in monthly_data.values())
-
-        return Response({
-            "range": f"{months[0].strftime('%Y-%m')} to {months[11].strftime('%Y-%m')}",
-            "category": category,
-            "total_amount": total_amount,
-            "total_expense": total_expense,
-            "net_savings": total_amount - total_expense,
-            "epenses_not_convered_by_any_plan": total_expense - plan_expense,
-            "number_of_plans": len(monthly_data),
-            "monthly_breakdown": monthly_data
-        })
\ No newline at end of file
+
+class AsyncMonthlyStatsView(MonthlyStatsView, AsyncAPIView):
+
+    @cached_response('stats-monthly')
+    async def get(self, request, month=None):
+        return await sync_to_async(monthly_stats)(request.user, month)
+
+
+class YearlyStatsView(ConditionalRequestMixin, APIView):
+    conditional_date_dependent = True
+
+    @cached_response('stats-yearly')
+    def get(self, request, year=None):
+        return yearly_stats(request.user, year)
+
+
+class AsyncYearlyStatsView(YearlyStatsView, AsyncAPIView):
+
+    @cached_response('stats-yearly')
+    async def get(self, request, year=None):
+        return await sync_to_async(yearly_stats)(request.user, year)
+
+
+class MonthlyCategoryStatsView(ConditionalRequestMixin, APIView):
+    conditional_date_dependent = True
+
+    @cached_response('stats-category-monthly')
+    def get(self, request, category=None,  month=None):
+        return monthly_category_stats(request.user, category, month)
+
+
+class AsyncMonthlyCategoryStatsView(MonthlyCategoryStatsView, AsyncAPIView):
+
+    @cached_response('stats-category-monthly')
+    async def get(self, request, category=None,  month=None):
+        return await sync_to_async(monthly_category_stats)(
+            request.user, category, month
+        )
+
+
+class YearlyCategoryStatsView(ConditionalRequestMixin, APIView):
+    conditional_date_dependent = True
+
+    @cached_response('stats-category-yearly')
+    def get(self, request, category=None, year=None):
+        return yearly_category_stats(request.user, category, year)
+
+
+class AsyncYearlyCategoryStatsView(YearlyCategoryStatsView, AsyncAPIView):
+
+    @cached_response('stats-category-yearly')
+    async def get(self, request, category=None, year=None):
+        return await sync_to_async(yearly_category_stats)(
+            request.user, category, year
+        )
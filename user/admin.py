@@ -1,4 +1,5 @@
 from django.contrib import admin
-from user.models import User
+from user.models import User, OutgoingEmail
 
 admin.site.register(User)
+admin.site.register(OutgoingEmail)
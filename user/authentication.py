@@ -0,0 +1,89 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+"""Fields kept in the cache, everything else is loaded when accessed"""
+CACHED_FIELDS = (
+    'id', 'email', 'name', 'is_active', 'is_staff', 'is_superuser',
+)
+
+
+def user_cache_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def cached_user_data(user):
+    """What is cached of a user: never the password hash itself"""
+    data = {field: getattr(user, field) for field in CACHED_FIELDS}
+    data['revoke_hash'] = get_md5_hash_password(user.password)
+    return data
+
+
+def user_from_cache(data):
+    """Rebuild a user with the cached fields loaded and the rest deferred"""
+    User = get_user_model()
+    fields = [
+        field.attname for field in User._meta.concrete_fields
+        if field.attname in data
+    ]
+    return User.from_db(
+        router.db_for_read(User), fields, [data[field] for field in fields]
+    )
+
+
+def forget_cached_user(user_id):
+    """Drop a user from the cache, again after commit in case it was re-read"""
+    key = user_cache_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that keeps resolved users in the shared cache for
+    AUTH_USER_CACHE_TIMEOUT seconds instead of querying them on every
+    request. Saving or deleting a user drops the cached copy.
+
+    Only CACHED_FIELDS and a hash for the revoke check are cached, so
+    password hashes never reach a shared or file based cache. Other
+    fields of the rebuilt user, like the password, are queried on access.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        key = user_cache_key(user_id)
+        data = cache.get(key)
+        if data is None:
+            user = super().get_user(validated_token)
+            cache.set(
+                key, cached_user_data(user), settings.AUTH_USER_CACHE_TIMEOUT
+            )
+            return user
+        user = user_from_cache(data)
+
+        """Same checks as JWTAuthentication.get_user does after the query"""
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(
+                _("User is inactive"), code="user_inactive"
+            )
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != data['revoke_hash']:
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."),
+                    code="password_changed",
+                )
+
+        return user
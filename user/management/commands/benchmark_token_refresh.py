@@ -0,0 +1,149 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow
+from rest_framework_simplejwt.views import TokenRefreshView
+
+from user.management.commands.prune_tokens import prune_expired_tokens
+from user.tokens import CachedBlacklistRefreshToken
+
+User = get_user_model()
+
+SERIALIZERS = {
+    'stock': ('rest_framework_simplejwt.serializers.TokenRefreshSerializer',
+              RefreshToken),
+    'cached': ('user.serializers.CachedBlacklistTokenRefreshSerializer',
+               CachedBlacklistRefreshToken),
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure token refresh throughput with a large history of outstanding "
+        "and blacklisted tokens, with the stock and the cached blacklist "
+        "check, before and after pruning. Runs on throwaway data that is "
+        "rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tokens', type=int, default=1000000)
+        parser.add_argument(
+            '--expired',
+            type=float,
+            default=0.9,
+            help="Fraction of the historical tokens that has expired",
+        )
+        parser.add_argument('--requests', type=int, default=500)
+
+    def handle(self, *args, **options):
+        try:
+            with (
+                transaction.atomic(),
+                override_settings(ALLOWED_HOSTS=['localhost']),
+            ):
+                self.run(
+                    options['tokens'], options['expired'], options['requests']
+                )
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, tokens, expired, requests):
+        user = User.objects.create_user(
+            email='refresh-benchmark@example.com', password='unused-password'
+        )
+
+        started = time.perf_counter()
+        self.create_history(user, tokens, expired)
+        self.stdout.write(
+            f"Inserted {tokens} historical tokens "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+        self.report(user, requests)
+
+        started = time.perf_counter()
+        deleted = prune_expired_tokens()
+        self.stdout.write(
+            f"Pruned {deleted} expired tokens "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+        self.report(user, requests)
+
+    def create_history(self, user, tokens, expired, batch_size=10000):
+        """Every tenth historical token is blacklisted, like a logout"""
+        now = aware_utcnow()
+        cutoff = int(tokens * expired)
+        for start in range(0, tokens, batch_size):
+            batch = OutstandingToken.objects.bulk_create([
+                OutstandingToken(
+                    user=user,
+                    jti=uuid.uuid4().hex,
+                    token='historical',
+                    created_at=now,
+                    expires_at=now + (
+                        timedelta(days=-1) if i < cutoff else timedelta(days=1)
+                    ),
+                )
+                for i in range(start, min(start + batch_size, tokens))
+            ])
+            BlacklistedToken.objects.bulk_create([
+                BlacklistedToken(token=token) for token in batch[::10]
+            ])
+
+    def report(self, user, requests):
+        self.stdout.write(
+            f"  {OutstandingToken.objects.count()} outstanding, "
+            f"{BlacklistedToken.objects.count()} blacklisted"
+        )
+        self.stdout.write(
+            f"  {'check':>8} {'refresh/s':>10} {'queries/refresh':>16}"
+        )
+        for name, (serializer, token_class) in SERIALIZERS.items():
+            rate, queries = self.time_refreshes(
+                user, serializer, token_class, requests
+            )
+            self.stdout.write(f"  {name:>8} {rate:>10.0f} {queries:>16.1f}")
+
+    def time_refreshes(self, user, serializer, token_class, requests):
+        """Refresh in a chain, each request using the rotated token"""
+        cache.clear()
+        view = TokenRefreshView.as_view(_serializer_class=serializer)
+        factory = APIRequestFactory(SERVER_NAME='localhost')
+        refresh = str(token_class.for_user(user))
+
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            started = time.perf_counter()
+            for _ in range(requests):
+                request = factory.post(
+                    '/', {'refresh': refresh}, format='json'
+                )
+                response = view(request)
+                refresh = response.data['refresh']
+            elapsed = time.perf_counter() - started
+
+        return requests / elapsed, queries / requests
@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+def prune_expired_tokens(batch_size=5000):
+    """Delete expired outstanding tokens and their blacklist entries
+
+    The same delete as simplejwt's flushexpiredtokens, done in batches of
+    ids, oldest first, so a large backlog neither holds one long
+    transaction nor loads every expired token at once. Blacklist entries
+    go with their tokens through the cascade. Returns the number of
+    outstanding tokens deleted.
+    """
+    now = aware_utcnow()
+    deleted = 0
+    last_id = 0
+    while True:
+        ids = list(
+            OutstandingToken.objects
+            .filter(id__gt=last_id, expires_at__lte=now)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+
+        with transaction.atomic():
+            _, per_model = OutstandingToken.objects.filter(id__in=ids).delete()
+        deleted += per_model.get(OutstandingToken._meta.label, 0)
+        last_id = ids[-1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired outstanding and blacklisted refresh tokens in "
+        "batches, so the token tables stay bounded by "
+        "REFRESH_TOKEN_LIFETIME. Runs once, e.g. from cron, unless "
+        "--interval is given, in which case it keeps running and prunes "
+        "every interval (the prune_tokens compose service)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help="Seconds between prunes when running as a worker",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                deleted = prune_expired_tokens(options['batch_size'])
+                self.stdout.write(
+                    self.style.SUCCESS(f"Deleted {deleted} expired tokens")
+                )
+                if not options['interval']:
+                    return
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
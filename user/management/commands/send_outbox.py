@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from user.outbox import MAX_ATTEMPTS, send_batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Send queued mail from the outbox. Runs as a long lived worker "
+        "unless --once is given, in which case it drains due mail and exits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true')
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS)
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help="Seconds to sleep when no mail is due",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                sent, failed = send_batch(
+                    options['batch_size'], options['max_attempts']
+                )
+                if sent or failed:
+                    self.stdout.write(f"Sent {sent}, failed {failed}")
+                    continue
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,115 @@
+"""
+Database backed email outbox.
+
+Requests only insert an OutgoingEmail row. The send_outbox worker claims
+due rows in batches, sends each batch over one SMTP connection and
+reschedules failures with exponential backoff until MAX_ATTEMPTS.
+"""
+import smtplib
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from user.models import OutgoingEmail
+
+MAX_ATTEMPTS = 5
+RETRY_BASE = timedelta(seconds=30)
+RETRY_MAX = timedelta(hours=1)
+"""How long a claimed batch is hidden from other workers"""
+LEASE = timedelta(minutes=5)
+
+SEND_ERRORS = (smtplib.SMTPException, OSError)
+
+
+def enqueue_email(subject, body, to, from_email=None):
+    """Queue a mail, returns immediately"""
+    return OutgoingEmail.objects.create(
+        subject=subject,
+        body=body,
+        to=list(to),
+        from_email=from_email or '',
+    )
+
+
+def backoff(attempts):
+    return min(RETRY_BASE * 2 ** (attempts - 1), RETRY_MAX)
+
+
+def claim_batch(batch_size):
+    """Lease due mail so concurrent workers do not send it twice"""
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutgoingEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=OutgoingEmail.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        OutgoingEmail.objects.filter(
+            pk__in=[email.pk for email in emails]
+        ).update(
+            next_attempt_at=now + LEASE
+        )
+    for email in emails:
+        email.next_attempt_at = now + LEASE
+    return emails
+
+
+def _failed(email, error, max_attempts):
+    email.attempts += 1
+    email.last_error = f"{type(error).__name__}: {error}"
+    if email.attempts >= max_attempts:
+        email.status = OutgoingEmail.FAILED
+    else:
+        email.next_attempt_at = timezone.now() + backoff(email.attempts)
+
+
+def send_batch(batch_size=50, max_attempts=MAX_ATTEMPTS):
+    """Send one batch of due mail, returns (sent, failed)"""
+    emails = claim_batch(batch_size)
+    if not emails:
+        return 0, 0
+
+    connection = get_connection()
+    try:
+        connection.open()
+    except SEND_ERRORS as e:
+        for email in emails:
+            _failed(email, e, max_attempts)
+    else:
+        try:
+            for email in emails:
+                message = EmailMessage(
+                    email.subject,
+                    email.body,
+                    email.from_email or None,
+                    email.to,
+                    connection=connection,
+                )
+                try:
+                    connection.send_messages([message])
+                except SEND_ERRORS as e:
+                    _failed(email, e, max_attempts)
+                    if isinstance(
+                        e, (smtplib.SMTPServerDisconnected, OSError)
+                    ):
+                        """Reconnect for the rest, retried if that fails"""
+                        connection.close()
+                        try:
+                            connection.open()
+                        except SEND_ERRORS:
+                            break
+                else:
+                    email.status = OutgoingEmail.SENT
+                    email.sent_at = timezone.now()
+        finally:
+            connection.close()
+
+    OutgoingEmail.objects.bulk_update(
+        emails,
+        ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'],
+    )
+    sent = sum(email.status == OutgoingEmail.SENT for email in emails)
+    return sent, len(emails) - sent
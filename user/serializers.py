@@ -1,7 +1,13 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+)
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 
+from user.tokens import CachedBlacklistRefreshToken
+
 User = get_user_model()
 
 
@@ -106,3 +112,13 @@ class AdminUserSerializer(serializers.ModelSerializer):
         fields = ['id', 'email', 'name', 'is_active',
                   'is_staff', 'is_superuser']
         read_only_fields = ['id', 'email']
+
+
+class CachedBlacklistTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh serializer checking the blacklist through the cache"""
+    token_class = CachedBlacklistRefreshToken
+
+
+class CachedBlacklistTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Login serializer issuing tokens known to the blacklist cache"""
+    token_class = CachedBlacklistRefreshToken
@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.utils import datetime_to_epoch
+
+from user.authentication import forget_cached_user
+from user.tokens import blacklist_cache_key, seconds_until
+
+User = get_user_model()
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Covers password changes, deactivation and permission edits"""
+    forget_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def cache_blacklisted_token(sender, instance, created, **kwargs):
+    key = blacklist_cache_key(instance.token.jti)
+    timeout = seconds_until(datetime_to_epoch(instance.token.expires_at))
+    transaction.on_commit(lambda: cache.set(key, True, timeout))
+
+
+@receiver(post_delete, sender=BlacklistedToken)
+def forget_blacklisted_token(sender, instance, **kwargs):
+    try:
+        key = blacklist_cache_key(instance.token.jti)
+    except OutstandingToken.DoesNotExist:
+        return
+    transaction.on_commit(lambda: cache.delete(key))
@@ -0,0 +1,373 @@
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+
+from SurvivalApp.metrics import registry
+from user.models import OutgoingEmail
+from user.outbox import enqueue_email
+from user.throttling import TokenBucketThrottle
+
+User = get_user_model()
+
+
+class CachedAuthenticationTests(TestCase):
+    """Tests for resolving JWT users from the cache"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='user@example.com', password='pass12345', name='User'
+        )
+        self.client = APIClient()
+        res = self.client.post('/api/auth/login/', {
+            'email': 'user@example.com', 'password': 'pass12345'
+        })
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {res.data['access']}"
+        )
+
+    def test_second_request_runs_no_queries(self):
+        with self.assertNumQueries(1):
+            self.client.get('/api/auth/me/')
+        with self.assertNumQueries(0):
+            res = self.client.get('/api/auth/me/')
+
+        self.assertEqual(res.data['email'], 'user@example.com')
+
+    def test_saving_user_invalidates_cache(self):
+        self.client.get('/api/auth/me/')
+
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get('/api/auth/me/')
+        self.assertEqual(res.status_code, 401)
+
+    def test_password_change_refreshes_cached_user(self):
+        self.client.get('/api/auth/me/')
+        self.client.post('/api/auth/change-password/', {
+            'old_password': 'pass12345',
+            'new_password': 'newpass12345',
+            'new_password_confirm': 'newpass12345',
+        })
+
+        cached = cache.get(f'auth-user:{self.user.pk}')
+        self.assertIsNone(cached)
+        with self.assertNumQueries(1):
+            self.client.get('/api/auth/me/')
+
+    def test_password_hash_is_not_cached(self):
+        self.client.get('/api/auth/me/')
+
+        cached = cache.get(f'auth-user:{self.user.pk}')
+        self.assertNotIn('password', cached)
+        self.assertNotIn(self.user.password, str(cached))
+
+
+class TokenBlacklistTests(TestCase):
+    """Tests for the cached blacklist check and token pruning"""
+
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(
+            email='user@example.com', password='pass12345', name='User'
+        )
+        self.client = APIClient()
+        res = self.client.post('/api/auth/login/', {
+            'email': 'user@example.com', 'password': 'pass12345'
+        })
+        self.refresh = res.data['refresh']
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {res.data['access']}"
+        )
+
+    def test_refresh_skips_blacklist_query_for_issued_token(self):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(
+                '/api/auth/token/refresh/', {'refresh': self.refresh}
+            )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse(any(
+            'token_blacklist_blacklistedtoken' in query['sql']
+            for query in queries
+        ))
+
+    def test_logged_out_token_is_rejected(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(
+                '/api/auth/logout/', {'refresh': self.refresh}
+            )
+        self.assertEqual(res.status_code, 205)
+
+        res = self.client.post(
+            '/api/auth/token/refresh/', {'refresh': self.refresh}
+        )
+        self.assertEqual(res.status_code, 401)
+
+    def test_blacklisted_token_rejected_after_cache_loss(self):
+        self.client.post('/api/auth/logout/', {'refresh': self.refresh})
+        cache.clear()
+
+        res = self.client.post(
+            '/api/auth/token/refresh/', {'refresh': self.refresh}
+        )
+        self.assertEqual(res.status_code, 401)
+
+    def test_prune_deletes_only_expired_tokens(self):
+        self.client.post('/api/auth/logout/', {'refresh': self.refresh})
+        OutstandingToken.objects.update(
+            expires_at=timezone.now() - timedelta(days=1)
+        )
+        login = self.client.post('/api/auth/login/', {
+            'email': 'user@example.com', 'password': 'pass12345'
+        })
+        self.client.post(
+            '/api/auth/token/refresh/', {'refresh': login.data['refresh']}
+        )
+
+        call_command('prune_tokens', '--batch-size', '1', stdout=StringIO())
+
+        self.assertEqual(OutstandingToken.objects.count(), 2)
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+class StandInSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib, DATA is refused while failures remain"""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply('220 localhost stand-in SMTP')
+        lines = None
+        for raw in self.rfile:
+            line = raw.decode().rstrip('\r\n')
+            if lines is not None:
+                if line == '.':
+                    server.messages.append('\n'.join(lines))
+                    lines = None
+                    self.reply('250 OK')
+                else:
+                    lines.append(line[1:] if line.startswith('..') else line)
+                continue
+
+            command = line[:4].upper()
+            if command in ('EHLO', 'HELO'):
+                self.reply('250 localhost')
+            elif command == 'DATA':
+                if server.failures:
+                    server.failures -= 1
+                    self.reply('451 Try again later')
+                else:
+                    lines = []
+                    self.reply('354 End data with <CR><LF>.<CR><LF>')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+class EmailOutboxTests(TestCase):
+    """Tests for queueing mail and the outbox worker"""
+
+    def setUp(self):
+        self.server = socketserver.ThreadingTCPServer(
+            ('127.0.0.1', 0), StandInSMTPHandler
+        )
+        self.server.daemon_threads = True
+        self.server.connections = 0
+        self.server.messages = []
+        self.server.failures = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        smtp = override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1',
+            EMAIL_PORT=self.server.server_address[1],
+            EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER='',
+            EMAIL_HOST_PASSWORD='',
+            DEFAULT_FROM_EMAIL='noreply@example.com',
+        )
+        smtp.enable()
+        self.addCleanup(smtp.disable)
+
+    def send(self):
+        call_command('send_outbox', '--once', stdout=StringIO())
+
+    def test_reset_request_only_enqueues(self):
+        User.objects.create_user(
+            email='user@example.com', password='pass12345'
+        )
+
+        res = APIClient().post(
+            '/api/auth/password-reset/', {'email': 'user@example.com'}
+        )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.server.connections, 0)
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.to, ['user@example.com'])
+        self.assertIn('token=', email.body)
+
+    def test_batch_shares_one_connection(self):
+        for i in range(3):
+            enqueue_email('Hello', f'Body {i}', [f'user{i}@example.com'])
+
+        self.send()
+
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(len(self.server.messages), 3)
+        self.assertFalse(
+            OutgoingEmail.objects.exclude(status=OutgoingEmail.SENT).exists()
+        )
+
+    def test_failure_is_retried_with_backoff(self):
+        self.server.failures = 1
+        failing = enqueue_email('Hello', 'First', ['a@example.com'])
+        enqueue_email('Hello', 'Second', ['b@example.com'])
+
+        self.send()
+
+        failing.refresh_from_db()
+        self.assertEqual(failing.status, OutgoingEmail.PENDING)
+        self.assertEqual(failing.attempts, 1)
+        self.assertIn('451', failing.last_error)
+        self.assertGreater(failing.next_attempt_at, timezone.now())
+        self.assertEqual(len(self.server.messages), 1)
+
+        OutgoingEmail.objects.filter(pk=failing.pk).update(
+            next_attempt_at=timezone.now()
+        )
+        self.send()
+
+        failing.refresh_from_db()
+        self.assertEqual(failing.status, OutgoingEmail.SENT)
+
+    def test_gives_up_after_max_attempts(self):
+        self.server.failures = 1
+        email = enqueue_email('Hello', 'Body', ['a@example.com'])
+
+        call_command(
+            'send_outbox', '--once', '--max-attempts', '1', stdout=StringIO()
+        )
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutgoingEmail.FAILED)
+
+
+@override_settings(TOKEN_BUCKET_RATES={
+    'login': '2/min',
+    'password-reset-confirm': '2/min',
+})
+class TokenBucketThrottleTests(TestCase):
+    """Tests for throttling the password hashing endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='user@example.com', password='pass12345', name='User'
+        )
+        self.client = APIClient()
+
+    def login(self, address='10.0.0.1', email='user@example.com'):
+        return self.client.post(
+            '/api/auth/login/',
+            {'email': email, 'password': 'pass12345'},
+            REMOTE_ADDR=address,
+        )
+
+    def test_bucket_empties_then_rejects(self):
+        self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(self.login().status_code, 200)
+
+        with self.assertNumQueries(0):
+            res = self.login()
+
+        self.assertEqual(res.status_code, 429)
+        self.assertIn('Retry-After', res)
+
+    def test_account_bucket_spans_addresses(self):
+        self.login(address='10.0.0.1')
+        self.login(address='10.0.0.2')
+
+        res = self.login(address='10.0.0.3')
+        self.assertEqual(res.status_code, 429)
+
+        res = self.login(address='10.0.0.3', email='other@example.com')
+        self.assertEqual(res.status_code, 401)
+
+    def test_account_rejection_does_not_use_the_ip_bucket(self):
+        self.login(address='10.0.0.1')
+        self.login(address='10.0.0.2')
+        self.assertEqual(self.login(address='10.0.0.3').status_code, 429)
+
+        for email in ('a@example.com', 'b@example.com'):
+            res = self.login(address='10.0.0.3', email=email)
+            self.assertEqual(res.status_code, 401)
+
+    def test_ip_bucket_spans_accounts(self):
+        self.login(email='a@example.com')
+        self.login(email='b@example.com')
+
+        res = self.login(email='c@example.com')
+        self.assertEqual(res.status_code, 429)
+
+    def test_limit_frees_up_over_time(self):
+        now = time.time()
+        with mock.patch('user.throttling.time.time', return_value=now):
+            self.login()
+            self.login()
+            self.assertEqual(self.login().status_code, 429)
+
+        with mock.patch('user.throttling.time.time', return_value=now + 120):
+            self.assertEqual(self.login().status_code, 200)
+            self.assertEqual(self.login().status_code, 200)
+            self.assertEqual(self.login().status_code, 429)
+
+    def test_concurrent_burst_passes_only_the_limit(self):
+        throttle = TokenBucketThrottle()
+        now = time.time()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            waits = list(pool.map(
+                lambda _: throttle.take('throttle:test', 5, 60, now),
+                range(40),
+            ))
+
+        self.assertEqual(waits.count(None), 5)
+
+    def test_rejections_are_counted(self):
+        key = (
+            'throttled_requests_total',
+            (('bucket', 'ip'), ('scope', 'password-reset-confirm')),
+        )
+        before = registry.counters.get(key, 0)
+        for _ in range(3):
+            self.client.post(
+                '/api/auth/password-reset-confirm/', {}, REMOTE_ADDR='10.0.0.9'
+            )
+
+        self.assertEqual(registry.counters.get(key, 0), before + 1)
@@ -0,0 +1,116 @@
+"""
+Rate limits for the password hashing endpoints.
+
+Every request is counted against two limits, one for the client IP and
+one for the account (the authenticated user, otherwise the email in the
+request body), of N requests per period as configured per view scope in
+TOKEN_BUCKET_RATES, e.g. '10/min'. This approximates a token bucket of N
+tokens refilling at N per period with a sliding window: the count of the
+current fixed window plus the previous window's count weighted by how
+much of it still overlaps the last period.
+
+The counters live in the cache so the limits hold across worker
+processes, as long as CACHE_BACKEND is one they share. They are only
+changed with cache.add and cache.incr, which redis and memcached do
+atomically, so a concurrent burst gets exactly the allowed number of
+requests through. The file backend is shared too, but its incr reads and
+rewrites the file and may let a few extra requests through.
+
+Throttles run in APIView.initial, before the view hashes a password or
+queries anything.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+from SurvivalApp.metrics import registry
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def parse_rate(rate):
+    """'10/min' -> (10 requests, per 60 seconds)"""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+def _incr(key, amount, timeout):
+    """Atomically add to a counter, creating it if it is missing"""
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key, amount)
+    except ValueError:
+        """Expired or evicted between add and incr"""
+        cache.add(key, 0, timeout)
+        return cache.incr(key, amount)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttle views by IP and account, configured by `throttle_scope`"""
+
+    def __init__(self):
+        self.retry_after = None
+
+    def get_account(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        email = None
+        if hasattr(request.data, 'get'):
+            email = request.data.get('email')
+        if isinstance(email, str) and email:
+            return f'email:{email.strip().lower()}'
+        return None
+
+    def take(self, key, limit, period, now):
+        """Count a request against a limit, returns seconds to wait if over"""
+        window = int(now // period)
+        elapsed = now / period - window
+
+        used = _incr(f'{key}:{window}', 1, 2 * period + 1)
+        previous = cache.get(f'{key}:{window - 1}', 0)
+        if previous * (1 - elapsed) + used <= limit:
+            return None
+
+        """Rejected requests do not count against the limit"""
+        self.give_back(key, period, now)
+        if used > limit or not previous:
+            return (window + 1 - now / period) * period
+        return (1 - (limit - used) / previous - elapsed) * period
+
+    def give_back(self, key, period, now):
+        """Undo take() of a request that was rejected after all"""
+        _incr(f'{key}:{int(now // period)}', -1, 2 * period + 1)
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        rate = settings.TOKEN_BUCKET_RATES.get(scope)
+        if rate is None:
+            return True
+
+        limit, period = parse_rate(rate)
+        now = time.time()
+        buckets = [('ip', self.get_ident(request))]
+        account = self.get_account(request)
+        if account is not None:
+            buckets.append(('account', account))
+
+        taken = []
+        for kind, ident in buckets:
+            key = f'throttle:{scope}:{kind}:{ident}'
+            wait = self.take(key, limit, period, now)
+            if wait is not None:
+                for earlier in taken:
+                    self.give_back(earlier, period, now)
+                self.retry_after = wait
+                registry.inc(
+                    'throttled_requests_total',
+                    {'scope': scope, 'bucket': kind},
+                )
+                return False
+            taken.append(key)
+        return True
+
+    def wait(self):
+        return self.retry_after
@@ -0,0 +1,74 @@
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import (
+    aware_utcnow,
+    datetime_from_epoch,
+    datetime_to_epoch,
+)
+
+
+def blacklist_cache_key(jti):
+    return f'token-blacklisted:{jti}'
+
+
+def seconds_until(exp):
+    """Cache timeout lasting until a token expires"""
+    return max(int(exp - datetime_to_epoch(aware_utcnow())), 1)
+
+
+class CachedBlacklistRefreshToken(RefreshToken):
+    """
+    RefreshToken whose blacklist check is answered from the cache, falling
+    back to the database. Entries live until the token expires. A token
+    being blacklisted overwrites its entry after commit, while a lookup
+    only adds a missing one, so a stale "not blacklisted" never wins.
+    Newly issued tokens are cached as not blacklisted right away.
+    """
+
+    def remember_not_blacklisted(self):
+        cache.add(
+            blacklist_cache_key(self.payload[api_settings.JTI_CLAIM]),
+            False,
+            seconds_until(self.payload['exp']),
+        )
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token.remember_not_blacklisted()
+        return token
+
+    def outstand(self):
+        """Like RefreshToken.outstand without querying the user first"""
+        outstanding = OutstandingToken.objects.get_or_create(
+            jti=self.payload[api_settings.JTI_CLAIM],
+            defaults={
+                'user_id': self.payload.get(api_settings.USER_ID_CLAIM),
+                'created_at': self.current_time,
+                'token': str(self),
+                'expires_at': datetime_from_epoch(self.payload['exp']),
+            },
+        )
+        self.remember_not_blacklisted()
+        return outstanding
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        key = blacklist_cache_key(jti)
+
+        blacklisted = cache.get(key)
+        if blacklisted is None:
+            blacklisted = (
+                BlacklistedToken.objects.filter(token__jti=jti).exists()
+            )
+            cache.add(key, blacklisted, seconds_until(self.payload['exp']))
+
+        if blacklisted:
+            raise TokenError(_("Token is blacklisted"))
@@ -1,8 +1,5 @@
 from django.urls import path, include
-from rest_framework_simplejwt.views import (
-    TokenRefreshView,
-    TokenObtainPairView,
-)
+from rest_framework_simplejwt.views import TokenRefreshView
 from rest_framework.routers import DefaultRouter
 from user import views
 
@@ -15,7 +12,7 @@ router.register('admin/users', views.UserAdminViewSet, basename='admin-user')
 
 urlpatterns = [
     path('register/', views.CreateUserView.as_view(), name='register'),
-    path('login/', TokenObtainPairView.as_view(), name='login'),
+    path('login/', views.LoginView.as_view(), name='login'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('logout/', views.LogoutView.as_view(), name='logout'),
     path('me/', views.UserProfileView.as_view(), name='profile'),
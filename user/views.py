@@ -1,16 +1,18 @@
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import viewsets
+from rest_framework_simplejwt.views import TokenObtainPairView
 
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
-from django.core.mail import send_mail
 
 
 from user.permissions import IsAdminUser
+from user.throttling import TokenBucketThrottle
+from user.tokens import CachedBlacklistRefreshToken
+from user.outbox import enqueue_email
 from user.serializers import (
     UserSerializer,
     CreateUserSerializer,
@@ -28,13 +30,15 @@ class CreateUserView(generics.CreateAPIView):
     """Create a new user in the system"""
     serializer_class = CreateUserSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'register'
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
 
-        refresh = RefreshToken.for_user(user)
+        refresh = CachedBlacklistRefreshToken.for_user(user)
 
         return Response({
             'refresh': str(refresh),
@@ -42,6 +46,12 @@ class CreateUserView(generics.CreateAPIView):
         }, status=status.HTTP_201_CREATED)
 
 
+class LoginView(TokenObtainPairView):
+    """Obtain a token pair, throttled before the password is checked"""
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'login'
+
+
 class UserProfileView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user profile"""
 
@@ -55,6 +65,8 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
 
 class ChangePasswordView(APIView):
     """Change user password"""
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'change-password'
 
     def post(self, request):
         serializer = ChangePasswordSerializer(data=request.data)
@@ -85,7 +97,7 @@ class LogoutView(APIView):
     def post(self, request):
         try:
             refresh_token = request.data["refresh"]
-            token = RefreshToken(refresh_token)
+            token = CachedBlacklistRefreshToken(refresh_token)
             token.blacklist()
             return Response(
                 {'message': 'Logout successful'},
@@ -118,7 +130,7 @@ class PasswordResetRequestView(APIView):
         message = (
             f'{reset_url}\n\n'+'This is the rest password link'
         )
-        send_mail(subject, message, None, [user.email])
+        enqueue_email(subject, message, [user.email])
 
         return Response(
             {'message': 'Password reset link sent.'},
@@ -129,6 +141,8 @@ class PasswordResetRequestView(APIView):
 class PasswordResetConfirmView(APIView):
     """Changes the user's password"""
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'password-reset-confirm'
 
     def post(self, request, *args, **kwargs):
         serializer = SetNewPasswordSerializer(data=request.data)